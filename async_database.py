@@ -0,0 +1,161 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+
+from config import DB_EXECUTOR_WORKERS
+from metrics import SUPABASE_CALL_SECONDS
+from storage import Storage
+from user_locks import UserLocks
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(func, *args, **kwargs):
+    """Виклик у потоці пулу з записом тривалості в supabase_call_seconds (без очікування в черзі)"""
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        SUPABASE_CALL_SECONDS.observe(getattr(func, '__name__', 'unknown'), time.perf_counter() - started)
+
+
+class AsyncDatabase(Storage):
+    """
+    Асинхронна обгортка над синхронним SupabaseDatabase
+
+    Клієнт PostgREST блокує потік на час HTTP запиту, тому кожен виклик
+    виконується в обмеженому пулі потоків. Повільний запит одного
+    користувача більше не зупиняє цикл подій aiogram та сервер /health.
+
+    Методи запису одного користувача виконуються по черзі (UserLocks):
+    видалення та зміна балансу складаються з кількох запитів, і два
+    швидкі натискання могли б, наприклад, двічі повернути суму одного
+    рахунку. Записи різних користувачів виконуються паралельно.
+    """
+
+    def __init__(self, database, max_workers: int = DB_EXECUTOR_WORKERS):
+        """
+        Ініціалізація обгортки
+
+        Args:
+            database: Синхронний об'єкт бази даних (SupabaseDatabase)
+            max_workers: Максимальна кількість одночасних запитів до БД
+        """
+        self.database = database
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='db'
+        )
+        self._user_locks = UserLocks()
+        logger.info(f"Пул потоків бази даних створено ({max_workers} потоків)")
+
+    async def _run(self, func, *args, **kwargs):
+        """Виконання синхронного методу БД у пулі потоків (з контекстом журналу: user_id, handler)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, partial(context.run, _timed_call, func, *args, **kwargs))
+
+    async def _write(self, func, user_id: int, *args):
+        """Виконання методу запису після попередніх записів цього користувача"""
+        async with self._user_locks.hold(user_id):
+            return await self._run(func, user_id, *args)
+
+    async def add_invoice(self, user_id: int, car_info: str, amount: float, original_text: str) -> Optional[float]:
+        """Асинхронна версія SupabaseDatabase.add_invoice"""
+        return await self._write(self.database.add_invoice, user_id, car_info, amount, original_text)
+
+    async def add_invoices(self, user_id: int, invoices: List[Dict]) -> Optional[float]:
+        """Асинхронна версія SupabaseDatabase.add_invoices"""
+        return await self._write(self.database.add_invoices, user_id, invoices)
+
+    async def add_payment(self, user_id: int, amount: float, date_paid: str, invoice_id: int = None) -> Optional[float]:
+        """Асинхронна версія SupabaseDatabase.add_payment"""
+        return await self._write(self.database.add_payment, user_id, amount, date_paid, invoice_id)
+
+    async def add_payment_for_invoice(self, user_id: int, invoice_id: int, amount: float, date_paid: str) -> Optional[float]:
+        """Асинхронна версія SupabaseDatabase.add_payment_for_invoice"""
+        return await self._write(self.database.add_payment_for_invoice, user_id, invoice_id, amount, date_paid)
+
+    async def get_balance(self, user_id: int) -> float:
+        """Асинхронна версія SupabaseDatabase.get_balance"""
+        return await self._run(self.database.get_balance, user_id)
+
+    async def get_balance_on_date(self, user_id: int, date: str) -> float:
+        """Асинхронна версія SupabaseDatabase.get_balance_on_date"""
+        return await self._run(self.database.get_balance_on_date, user_id, date)
+
+    async def get_history(self, user_id: int, limit: int = 50) -> List[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_history"""
+        return await self._run(self.database.get_history, user_id, limit)
+
+    async def get_operations(self, user_id: int, limit: int = 50, cursor: Optional[List] = None,
+                             descending: bool = True) -> List[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_operations"""
+        return await self._run(self.database.get_operations, user_id, limit, cursor, descending)
+
+    async def iter_operations(self, user_id: int, batch_size: int = 500,
+                              descending: bool = True) -> AsyncIterator[Dict]:
+        """Асинхронна версія SupabaseDatabase.iter_operations (пакети читаються в пулі потоків)"""
+        iterator = self.database.iter_operations(user_id, batch_size, descending)
+
+        def iter_operations_batch():
+            return list(islice(iterator, batch_size))
+
+        while True:
+            batch = await self._run(iter_operations_batch)
+            if not batch:
+                return
+            for operation in batch:
+                yield operation
+
+    async def get_operations_by_vin(self, user_id: int, vin: str) -> List[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_operations_by_vin"""
+        return await self._run(self.database.get_operations_by_vin, user_id, vin)
+
+    async def get_last_operation(self, user_id: int) -> Optional[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_last_operation"""
+        return await self._run(self.database.get_last_operation, user_id)
+
+    async def delete_last_operation(self, user_id: int) -> bool:
+        """Асинхронна версія SupabaseDatabase.delete_last_operation"""
+        return await self._write(self.database.delete_last_operation, user_id)
+
+    async def get_paginated_history(self, user_id: int, page: int = 1, per_page: int = 5,
+                                    cursor: Optional[List] = None,
+                                    total_count: Optional[int] = None) -> Tuple[List[Dict], int, int]:
+        """Асинхронна версія SupabaseDatabase.get_paginated_history"""
+        return await self._run(self.database.get_paginated_history, user_id, page, per_page, cursor, total_count)
+
+    async def get_operation(self, user_id: int, operation_type: str, operation_id: int) -> Optional[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_operation"""
+        return await self._run(self.database.get_operation, user_id, operation_type, operation_id)
+
+    async def delete_invoice_by_id(self, user_id: int, invoice_id: int) -> Optional[float]:
+        """Асинхронна версія SupabaseDatabase.delete_invoice_by_id"""
+        return await self._write(self.database.delete_invoice_by_id, user_id, invoice_id)
+
+    async def delete_payment_by_id(self, user_id: int, payment_id: int) -> Optional[float]:
+        """Асинхронна версія SupabaseDatabase.delete_payment_by_id"""
+        return await self._write(self.database.delete_payment_by_id, user_id, payment_id)
+
+    async def get_unpaid_invoices(self, user_id: int) -> List[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_unpaid_invoices"""
+        return await self._run(self.database.get_unpaid_invoices, user_id)
+
+    async def get_recent_invoices(self, user_id: int, limit: int = 5) -> List[Dict]:
+        """Асинхронна версія SupabaseDatabase.get_recent_invoices"""
+        return await self._run(self.database.get_recent_invoices, user_id, limit)
+
+    async def warm_up(self):
+        """Асинхронна версія SupabaseDatabase.warm_up"""
+        await self._run(self.database.warm_up)
+
+    async def close(self):
+        """Зупинка пулу потоків (при завершенні роботи бота)"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,34 @@
+"""
+Еталонний розрахунок балансу після кожної операції для бенчмарків
+
+Попередня реалізація з utils: бот бере баланс зі збереженої колонки
+balance_after, а бенчмарки порівнюють її з повним перерахунком історії.
+"""
+
+
+def calculate_balance_for_operations(operations: list) -> dict:
+    """
+    Розраховує баланс після кожної операції
+
+    Args:
+        operations: Список операцій
+
+    Returns:
+        dict: Словник {operation_id: balance_after_operation}
+    """
+    # Сортуємо операції за датою створення (від старіших до новіших)
+    sorted_ops = sorted(operations, key=lambda x: x.get('date', ''), reverse=False)
+
+    balance = 0.0
+    balance_history = {}
+
+    for operation in sorted_ops:
+        # Додаємо або віднімаємо суму операції
+        amount = float(operation.get('amount', 0))
+        balance += amount
+
+        # Зберігаємо баланс для цієї операції
+        operation_id = f"{operation.get('type', '')}_{operation.get('id', '')}"
+        balance_history[operation_id] = balance
+
+    return balance_history
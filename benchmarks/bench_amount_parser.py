@@ -0,0 +1,101 @@
+"""
+Бенчмарк парсера суми з тексту рахунку (utils.parse_amount_from_text)
+
+Порівнює скомпільований однопрохідний парсер з попередньою реалізацією
+(до восьми re.findall з нескомпільованими патернами) на корпусі текстів
+рахунків та випадкових комбінаціях фрагментів і показує кількість
+розборів за секунду. Збіг результатів обох парсерів перевіряє
+tests/test_utils.py.
+
+Запуск:
+    python benchmarks/bench_amount_parser.py [повторів] [випадкових_зразків]
+"""
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import parse_amount_from_text  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'invoice_corpus.txt')
+
+# Фрагменти для випадкових текстів (маркери, числа, валюти, роздільники)
+FRAGMENTS = [
+    '=', '= ', 'комплекс ', 'Комплекс ', 'до ', 'До сплати ', 'сплати ', 'досплати ',
+    '0', '0 ', '5', '12', '740', '1 200', '740.50', '740,50', '1.', ',5', '00',
+    'євро', ' євро', 'ЄВРО', 'euro', ' Euro', 'eur', 'EUR', 'EURO', '€', ' €', '€ ',
+    '$', ' $', 'usd', ' USD', '\n', ' ', '  ', ', ', 'стоянка ', 'BMW X5 ', '-',
+]
+
+
+def legacy_parse_amount_from_text(text: str):
+    """Попередня реалізація utils.parse_amount_from_text (еталон для порівняння)"""
+    normalized_text = re.sub(r'\s+', ' ', text.strip())
+    patterns = [
+        r'=\s*(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'комплекс\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'до\s+сплати\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'сплати\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'€\s*(\d+(?:[,.]?\d+)?)',
+        r'(\d+(?:[,.]?\d+)?)(?:EUR|eur)',
+        r'(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€|\$|usd)',
+    ]
+    for pattern in patterns:
+        matches = re.findall(pattern, normalized_text, re.IGNORECASE)
+        if matches:
+            try:
+                amount = float(matches[-1].replace(',', '.'))
+                if amount > 0:
+                    logging.getLogger('utils').info(f"Знайдено суму: {amount} у тексті: {text[:50]}...")
+                    return amount
+            except ValueError:
+                continue
+    logging.getLogger('utils').warning(f"Не вдалося знайти суму у тексті: {text[:50]}...")
+    return None
+
+
+def load_corpus(path: str = CORPUS_PATH):
+    with open(path, encoding='utf-8') as file:
+        lines = [line for line in file.read().split('\n') if not line.startswith('#')]
+    samples = [sample.strip('\n') for sample in '\n'.join(lines).split('\n---\n')]
+    return [sample for sample in samples if sample.strip()]
+
+
+def random_samples(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [''.join(rng.choices(FRAGMENTS, k=rng.randint(1, 12))) for _ in range(count)]
+
+
+def measure(parser, samples, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for sample in samples:
+            parser(sample)
+    return repeats * len(samples) / (time.perf_counter() - started)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    # Логи кожного розбору спотворюють вимірювання
+    logging.disable(logging.WARNING)
+
+    corpus = load_corpus()
+    print(f"Корпус: {len(corpus)} зразків, випадкових: {random_count}")
+
+    for title, samples, rounds in (('корпус', corpus, repeats), ('випадкові', random_samples(random_count), 1)):
+        legacy = measure(legacy_parse_amount_from_text, samples, rounds)
+        compiled = measure(parse_amount_from_text, samples, rounds)
+        print(f"{title}:")
+        print(f"  попередній парсер    : {legacy:10.0f} розборів/с")
+        print(f"  однопрохідний парсер : {compiled:10.0f} розборів/с ({compiled / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Бенчмарк: скільки одночасних оновлень за секунду обробляє бот
+до (синхронні виклики БД у хендлерах) та після (AsyncDatabase).
+
+Мережа не потрібна: SlowDatabase імітує затримку PostgREST через time.sleep,
+так само як це робить синхронний HTTP клієнт Supabase.
+
+Запуск:
+    python benchmarks/bench_async_storage.py [кількість_оновлень] [затримка_мс]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_database import AsyncDatabase  # noqa: E402
+
+
+class SlowDatabase:
+    """Імітація SupabaseDatabase з фіксованою затримкою кожного запиту"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_balance(self, user_id):
+        time.sleep(self.latency)
+        return 0.0
+
+    def get_history(self, user_id, limit=50):
+        time.sleep(self.latency)
+        return []
+
+
+async def handle_update_sync(db, user_id):
+    """Хендлер "Історія" у старому вигляді - блокує цикл подій"""
+    db.get_history(user_id)
+    db.get_balance(user_id)
+
+
+async def handle_update_async(db, user_id):
+    """Хендлер "Історія" з AsyncDatabase"""
+    await asyncio.gather(db.get_history(user_id), db.get_balance(user_id))
+
+
+async def run(handler, db, updates: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(handler(db, user_id) for user_id in range(updates)))
+    return updates / (time.perf_counter() - started)
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+
+    slow_db = SlowDatabase(latency)
+    before = asyncio.run(run(handle_update_sync, slow_db, updates))
+
+    async def run_async():
+        async_db = AsyncDatabase(slow_db)
+        try:
+            return await run(handle_update_async, async_db, updates)
+        finally:
+            await async_db.close()
+
+    after = asyncio.run(run_async())
+
+    print(f"Оновлень: {updates}, затримка запиту: {latency * 1000:.0f} мс")
+    print(f"До (синхронно):   {before:8.1f} оновлень/с")
+    print(f"Після (executor): {after:8.1f} оновлень/с  (x{after / before:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Бенчмарк оновлення балансу: SELECT + UPDATE проти RPC adjust_balance
+
+Виконує багато одночасних змін балансу одного користувача з пулу потоків
+(так само, як AsyncDatabase) та показує кількість round trip'ів на запис
+і втрачені оновлення.
+
+Запуск:
+    python benchmarks/bench_balance_updates.py [кількість_записів] [затримка_мс]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+
+
+def run(update, client: FakeSupabase, writes: int) -> float:
+    client.reset_counter()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: update(1, 1.0), range(writes)))
+    return time.perf_counter() - started
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1000
+
+    print(f"Записів: {writes}, затримка запиту: {latency * 1000:.0f} мс, потоків: 8")
+    for name, method in (('SELECT+UPDATE', '_update_balance_legacy'), ('RPC upsert', '_update_balance')):
+        client = FakeSupabase(latency=latency)
+        db = make_database(client)
+        elapsed = run(getattr(db, method), client, writes)
+        final = db.get_balance(1)
+        print(f"{name:14s} | запитів на запис: {client.request_count / writes:.1f} | "
+              f"баланс: {final:.0f}/{writes} (втрачено {writes - final:.0f}) | "
+              f"{writes / elapsed:.0f} записів/с")
+
+    db = make_database(FakeSupabase())
+    assert db._update_balance(1, 5.0) == 5.0 and db._update_balance(1, -2.0) == 3.0
+
+
+if __name__ == "__main__":
+    main()
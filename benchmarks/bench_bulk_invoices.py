@@ -0,0 +1,119 @@
+"""
+Бенчмарк пакетного додавання рахунків (add_invoices)
+
+Розбиває повідомлення з кількома рахунками на окремі рахунки та
+порівнює додавання їх по одному (add_invoice) з одним пакетним записом:
+кількість HTTP запитів до Supabase (FakeSupabase) і час для SQLite.
+Перевіряє, що баланс та історія однакові для обох способів.
+
+Запуск:
+    python benchmarks/bench_bulk_invoices.py [кількість_рахунків]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+from utils import (  # noqa: E402
+    extract_car_info, parse_amount_from_text, split_invoice_texts, vin_check_digit
+)
+
+USER_ID = 7
+
+INVOICE_TEMPLATE = """{year}BMW X5 {vin}
+Авто завантажено на автовоз.
+комплекс {amount} євро
+
+стоянка - 48 євро
+= {total} євро"""
+
+
+def make_vin(index: int) -> str:
+    vin = f"WBAKR0105K0{index:06d}"
+    return vin[:8] + vin_check_digit(vin) + vin[9:]
+
+
+def make_message(count: int) -> str:
+    """Повідомлення з count рахунками, розділеними порожнім рядком"""
+    return "\n\n".join(
+        INVOICE_TEMPLATE.format(year=2015 + index % 10, vin=make_vin(index),
+                                amount=800 + index, total=848 + index)
+        for index in range(count)
+    )
+
+
+def parse_invoices(message: str):
+    invoices = []
+    for text in split_invoice_texts(message):
+        invoices.append({
+            'car_info': extract_car_info(text),
+            'amount': parse_amount_from_text(text),
+            'original_text': text
+        })
+    return invoices
+
+
+def strip(history):
+    return [(op['car_info'], op['amount'], op['vin']) for op in history]
+
+
+async def measure_sqlite(invoices, directory: str):
+    results = {}
+    for name in ('по одному', 'пакетом'):
+        db = SQLiteDatabase(os.path.join(directory, f'{len(results)}.db'))
+        await db.connect()
+        started = time.perf_counter()
+        if name == 'по одному':
+            for invoice in invoices:
+                await db.add_invoice(USER_ID, **invoice)
+        else:
+            await db.add_invoices(USER_ID, invoices)
+        elapsed = time.perf_counter() - started
+        history = await db.get_history(USER_ID, limit=len(invoices))
+        results[name] = (elapsed, await db.get_balance(USER_ID), strip(reversed(history)))
+        await db.close()
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    logging.disable(logging.WARNING)
+
+    invoices = parse_invoices(make_message(count))
+    assert len(invoices) == count, f"розбито на {len(invoices)} рахунків замість {count}"
+    assert all(invoice['amount'] == 848 + index for index, invoice in enumerate(invoices))
+
+    supabase_results = {}
+    for name in ('по одному', 'пакетом'):
+        client = FakeSupabase()
+        db = make_database(client)
+        if name == 'по одному':
+            for invoice in invoices:
+                db.add_invoice(USER_ID, **invoice)
+        else:
+            db.add_invoices(USER_ID, invoices)
+        requests = client.request_count
+        history = list(db.iter_operations(USER_ID, descending=False))
+        supabase_results[name] = (requests, db.get_balance(USER_ID), strip(history))
+
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_results = asyncio.run(measure_sqlite(invoices, directory))
+
+    for results in (supabase_results, sqlite_results):
+        single, bulk = results['по одному'], results['пакетом']
+        assert single[1:] == bulk[1:], "пакетне додавання дає інший баланс або історію"
+
+    print(f"Рахунків у повідомленні: {count}, баланс: {supabase_results['пакетом'][1]:.2f}")
+    for name in ('по одному', 'пакетом'):
+        print(f"{name:9s}: Supabase {supabase_results[name][0]:4d} запитів, "
+              f"SQLite {sqlite_results[name][0] * 1000:7.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
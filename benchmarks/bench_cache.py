@@ -0,0 +1,73 @@
+"""
+Бенчмарк кешу балансу та історії (CachedDatabase)
+
+Імітує натискання кнопок "Баланс", "Історія" та додавання рахунків/платежів
+для багатьох користувачів (активні користувачі натискають частіше) і
+показує частку влучань, кількість запитів до БД та коректність балансу.
+
+Запуск:
+    python benchmarks/bench_cache.py [користувачів] [натискань] [розмір_кешу]
+"""
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from async_database import AsyncDatabase  # noqa: E402
+from cache import CachedDatabase  # noqa: E402
+
+
+async def workload(db, users: int, taps: int, seed: int = 42):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(users)]
+    for _ in range(taps):
+        user_id = rng.choices(range(users), weights)[0]
+        action = rng.random()
+        if action < 0.45:
+            await db.get_balance(user_id)
+        elif action < 0.85:
+            await asyncio.gather(db.get_history(user_id), db.get_balance(user_id))
+        elif action < 0.95:
+            await db.add_invoice(user_id, "AUDI A6", 100.0, "= 100 євро")
+        else:
+            await db.add_payment(user_id, 50.0, "01.01.2025")
+
+
+async def measure(users: int, taps: int, cache_size: int):
+    results = {}
+    for name in ('без кешу', 'з кешем'):
+        client = FakeSupabase()
+        backend = AsyncDatabase(make_database(client))
+        db = backend if name == 'без кешу' else CachedDatabase(backend, max_users=cache_size, ttl=300)
+        await workload(db, users, taps)
+        results[name] = client.request_count
+
+        if isinstance(db, CachedDatabase):
+            stats = db.stats()
+            # Кеш не повинен розходитися з базою даних
+            for user_id in range(users):
+                assert await db.get_balance(user_id) == await backend.get_balance(user_id)
+        await backend.close()
+    return results, stats
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    taps = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    cache_size = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    results, stats = asyncio.run(measure(users, taps, cache_size))
+    print(f"Користувачів: {users}, натискань: {taps}, розмір кешу: {cache_size}")
+    for name, requests in results.items():
+        print(f"{name:9s}: {requests} запитів до БД")
+    for name, cache_stats in stats.items():
+        print(f"кеш {name:8s}: влучань {cache_stats['hit_rate']:.0%} "
+              f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}), "
+              f"витіснень {cache_stats['evictions']}")
+
+
+if __name__ == "__main__":
+    main()
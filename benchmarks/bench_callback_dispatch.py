@@ -0,0 +1,221 @@
+"""
+Бенчмарк маршрутизації callback-запитів
+
+Порівнює попередній ланцюжок хендлерів aiogram з фільтрами
+F.data == ... / F.data.startswith(...) і розбором callback.data через split
+з одним хендлером callbacks.CallbackRouter (пошук за префіксом і
+CallbackData). Оновлення проходять через Dispatcher.feed_update, тому
+час включає middleware aiogram (FSM тощо). Перевіряє, що кнопки з
+keyboards.py потрапляють у потрібні хендлери з розібраними полями.
+
+Запуск:
+    python benchmarks/bench_callback_dispatch.py [оновлень_на_тип]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher, F  # noqa: E402
+from aiogram.types import CallbackQuery, Update, User  # noqa: E402
+
+import keyboards  # noqa: E402
+from callbacks import (  # noqa: E402
+    CallbackRouter, CalendarCallback, ConfirmDeleteCallback, DateCallback,
+    DeleteOperationCallback, DeletePageCallback, InvoiceSelectCallback
+)
+
+# Точні callback_data у порядку реєстрації хендлерів у main.py
+EXACT_BEFORE = ["back_to_menu", "menu_add_invoice", "menu_add_payment"]
+EXACT_MENU = ["menu_balance", "menu_history", "menu_export"]
+EXPORT_FORMATS = ["export_text", "export_csv", "export_xlsx"]
+
+# Результати розбору: назва хендлера та поля
+calls = []
+
+
+def legacy_dispatcher() -> Dispatcher:
+    """Попередній ланцюжок фільтрів main.py (хендлери лише розбирають callback.data)"""
+    dp = Dispatcher()
+
+    def exact(name):
+        async def handler(callback: CallbackQuery):
+            calls.append((name,))
+        return handler
+
+    async def calendar_navigation(callback: CallbackQuery):
+        _, _, year, month = callback.data.split('_')
+        calls.append(('calendar', int(year), int(month)))
+
+    async def date_selected(callback: CallbackQuery):
+        parts = callback.data.split('_')
+        calls.append(('date', int(parts[2]), int(parts[3]), int(parts[4])))
+
+    async def invoice_selected(callback: CallbackQuery):
+        part = callback.data.split('_')[2]
+        calls.append(('invoice', None if part == 'balance' else int(part)))
+
+    async def delete_page(callback: CallbackQuery):
+        calls.append(('page', int(callback.data.split('_')[-1])))
+
+    async def select_for_deletion(callback: CallbackQuery):
+        parts = callback.data.split('_')
+        calls.append(('delete', parts[1], int(parts[2])))
+
+    async def confirm_delete(callback: CallbackQuery):
+        parts = callback.data.split('_')
+        calls.append(('confirm', parts[2], int(parts[3])))
+
+    for name in EXACT_BEFORE:
+        dp.callback_query.register(exact(name), F.data == name)
+    dp.callback_query.register(calendar_navigation, F.data.startswith("calendar_"))
+    dp.callback_query.register(date_selected, F.data.startswith("date_selected_"))
+    dp.callback_query.register(invoice_selected, F.data.startswith("select_invoice_"))
+    for name in EXACT_MENU:
+        dp.callback_query.register(exact(name), F.data == name)
+    dp.callback_query.register(exact('export'), F.data.in_(EXPORT_FORMATS))
+    dp.callback_query.register(exact('delete_operations_menu'), F.data == "delete_operations_menu")
+    dp.callback_query.register(delete_page, F.data.startswith("delete_page_"))
+    dp.callback_query.register(
+        select_for_deletion, F.data.startswith("delete_invoice_") | F.data.startswith("delete_payment_")
+    )
+    dp.callback_query.register(confirm_delete, F.data.startswith("confirm_delete_"))
+    dp.callback_query.register(exact('ignore'), F.data == "ignore")
+    dp.callback_query.register(exact('unknown'))
+    return dp
+
+
+def router_dispatcher() -> Dispatcher:
+    """CallbackRouter з тими самими маршрутами, що й у main.py"""
+    dp = Dispatcher()
+    router = CallbackRouter()
+    dp.callback_query.register(router.dispatch)
+
+    def exact(name, *keys):
+        @router.route(*keys)
+        async def handler(callback: CallbackQuery):
+            calls.append((name,))
+
+    for name in EXACT_BEFORE + EXACT_MENU + ["delete_operations_menu", "ignore"]:
+        exact(name, name)
+    exact('export', *EXPORT_FORMATS)
+
+    @router.route(CalendarCallback)
+    async def calendar_navigation(callback: CallbackQuery, callback_data: CalendarCallback):
+        calls.append(('calendar', callback_data.year, callback_data.month))
+
+    @router.route(DateCallback)
+    async def date_selected(callback: CallbackQuery, callback_data: DateCallback, state):
+        calls.append(('date', callback_data.year, callback_data.month, callback_data.day))
+
+    @router.route(InvoiceSelectCallback)
+    async def invoice_selected(callback: CallbackQuery, callback_data: InvoiceSelectCallback, state):
+        calls.append(('invoice', callback_data.invoice_id))
+
+    @router.route(DeletePageCallback)
+    async def delete_page(callback: CallbackQuery, callback_data: DeletePageCallback, state):
+        calls.append(('page', callback_data.page))
+
+    @router.route(DeleteOperationCallback)
+    async def select_for_deletion(callback: CallbackQuery, callback_data: DeleteOperationCallback):
+        calls.append(('delete', callback_data.operation_type, callback_data.operation_id))
+
+    @router.route(ConfirmDeleteCallback)
+    async def confirm_delete(callback: CallbackQuery, callback_data: ConfirmDeleteCallback, state):
+        calls.append(('confirm', callback_data.operation_type, callback_data.operation_id))
+
+    @router.fallback
+    async def unknown(callback: CallbackQuery):
+        calls.append(('unknown',))
+
+    return dp
+
+
+# Однакові натискання у старому та новому форматі callback_data
+SCENARIOS = [
+    ("back_to_menu", "back_to_menu"),
+    ("calendar_prev_2025_2", CalendarCallback(year=2025, month=2).pack()),
+    ("date_selected_2025_02_03", DateCallback(year=2025, month=2, day=3).pack()),
+    ("select_invoice_balance", InvoiceSelectCallback().pack()),
+    ("select_invoice_42", InvoiceSelectCallback(invoice_id=42).pack()),
+    ("export_xlsx", "export_xlsx"),
+    ("delete_page_3", DeletePageCallback(page=3).pack()),
+    ("delete_payment_17", DeleteOperationCallback(operation_type='payment', operation_id=17).pack()),
+    ("confirm_delete_invoice_5", ConfirmDeleteCallback(operation_type='invoice', operation_id=5).pack()),
+    ("ignore", "ignore"),
+    ("something_old", "something_old"),
+]
+
+
+def callback_update(data: str) -> Update:
+    return Update(update_id=1, callback_query=CallbackQuery(
+        id="1", from_user=User(id=1, is_bot=False, first_name="bench"), chat_instance="bench", data=data
+    ))
+
+
+async def dispatch_cost(dp: Dispatcher, bot: Bot, data: str, repeats: int) -> float:
+    """Середній час обробки одного оновлення, мкс"""
+    update = callback_update(data)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def keyboard_callbacks():
+    """callback_data усіх кнопок, які створює keyboards.py"""
+    operations = [
+        {'type': 'invoice', 'id': 5, 'amount': 900.0, 'date': '2025-02-03T10:00:00', 'car_info': 'BMW X5'},
+        {'type': 'payment', 'id': 17, 'amount': 500.0, 'date': '2025-02-04T10:00:00'},
+    ]
+    markups = [
+        keyboards.get_main_menu(), keyboards.get_calendar(), keyboards.get_calendar(2025, 1),
+        keyboards.get_export_keyboard(), keyboards.get_history_keyboard(),
+        keyboards.get_invoice_selection_keyboard([{'id': 42, 'display_text': 'BMW X5'}]),
+        keyboards.get_operations_list_keyboard(operations, 2, 3),
+        keyboards.get_delete_confirmation_keyboard('invoice', 5),
+    ]
+    return [button.callback_data for markup in markups for row in markup.inline_keyboard for button in row]
+
+
+async def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    logging.disable(logging.WARNING)
+    bot = Bot("1:bench")
+    legacy, routed = legacy_dispatcher(), router_dispatcher()
+
+    # Однакові результати розбору для старого та нового формату
+    for old_data, new_data in SCENARIOS:
+        calls.clear()
+        await legacy.feed_update(bot, callback_update(old_data))
+        await routed.feed_update(bot, callback_update(new_data))
+        assert calls[0] == calls[1], (old_data, calls)
+        # Кнопки старого формату, що лишилися в чатах, потрапляють до тих самих хендлерів
+        await routed.feed_update(bot, callback_update(old_data))
+        assert calls[2] == calls[1], (old_data, calls)
+
+    # Кожна кнопка клавіатур має свій хендлер
+    for data in keyboard_callbacks():
+        calls.clear()
+        await routed.feed_update(bot, callback_update(data))
+        assert calls and calls[0] != ('unknown',), data
+        assert len(data.encode()) <= 64, data
+
+    print(f"{'callback_data':28} {'фільтри aiogram':>16} {'CallbackRouter':>16}")
+    totals = [0.0, 0.0]
+    for old_data, new_data in SCENARIOS:
+        before = await dispatch_cost(legacy, bot, old_data, repeats)
+        after = await dispatch_cost(routed, bot, new_data, repeats)
+        totals[0] += before
+        totals[1] += after
+        print(f"{old_data:28} {before:13.0f} мкс {after:13.0f} мкс")
+    count = len(SCENARIOS)
+    print(f"{'середнє':28} {totals[0] / count:13.0f} мкс {totals[1] / count:13.0f} мкс")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
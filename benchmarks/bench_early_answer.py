@@ -0,0 +1,135 @@
+"""
+Бенчмарк ранньої відповіді на callback-запити (EarlyAnswerMiddleware)
+
+Фейковий Bot API відповідає із затримкою rtt на кожен запит. Хендлер,
+як show_history, читає БД, редагує повідомлення і викликає
+callback.answer(). Фіксується час від отримання оновлення до
+відповіді Telegram на answerCallbackQuery (коли зникає індикатор
+завантаження на кнопці) до і після middleware, а також:
+
+- на кожне натискання рівно один answerCallbackQuery
+- текст помилки з callback.answer("...") приходить повідомленням у чат
+
+Запуск:
+    python benchmarks/bench_early_answer.py [натискань] [rtt_мс] [бд_мс]
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.types import CallbackQuery, Chat, Message, Update, User  # noqa: E402
+
+from callbacks import CallbackRouter, DeferredAnswerMiddleware, EarlyAnswerMiddleware  # noqa: E402
+
+USER = User(id=42, is_bot=False, first_name="bench")
+MESSAGE = Message(message_id=1, date=0, chat=Chat(id=42, type="private"), text="menu")
+
+
+class FakeSession(BaseSession):
+    """Сесія бота без мережі: кожен запит триває rtt секунд, запити записуються"""
+
+    def __init__(self, rtt: float):
+        super().__init__()
+        self.rtt = rtt
+        self.requests = []
+
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(self.rtt)
+        self.requests.append((type(method).__name__, time.perf_counter(), method))
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_dispatcher(db_latency: float, early: bool, bot: Bot) -> Dispatcher:
+    dp = Dispatcher()
+    router = CallbackRouter()
+    dp.callback_query.register(router.dispatch)
+    if early:
+        dp.callback_query.outer_middleware(EarlyAnswerMiddleware())
+        bot.session.middleware(DeferredAnswerMiddleware())
+
+    # Як show_history: запит до БД, редагування повідомлення, відповідь
+    @router.route("menu_history")
+    async def show_history(callback: CallbackQuery):
+        await asyncio.sleep(db_latency)
+        await callback.message.edit_text("history")
+        await callback.answer()
+
+    @router.route("menu_error")
+    async def failing(callback: CallbackQuery):
+        await asyncio.sleep(db_latency)
+        await callback.answer("Сталася помилка")
+
+    return dp
+
+
+def update(update_id: int, data: str) -> Update:
+    return Update(update_id=update_id, callback_query=CallbackQuery(
+        id=str(update_id), from_user=USER, chat_instance="c", message=MESSAGE, data=data))
+
+
+async def answer_latency(taps: int, rtt: float, db_latency: float, early: bool):
+    """Медіана часу до відповіді на answerCallbackQuery та запити кожного натискання"""
+    bot = Bot("1:bench", session=FakeSession(rtt))
+    dp = make_dispatcher(db_latency, early, bot)
+    latencies, handled = [], []
+    for i in range(taps):
+        bot.session.requests.clear()
+        started = time.perf_counter()
+        await dp.feed_update(bot, update(i, "menu_history"))
+        handled.append(time.perf_counter() - started)
+        # Фонова відповідь могла ще не завершитися
+        while not any(name == 'AnswerCallbackQuery' for name, _, _ in bot.session.requests):
+            await asyncio.sleep(0.001)
+        answers = [at for name, at, _ in bot.session.requests if name == 'AnswerCallbackQuery']
+        assert len(answers) == 1, bot.session.requests
+        latencies.append(answers[0] - started)
+
+    bot.session.requests.clear()
+    await dp.feed_update(bot, update(taps, "menu_error"))
+    await asyncio.sleep(rtt * 2)
+    requests = [(name, method) for name, _, method in bot.session.requests]
+    return statistics.median(latencies), statistics.median(handled), requests
+
+
+async def main():
+    taps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 80) / 1000
+    db_latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 150) / 1000
+    logging.getLogger('aiogram').setLevel(logging.ERROR)
+
+    print(f"Натискань: {taps}, rtt Bot API: {rtt * 1000:.0f} мс, запит до БД: {db_latency * 1000:.0f} мс")
+    results = {}
+    for early in (False, True):
+        latency, handled, requests = await answer_latency(taps, rtt, db_latency, early)
+        results[early] = latency
+        title = 'рання відповідь' if early else 'відповідь у кінці'
+        print(f"  {title:18s} | індикатор на кнопці: {latency * 1000:4.0f} мс "
+              f"({latency / rtt:.1f} rtt) | хендлер: {handled * 1000:4.0f} мс")
+
+        # Помилка: одна відповідь на запит, текст - у чат
+        names = [name for name, _ in requests]
+        assert names.count('AnswerCallbackQuery') == 1, names
+        if early:
+            messages = [method.text for name, method in requests if name == 'SendMessage']
+            assert messages == ["Сталася помилка"], requests
+            print(f"  Помилка хендлера: запити {names}, повідомлення {messages[0]!r}")
+
+    assert results[True] < rtt * 1.5, results
+    assert results[True] * 2 < results[False], results
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
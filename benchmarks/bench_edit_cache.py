@@ -0,0 +1,158 @@
+"""
+Бенчмарк пропуску редагувань без змін (EditCacheMiddleware)
+
+Фейковий Bot API зберігає вміст повідомлень і, як Telegram, повертає
+помилку 'message is not modified' на редагування без змін. Серія
+натискань (повернення в меню, навігація календаря, сторінки з новим
+текстом) виконується без кешу та з ним; порівнюються кількість
+запитів до Telegram, помилок та кінцевий вміст повідомлень.
+
+Також перевіряється, що кеш не перевищує max_size, і вимірюється
+вартість перевірки на одне редагування.
+
+Запуск:
+    python benchmarks/bench_edit_cache.py [натискань]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('BOT_TOKEN', '1:bench')
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.exceptions import TelegramBadRequest  # noqa: E402
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage  # noqa: E402
+from aiogram.types import Chat, Message  # noqa: E402
+
+from config import MESSAGES  # noqa: E402
+from edit_cache import EditCacheMiddleware  # noqa: E402
+from keyboards import get_back_to_menu, get_calendar, get_main_menu  # noqa: E402
+
+CHAT = Chat(id=42, type="private")
+
+
+class FakeTelegram(BaseSession):
+    """Сесія бота з вмістом повідомлень на 'сервері' та помилкою 'message is not modified'"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = {}
+        self.requests = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def _markup(markup):
+        return markup.model_dump_json(exclude_none=True) if markup is not None else None
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        if isinstance(method, SendMessage):
+            message_id = len(self.messages) + 1
+            self.messages[message_id] = (method.text, self._markup(method.reply_markup))
+            return Message(message_id=message_id, date=0, chat=CHAT, text=method.text)
+
+        text, markup = self.messages[method.message_id]
+        if isinstance(method, EditMessageText):
+            text = method.text
+        markup = self._markup(method.reply_markup)
+        if (text, markup) == self.messages[method.message_id]:
+            self.not_modified += 1
+            raise TelegramBadRequest(method, "Bad Request: message is not modified: specified new message "
+                                             "content and reply markup are exactly the same")
+        self.messages[method.message_id] = (text, markup)
+        return Message(message_id=method.message_id, date=0, chat=CHAT, text=text)
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+async def tap(bot: Bot, message_id: int, action: str, value):
+    """Редагування, які роблять хендлери main.py; 'message is not modified' ігнорується, як у них"""
+    try:
+        if action == 'menu':
+            # back_to_menu
+            await bot.edit_message_text(MESSAGES['start'], chat_id=CHAT.id, message_id=message_id,
+                                        reply_markup=get_main_menu())
+        elif action == 'calendar':
+            # calendar_navigation
+            await bot.edit_message_reply_markup(chat_id=CHAT.id, message_id=message_id,
+                                                reply_markup=get_calendar(2025, value))
+        else:
+            # delete_page_navigation: сторінка з новим текстом
+            await bot.edit_message_text(f"🗑️ Сторінка {value}", chat_id=CHAT.id, message_id=message_id,
+                                        reply_markup=get_back_to_menu())
+    except TelegramBadRequest:
+        pass
+
+
+def make_taps(count: int):
+    rng = random.Random(7)
+    actions = []
+    for _ in range(count):
+        action = rng.choices(('menu', 'calendar', 'page'), weights=(4, 4, 2))[0]
+        actions.append((rng.randrange(2), action, rng.randrange(1, 4) if action == 'calendar' else rng.random()))
+    return actions
+
+
+async def run(taps, cache: bool):
+    session = FakeTelegram()
+    middleware = None
+    if cache:
+        middleware = EditCacheMiddleware()
+        session.middleware(middleware)
+    bot = Bot("1:bench", session=session)
+    # Два повідомлення меню в чаті
+    message_ids = [(await bot.send_message(CHAT.id, MESSAGES['start'], reply_markup=get_main_menu())).message_id
+                   for _ in range(2)]
+    for index, action, value in taps:
+        await tap(bot, message_ids[index], action, value)
+    return session, middleware
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    taps = make_taps(count)
+
+    plain, _ = await run(taps, cache=False)
+    cached, middleware = await run(taps, cache=True)
+    saved = sum(middleware.skipped.values())
+    print(f"Натискань: {count}")
+    print(f"  без кешу | запитів: {plain.requests}, 'message is not modified': {plain.not_modified}")
+    print(f"  з кешем  | запитів: {cached.requests}, 'message is not modified': {cached.not_modified}, "
+          f"пропущено: {middleware.skipped} (x{plain.requests / cached.requests:.1f} менше запитів)")
+    assert cached.messages == plain.messages
+    assert cached.requests + saved == plain.requests
+    assert cached.not_modified == 0 and saved == plain.not_modified
+
+    # Витіснення: не більше max_size повідомлень
+    middleware = EditCacheMiddleware(max_size=100)
+    session = FakeTelegram()
+    session.middleware(middleware)
+    bot = Bot("1:bench", session=session)
+    for _ in range(500):
+        await bot.send_message(CHAT.id, "text")
+    assert len(middleware.cache) == 100 and middleware.stats()['evictions'] == 400, middleware.stats()
+
+    # Вартість перевірки: редагування календаря без змін (хеш клавіатури)
+    repeats = 2000
+    method = EditMessageReplyMarkup(chat_id=CHAT.id, message_id=500, reply_markup=get_calendar(2025, 1))
+    await bot(method)
+
+    async def direct(bot_, method_):
+        return True
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await middleware(direct, bot, method)
+    print(f"Перевірка кешу: {(time.perf_counter() - started) / repeats * 1e6:.0f} мкс на редагування календаря")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
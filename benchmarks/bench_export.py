@@ -0,0 +1,156 @@
+"""
+Бенчмарк текстового експорту історії для великих журналів
+
+Порівнює попередній конвеєр (уся історія в списку, звіт через
+export_text += ..., запис у тимчасовий файл і читання для FSInputFile) з
+потоковим exports.write_text_export у BytesIO для BufferedInputFile:
+час і пікову пам'ять Python (tracemalloc). Перевіряє, що обидва
+конвеєри дають однаковий файл.
+
+Запуск:
+    python benchmarks/bench_export.py [кількість_операцій]
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import write_text_export  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+from balance_reference import calculate_balance_for_operations  # noqa: E402
+
+USER_ID = 7
+
+
+def legacy_format_export_text(history: list, current_balance: float) -> str:
+    """Попередня реалізація utils.format_export_text (конкатенація рядків)"""
+    export_text = "📋 ІСТОРІЯ ОПЕРАЦІЙ\n"
+    export_text += "=" * 35 + "\n\n"
+    sorted_history = sorted(history, key=lambda x: x.get('date', ''), reverse=False)
+    balance_history = calculate_balance_for_operations(sorted_history)
+    operation_count = 0
+    for operation in sorted_history:
+        operation_count += 1
+        date_str = operation.get('date', '')
+        if 'T' in date_str:
+            date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            formatted_date = date_obj.strftime('%d.%m.%Y')
+        else:
+            formatted_date = date_str
+        operation_key = f"{operation.get('type', '')}_{operation.get('id', '')}"
+        balance_after_op = balance_history.get(operation_key, 0.0)
+        if operation['type'] == 'payment':
+            export_text += f"— ПЛАТІЖ #{operation_count}\n"
+            export_text += f"💰 Сума: +{operation['amount']:.2f} євро\n"
+            export_text += f"📅 Дата платежу: {formatted_date}\n"
+            if operation.get('payment_type', 'balance') == 'invoice':
+                export_text += f"🎯 Тип: Платіж за рахунок\n"
+                export_text += f"🚗 Авто: {operation.get('car_info', 'Невідоме авто')}\n"
+            else:
+                export_text += f"🎯 Тип: Платіж на баланс\n"
+            export_text += f"📊 Баланс після операції: {balance_after_op:+.2f} євро\n"
+        else:
+            export_text += f"— РАХУНОК #{operation_count}\n"
+            export_text += f"🚗 Авто: {operation.get('car_info', 'Не вказано')}\n"
+            export_text += f"💰 Сума: {operation['amount']:.2f} євро\n"
+            export_text += f"📅 Дата створення: {formatted_date}\n"
+            export_text += f"📊 Баланс після операції: {balance_after_op:+.2f} євро\n"
+        export_text += "-" * 35 + "\n\n"
+    export_text += f"💰 ПІДСУМОК:\n"
+    export_text += f"📊 Поточний баланс: {current_balance:+.2f} євро\n"
+    if current_balance >= 0:
+        export_text += f"✅ Стан: Позитивний баланс\n"
+    else:
+        export_text += f"❌ Стан: Борг {abs(current_balance):.2f} євро\n"
+    export_text += f"\n📅 Звіт згенеровано: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
+    export_text += f"👤 Загальна кількість операцій: {operation_count}"
+    return export_text
+
+
+async def fill(db, operations: int, user_id: int = USER_ID):
+    """
+    Журнал з operations операцій (половина платежів 2020 року, половина
+    рахунків з поточною датою)
+    """
+    started = datetime(2020, 1, 1)
+    payment_count = operations - operations // 2
+    # Платежі напряму в таблицю (швидше за add_payment), balance_after - наростаючий підсумок
+    await db._connection.executemany(
+        "INSERT INTO payments (user_id, amount, date_paid, date_created, invoice_id, balance_after) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(user_id, 450.0, "01.02.2025", (started + timedelta(minutes=i)).isoformat(), None, 450.0 * (i + 1))
+         for i in range(payment_count)]
+    )
+    await db._connection.commit()
+    invoices = [
+        {'car_info': f"2019 BMW X5 WBAKR0105K0{i:06d}", 'amount': 900.0 + i % 100, 'original_text': "= 900 євро"}
+        for i in range(operations // 2)
+    ]
+    await db.add_invoices(user_id, invoices)
+
+
+async def legacy_export(db, directory: str) -> bytes:
+    history = [operation async for operation in db.iter_operations(USER_ID, descending=False)]
+    export_data = legacy_format_export_text(history, await db.get_balance(USER_ID))
+    path = os.path.join(directory, 'export.txt')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(export_data)
+    with open(path, 'rb') as file:
+        data = file.read()
+    os.remove(path)
+    return data
+
+
+async def streaming_export(db, directory: str) -> bytes:
+    buffer = BytesIO()
+    await write_text_export(db, USER_ID, buffer)
+    return buffer.getvalue()
+
+
+async def measure(export, db, directory: str):
+    """Час (без tracemalloc, він сповільнює виконання) та пікова пам'ять окремим запуском"""
+    started = time.perf_counter()
+    data = await export(db, directory)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    await export(db, directory)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, elapsed, peak
+
+
+def without_timestamp(data: bytes) -> bytes:
+    return b"\n".join(line for line in data.split(b"\n") if "Звіт згенеровано".encode() not in line)
+
+
+async def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteDatabase(os.path.join(directory, 'bench.db'))
+        await db.connect()
+        await fill(db, operations)
+
+        legacy_data, legacy_time, legacy_peak = await measure(legacy_export, db, directory)
+        stream_data, stream_time, stream_peak = await measure(streaming_export, db, directory)
+        await db.close()
+
+    assert without_timestamp(legacy_data) == without_timestamp(stream_data), "експорт відрізняється"
+
+    size = len(stream_data) / 2 ** 20
+    print(f"Операцій: {operations}, розмір файлу: {size:.1f} МБ")
+    print(f"попередній конвеєр: {legacy_time:6.2f} с, пік пам'яті {legacy_peak / 2 ** 20:7.1f} МБ")
+    print(f"потоковий у буфер : {stream_time:6.2f} с, пік пам'яті {stream_peak / 2 ** 20:7.1f} МБ")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""
+Бенчмарк фонових експортів: затримка циклу подій та ліміт на користувача
+
+Кілька користувачів одночасно експортують великі журнали (SQLite), а
+паралельно цикл подій обробляє "короткі запити" (await sleep(0)).
+Порівнюється форматування пакетів прямо в циклі подій та в пулі потоків
+exports (як у фонових задачах бота). Також перевіряється, що
+ExportJobs не запускає другий експорт того ж користувача, а прогрес
+доходить до кількості операцій.
+
+Запуск:
+    python benchmarks/bench_export_jobs.py [операцій_на_користувача] [користувачів]
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import Executor, Future
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exports  # noqa: E402
+from bench_export import fill  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+
+
+class InlineExecutor(Executor):
+    """Виконання у потоці виклику - форматування прямо в циклі подій"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+async def handler_latencies(stop: asyncio.Event) -> list:
+    """Час відповіді "короткого запиту", що надходить кожні 5 мс"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        latencies.append(time.perf_counter() - started - 0.005)
+    return latencies
+
+
+async def run_exports(db, users: list, executor) -> tuple:
+    exports._executor = executor
+    stop = asyncio.Event()
+    probe = asyncio.create_task(handler_latencies(stop))
+
+    started = time.perf_counter()
+    writers = (exports.write_text_export, exports.write_csv_export, exports.write_xlsx_export)
+    await asyncio.gather(*(
+        writers[index % len(writers)](db, user_id, BytesIO())
+        for index, user_id in enumerate(users)
+    ))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    latencies = sorted(await probe)
+    return elapsed, latencies
+
+
+def describe(latencies: list) -> str:
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return (f"затримка запиту медіана {statistics.median(latencies) * 1000:5.1f} мс, "
+            f"p99 {p99 * 1000:5.1f} мс, макс {latencies[-1] * 1000:5.1f} мс")
+
+
+async def check_jobs(db, user_id: int, operations: int):
+    """Ліміт ExportJobs та звіти прогресу"""
+    reported = []
+
+    async def progress(operation_count: int):
+        reported.append(operation_count)
+
+    jobs = exports.ExportJobs(per_user_limit=1)
+    first = jobs.start(user_id, exports.write_csv_export(db, user_id, BytesIO(), progress=progress))
+    second = jobs.start(user_id, exports.write_csv_export(db, user_id, BytesIO()))
+    other = jobs.start(user_id + 1, exports.write_csv_export(db, user_id + 1, BytesIO()))
+    assert first is not None and other is not None, "експорт не запущено"
+    assert second is None, "другий експорт того ж користувача запущено"
+    assert jobs.running(user_id) == 1
+
+    assert await first == operations
+    await other
+    assert jobs.running(user_id) == 0
+    assert reported == sorted(reported) and reported[-1] == operations, "прогрес"
+
+    # Після завершення користувач знову може запустити експорт
+    again = jobs.start(user_id, exports.write_csv_export(db, user_id, BytesIO()))
+    assert again is not None
+    await again
+
+
+async def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 30_000
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteDatabase(os.path.join(directory, 'bench.db'))
+        await db.connect()
+        users = list(range(1, user_count + 1))
+        for user_id in users:
+            await fill(db, operations, user_id)
+
+        pool = exports._executor
+        inline_time, inline_latencies = await run_exports(db, users, InlineExecutor())
+        pool_time, pool_latencies = await run_exports(db, users, pool)
+
+        await check_jobs(db, users[0], operations)
+        await db.close()
+
+    print(f"Користувачів: {user_count}, операцій у кожного: {operations}")
+    print(f"у циклі подій : {inline_time:5.2f} с, {describe(inline_latencies)}")
+    print(f"у пулі потоків: {pool_time:5.2f} с, {describe(pool_latencies)}")
+    print("ExportJobs: другий експорт користувача відхилено, прогрес коректний")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
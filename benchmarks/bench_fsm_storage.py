@@ -0,0 +1,170 @@
+"""
+Бенчмарк сховища станів FSM (fsm_storage.SQLiteFSMStorage)
+
+- Сценарій платежу через FSMContext дає однакові стани й дані в
+  MemoryStorage та SQLiteFSMStorage (з кешем і без)
+- Стани переживають перезапуск, прострочені (TTL) зникають з файлу,
+  а state.clear() видаляє рядок
+- Пам'ять процесу після N покинутих діалогів та затримка кроків діалогу
+
+Запуск:
+    python benchmarks/bench_fsm_storage.py [покинутих_діалогів]
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.context import FSMContext  # noqa: E402
+from aiogram.fsm.state import State, StatesGroup  # noqa: E402
+from aiogram.fsm.storage.base import StorageKey  # noqa: E402
+from aiogram.fsm.storage.memory import MemoryStorage  # noqa: E402
+
+from fsm_storage import SQLiteFSMStorage  # noqa: E402
+
+BOT_ID = 42
+
+
+class PaymentStates(StatesGroup):
+    waiting_for_payment_amount = State()
+    waiting_for_payment_date = State()
+    waiting_for_payment_invoice_selection = State()
+
+
+def context(storage, user_id: int) -> FSMContext:
+    return FSMContext(storage=storage, key=StorageKey(bot_id=BOT_ID, chat_id=user_id, user_id=user_id))
+
+
+async def payment_flow(state: FSMContext, amount: float) -> list:
+    """Кроки діалогу платежу з main.py; повертає спостереження після кожного кроку"""
+    seen = []
+    await state.set_state(PaymentStates.waiting_for_payment_amount)
+    seen.append(await state.get_state())
+    await state.update_data(payment_amount=amount)
+    await state.set_state(PaymentStates.waiting_for_payment_date)
+    seen.append((await state.get_state(), await state.get_data()))
+    data = await state.get_data()
+    await state.update_data(payment_date="03.02.2025", final_amount=data['payment_amount'])
+    await state.set_state(PaymentStates.waiting_for_payment_invoice_selection)
+    seen.append((await state.get_state(), await state.get_data()))
+    await state.update_data(delete_cursors={'2': ['2025-02-03T10:00:00', 'invoice', 7]})
+    seen.append(await state.get_data())
+    await state.clear()
+    seen.append((await state.get_state(), await state.get_data()))
+    return seen
+
+
+async def open_storage(path: str, **kwargs) -> SQLiteFSMStorage:
+    storage = SQLiteFSMStorage(path, **kwargs)
+    await storage.connect()
+    return storage
+
+
+def row_count(path: str) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM fsm_states").fetchone()[0]
+
+
+async def check_behaviour(directory: str):
+    expected = await payment_flow(context(MemoryStorage(), 1), 740.5)
+    for cache_size in (0, 100):
+        path = os.path.join(directory, f'flow_{cache_size}.db')
+        storage = await open_storage(path, cache_size=cache_size)
+        assert await payment_flow(context(storage, 1), 740.5) == expected, cache_size
+        await storage.close()
+        # state.clear() не залишає рядків
+        assert row_count(path) == 0
+
+    # Незавершений діалог переживає перезапуск
+    path = os.path.join(directory, 'restart.db')
+    storage = await open_storage(path)
+    state = context(storage, 5)
+    await state.set_state(PaymentStates.waiting_for_payment_date)
+    await state.update_data(payment_amount=900.0)
+    await storage.close()
+    storage = await open_storage(path)
+    state = context(storage, 5)
+    assert await state.get_state() == PaymentStates.waiting_for_payment_date.state
+    assert await state.get_data() == {'payment_amount': 900.0}
+    await storage.close()
+
+    # Прострочений стан не читається і видаляється при наступному відкритті
+    path = os.path.join(directory, 'ttl.db')
+    storage = await open_storage(path, ttl=0.2)
+    await context(storage, 6).set_state(PaymentStates.waiting_for_payment_amount)
+    await asyncio.sleep(0.3)
+    assert await context(storage, 6).get_state() is None
+    await storage.close()
+    storage = await open_storage(path, ttl=0.2)
+    await storage.close()
+    assert row_count(path) == 0
+    print("Стани збігаються з MemoryStorage, переживають перезапуск, TTL та clear() видаляють рядки")
+
+
+async def abandoned_flows(storage, users: int) -> float:
+    """users покинутих діалогів (сума введена, дата не вибрана); повертає секунди"""
+    started = time.perf_counter()
+    for user_id in range(users):
+        state = context(storage, user_id)
+        await state.set_state(PaymentStates.waiting_for_payment_date)
+        await state.update_data(payment_amount=100.0 + user_id)
+    return time.perf_counter() - started
+
+
+async def step_latency(storage, users: int, repeats: int = 2000) -> float:
+    """Середній час кроку діалогу (get_state + get_data + update_data), мкс"""
+    started = time.perf_counter()
+    for i in range(repeats):
+        state = context(storage, i % min(users, 500))
+        await state.get_state()
+        data = await state.get_data()
+        await state.update_data(payment_amount=data.get('payment_amount', 0.0) + 1)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+async def measure(name: str, make_storage, users: int):
+    # Пам'ять і час вимірюються окремо: tracemalloc сповільнює виконання
+    tracemalloc.start()
+    storage = await make_storage('memory')
+    await abandoned_flows(storage, users)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await storage.close()
+
+    storage = await make_storage('time')
+    fill_time = await abandoned_flows(storage, users)
+    latency = await step_latency(storage, users)
+    await storage.close()
+    print(f"{name:18}: пам'ять {memory / 1e6:6.1f} МБ, запис {users} діалогів {fill_time:5.2f} с, "
+          f"крок діалогу {latency:5.0f} мкс")
+
+
+async def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        await check_behaviour(directory)
+
+        async def memory_storage(run: str):
+            return MemoryStorage()
+
+        def sqlite_storage(cache_size: int):
+            return lambda run: open_storage(os.path.join(directory, f'{run}_{cache_size}.db'), cache_size=cache_size)
+
+        await measure("MemoryStorage", memory_storage, users)
+        await measure("SQLite без кешу", sqlite_storage(0), users)
+        await measure("SQLite + кеш 1000", sqlite_storage(1000), users)
+        size = os.path.getsize(os.path.join(directory, 'time_1000.db'))
+        print(f"файл SQLite з {users} станами: {size / 1e6:.1f} МБ "
+              f"(пам'ять - купа Python за tracemalloc, кеш сторінок SQLite обмежений ~2 МБ)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
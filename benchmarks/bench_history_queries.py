@@ -0,0 +1,60 @@
+"""
+Бенчмарк та перевірка кількості запитів get_history
+
+Наповнює FakeSupabase користувачем з великою кількістю платежів за рахунки
+(частина з них - старі записи без car_info) та показує кількість запитів
+і час get_history. Те, що кількість запитів не залежить від кількості
+платежів, перевіряє tests/test_storage.py.
+
+Запуск:
+    python benchmarks/bench_history_queries.py [кількість_платежів] [затримка_мс]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+
+def seed(client: FakeSupabase, user_id: int, payments: int):
+    start = datetime(2024, 1, 1)
+    for i in range(payments):
+        created = (start + timedelta(minutes=2 * i)).isoformat()
+        invoice_id = i + 1
+        client.tables['invoices'].append({
+            'id': invoice_id, 'user_id': user_id, 'car_info': f"2018 TESLA MODEL S #{i}",
+            'amount': 700.0, 'original_text': '= 700 євро', 'date_created': created
+        })
+        payment = {
+            'id': i + 1, 'user_id': user_id, 'amount': 700.0, 'date_paid': '01.01.2024',
+            'date_created': (start + timedelta(minutes=2 * i + 1)).isoformat(),
+            'invoice_id': invoice_id
+        }
+        # Кожен другий платіж - старий запис без збереженого car_info
+        if i % 2 == 0:
+            payment['car_info'] = f"2018 TESLA MODEL S #{i}"
+        client.tables['payments'].append(payment)
+
+
+def main():
+    payments = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+
+    client = FakeSupabase(latency=latency)
+    db = make_database(client)
+    seed(client, user_id=1, payments=payments)
+
+    client.reset_counter()
+    started = time.perf_counter()
+    history = db.get_history(1, limit=payments * 2)
+    elapsed = time.perf_counter() - started
+
+    print(f"Платежів за рахунки: {payments}, затримка запиту: {latency * 1000:.0f} мс, операцій: {len(history)}")
+    print(f"Запитів до БД: {client.request_count} (раніше було б {payments + 2})")
+    print(f"Час get_history: {elapsed * 1000:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
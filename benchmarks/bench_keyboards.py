@@ -0,0 +1,137 @@
+"""
+Бенчмарк створення клавіатур (keyboards.py)
+
+Порівнює попереднє створення клавіатур через InlineKeyboardBuilder при
+кожному натисканні з готовими клавіатурами та календарем з кешу місяців.
+Перевіряє, що тексти кнопок збігаються (callback_data тепер пакує
+callbacks.py, його перевіряє bench_callback_dispatch.py), і показує
+кількість клавіатур за секунду та розмір JSON для Telegram.
+
+Запуск:
+    python benchmarks/bench_keyboards.py [повторів]
+"""
+import calendar
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.types import InlineKeyboardButton  # noqa: E402
+from aiogram.utils.keyboard import InlineKeyboardBuilder  # noqa: E402
+
+import keyboards  # noqa: E402
+from config import MAIN_MENU_BUTTONS, MONTHS_UA, WEEKDAYS_UA  # noqa: E402
+
+
+def legacy_main_menu():
+    """Попередня реалізація keyboards.get_main_menu"""
+    builder = InlineKeyboardBuilder()
+    builder.add(InlineKeyboardButton(text=MAIN_MENU_BUTTONS['new_invoice'], callback_data="menu_add_invoice"))
+    builder.add(InlineKeyboardButton(text=MAIN_MENU_BUTTONS['payment'], callback_data="menu_add_payment"))
+    builder.add(InlineKeyboardButton(text=MAIN_MENU_BUTTONS['balance'], callback_data="menu_balance"))
+    builder.add(InlineKeyboardButton(text=MAIN_MENU_BUTTONS['history'], callback_data="menu_history"))
+    builder.add(InlineKeyboardButton(text=MAIN_MENU_BUTTONS['export'], callback_data="menu_export"))
+    builder.add(InlineKeyboardButton(text="🗑️ Видалити операції", callback_data="delete_operations_menu"))
+    builder.adjust(2, 2, 2)
+    return builder.as_markup()
+
+
+def legacy_calendar(year: int, month: int):
+    """Попередня реалізація keyboards.get_calendar"""
+    now = datetime.now()
+    builder = InlineKeyboardBuilder()
+    builder.add(InlineKeyboardButton(text=f"{MONTHS_UA[month-1]} {year}", callback_data="ignore"))
+    builder.adjust(1)
+
+    prev_month, prev_year = month - 1, year
+    if prev_month == 0:
+        prev_month, prev_year = 12, year - 1
+    next_month, next_year = month + 1, year
+    if next_month == 13:
+        next_month, next_year = 1, year + 1
+    builder.add(
+        InlineKeyboardButton(text="⬅️", callback_data=f"calendar_prev_{prev_year}_{prev_month}"),
+        InlineKeyboardButton(text="➡️", callback_data=f"calendar_next_{next_year}_{next_month}")
+    )
+    builder.adjust(2)
+
+    for day in WEEKDAYS_UA:
+        builder.add(InlineKeyboardButton(text=day, callback_data="ignore"))
+    builder.adjust(7)
+
+    for week in calendar.monthcalendar(year, month):
+        week_buttons = []
+        for day in week:
+            if day == 0:
+                week_buttons.append(InlineKeyboardButton(text=" ", callback_data="ignore"))
+            else:
+                is_today = (day == now.day and month == now.month and year == now.year)
+                week_buttons.append(InlineKeyboardButton(
+                    text=f"[{day}]" if is_today else str(day),
+                    callback_data=f"date_selected_{year}_{month:02d}_{day:02d}"
+                ))
+        builder.row(*week_buttons)
+
+    builder.add(InlineKeyboardButton(text="📅 Сьогодні", callback_data=f"date_selected_{now.strftime('%Y_%m_%d')}"))
+    builder.adjust(1)
+    builder.add(InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu"))
+    builder.adjust(1)
+    return builder.as_markup()
+
+
+def buttons(markup):
+    return [button.text for row in markup.inline_keyboard for button in row]
+
+
+def months_around_today(count: int):
+    """Гортання календаря: count місяців назад від поточного"""
+    now = datetime.now()
+    year, month = now.year, now.month
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months
+
+
+def rate(function, calls):
+    started = time.perf_counter()
+    for args in calls:
+        function(*args)
+    return len(calls) / (time.perf_counter() - started)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    months = months_around_today(12)
+
+    # Тексти кнопок збігаються (розкладка календаря тепер сітка 7 днів)
+    assert buttons(legacy_main_menu()) == buttons(keyboards.get_main_menu())
+    assert legacy_main_menu().inline_keyboard == keyboards.get_main_menu().inline_keyboard
+    for year, month in months + [(2024, 2), (2025, 12), (2026, 1)]:
+        assert buttons(legacy_calendar(year, month)) == buttons(keyboards.get_calendar(year, month)), (year, month)
+    for row in keyboards.get_calendar().inline_keyboard[2:-2]:
+        assert len(row) == 7
+
+    menu_calls = [()] * repeats
+    calendar_calls = months * (repeats // len(months))
+    keyboards._calendar_month_rows.cache_clear()
+
+    results = [
+        ("головне меню", rate(legacy_main_menu, menu_calls), rate(keyboards.get_main_menu, menu_calls)),
+        ("календар", rate(legacy_calendar, calendar_calls), rate(keyboards.get_calendar, calendar_calls)),
+    ]
+    for name, before, after in results:
+        print(f"{name:13}: до {before:10.0f}/с, після {after:12.0f}/с  (x{after / before:.0f})")
+
+    info = keyboards._calendar_month_rows.cache_info()
+    print(f"кеш місяців: влучань {info.hits}, промахів {info.misses}, розмір {info.currsize}/{info.maxsize}")
+    legacy_json = legacy_calendar(*months[0]).model_dump_json(exclude_none=True)
+    cached_json = keyboards.get_calendar(*months[0]).model_dump_json(exclude_none=True)
+    print(f"JSON календаря: {len(legacy_json.encode())} -> {len(cached_json.encode())} байт")
+
+
+if __name__ == "__main__":
+    main()
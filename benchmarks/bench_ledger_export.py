@@ -0,0 +1,129 @@
+"""
+Бенчмарк експорту таблиці операцій у CSV та XLSX
+
+Заповнює SQLite журнал, вимірює час exports.write_csv_export та
+exports.write_xlsx_export і перевіряє вміст: кількість рядків, VIN в
+окремій колонці, ISO дати та баланс після кожної операції - такий самий,
+як в еталонному balance_reference.calculate_balance_for_operations. XLSX
+читається стандартною бібліотекою та, якщо встановлено, openpyxl.
+
+Запуск:
+    python benchmarks/bench_ledger_export.py [кількість_операцій]
+"""
+import asyncio
+import csv
+import logging
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_export import USER_ID, fill  # noqa: E402
+from exports import LEDGER_COLUMNS, LEDGER_NUMERIC_COLUMNS, write_csv_export, write_xlsx_export  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+from balance_reference import calculate_balance_for_operations  # noqa: E402
+
+
+def read_xlsx_rows(data: bytes) -> list:
+    """Читання аркуша XLSX (inline рядки та числа) стандартною бібліотекою"""
+    namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        root = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+
+    rows = []
+    for row in root.iter(f'{namespace}row'):
+        values = []
+        for cell in row:
+            text = cell.find(f'.//{namespace}t')
+            number = cell.find(f'{namespace}v')
+            if text is not None:
+                values.append(text.text)
+            elif number is not None:
+                value = float(number.text)
+                values.append(int(value) if value.is_integer() else value)
+            else:
+                values.append('')
+        rows.append(values)
+
+    numeric = [index for index, name in enumerate(LEDGER_COLUMNS) if name in LEDGER_NUMERIC_COLUMNS]
+    for values in rows[1:]:
+        for index in numeric:
+            assert values[index] == '' or isinstance(values[index], (int, float)), LEDGER_COLUMNS[index]
+    return rows
+
+
+async def timed(writer, db) -> tuple:
+    buffer = BytesIO()
+    started = time.perf_counter()
+    count = await writer(db, USER_ID, buffer)
+    return buffer.getvalue(), count, time.perf_counter() - started
+
+
+def check_rows(rows: list, history: list, balance: float):
+    """Порівняння рядків таблиці з історією та calculate_balance_for_operations"""
+    assert len(rows) == len(history), "кількість рядків"
+    expected_balances = calculate_balance_for_operations(history)
+    column = {name: index for index, name in enumerate(LEDGER_COLUMNS)}
+
+    for row, operation in zip(rows, history):
+        key = f"{row[column['type']]}_{row[column['id']]}"
+        assert abs(float(row[column['balance_after']]) - expected_balances[key]) < 0.005, key
+        assert (row[column['vin']] or '') == (operation.get('vin') or ''), key
+        if row[column['date_paid']]:
+            assert row[column['date_paid']] == '2025-02-01', row[column['date_paid']]
+
+    assert abs(float(rows[-1][column['balance_after']]) - balance) < 0.005, "підсумковий баланс"
+
+
+async def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteDatabase(os.path.join(directory, 'bench.db'))
+        await db.connect()
+        await fill(db, operations)
+
+        started = time.perf_counter()
+        history = [operation async for operation in db.iter_operations(USER_ID, descending=False)]
+        read_time = time.perf_counter() - started
+        # fill додає платежі напряму в таблицю, тому баланс - сума операцій
+        balance = sum(operation['amount'] for operation in history)
+
+        csv_data, csv_count, csv_time = await timed(write_csv_export, db)
+        xlsx_data, xlsx_count, xlsx_time = await timed(write_xlsx_export, db)
+        await db.close()
+
+    assert csv_data.startswith('﻿'.encode('utf-8')), "CSV без BOM"
+    csv_rows = list(csv.reader(StringIO(csv_data.decode('utf-8-sig'))))
+    assert tuple(csv_rows[0]) == LEDGER_COLUMNS, "заголовок CSV"
+    assert csv_count == operations
+    check_rows(csv_rows[1:], history, balance)
+
+    print(f"Операцій: {operations}")
+    print(f"читання історії: {read_time:6.2f} с")
+    print(f"CSV            : {csv_time:6.2f} с, {len(csv_data) / 2 ** 20:5.1f} МБ")
+
+    xlsx_rows = read_xlsx_rows(xlsx_data)
+    assert tuple(xlsx_rows[0]) == LEDGER_COLUMNS, "заголовок XLSX"
+    assert xlsx_count == operations
+    check_rows(xlsx_rows[1:], history, balance)
+    print(f"XLSX           : {xlsx_time:6.2f} с, {len(xlsx_data) / 2 ** 20:5.1f} МБ")
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        return
+    # Додаткова перевірка сторонньою бібліотекою, якщо вона встановлена
+    sheet = load_workbook(BytesIO(xlsx_data), read_only=True).active
+    assert list(sheet.iter_rows(values_only=True))[-1][-1] == xlsx_rows[-1][-1], "openpyxl читає інший файл"
+    print("XLSX відкривається openpyxl")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+Бенчмарк журналу (logging_config.py)
+
+- Час виклику logger.info у потоці циклу подій: попередні синхронні
+  FileHandler + StreamHandler проти черги з потоком запису, зокрема
+  з повільним диском (запис триває 2 мс)
+- Розбір рахунків (parse_amount_from_text + extract_car_info) з
+  записами кожного розбору (DEBUG) та з рівнем utils=WARNING
+- JSON записи хендлера та потоку пулу БД містять user_id і handler
+- Ротація файлу за розміром
+
+Запуск:
+    python benchmarks/bench_logging.py [викликів]
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.types import CallbackQuery, Update, User  # noqa: E402
+
+from async_database import AsyncDatabase  # noqa: E402
+from bench_amount_parser import load_corpus  # noqa: E402
+from callbacks import CallbackRouter  # noqa: E402
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from logging_config import TEXT_FORMAT, LogContextMiddleware, setup_logging, stop_logging  # noqa: E402
+from utils import extract_car_info, parse_amount_from_text  # noqa: E402
+
+logger = logging.getLogger('bench')
+
+
+class SlowDiskHandler(logging.Handler):
+    """Обробник, запис якого триває delay секунд (завантажений або мережевий диск)"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+
+
+def legacy_setup(path: str, extra=None):
+    """Попереднє налаштування: basicConfig з FileHandler та StreamHandler"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    handlers = [logging.FileHandler(path), logging.StreamHandler(open(os.devnull, 'w'))]
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+    if extra is not None:
+        root.addHandler(extra)
+    root.setLevel(logging.INFO)
+
+
+def queued_setup(path: str, extra=None, **kwargs):
+    listener = setup_logging(path, stream=open(os.devnull, 'w'), **kwargs)
+    if extra is not None:
+        listener.handlers += (extra,)
+    return listener
+
+
+def log_cost(calls: int) -> float:
+    """Найгірший і середній час logger.info (мкс) з погляду циклу подій"""
+    worst = 0.0
+    started = time.perf_counter()
+    for i in range(calls):
+        call_started = time.perf_counter()
+        logger.info(f"Рахунок додано для користувача {i}: {700 + i} євро")
+        worst = max(worst, time.perf_counter() - call_started)
+    return (time.perf_counter() - started) / calls * 1e6, worst * 1e6
+
+
+def parse_rate(corpus, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for text in corpus:
+            parse_amount_from_text(text)
+            extract_car_info(text)
+    return repeats * len(corpus) / (time.perf_counter() - started)
+
+
+async def check_context(path: str):
+    """Записи хендлера та потоку пулу БД містять user_id і handler"""
+    queued_setup(path)
+    db = AsyncDatabase(make_database(FakeSupabase()))
+    logging.disable(logging.NOTSET)
+    dp = Dispatcher()
+    router = CallbackRouter()
+    dp.callback_query.register(router.dispatch)
+    dp.callback_query.middleware(LogContextMiddleware(callback_router=router))
+
+    @router.route("menu_payment")
+    async def add_payment_start(callback: CallbackQuery):
+        logger.info("Початок платежу")
+        await db.add_payment(callback.from_user.id, 100.0, "01.02.2025")
+
+    bot = Bot("1:bench")
+    user = User(id=42, is_bot=False, first_name="bench")
+    await dp.feed_update(bot, Update(update_id=1, callback_query=CallbackQuery(
+        id="1", from_user=user, chat_instance="c", data="menu_payment")))
+    logger.info("Поза оновленням")
+    await db.close()
+    await bot.session.close()
+    stop_logging()
+
+    with open(path, encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+    by_message = {record['message']: record for record in records}
+    for message in ("Початок платежу", "Платіж додано для користувача 42: 100.0 євро на 01.02.2025"):
+        record = by_message[message]
+        assert record['user_id'] == 42 and record['handler'] == 'add_payment_start', record
+    assert 'user_id' not in by_message["Поза оновленням"]
+    print(f"Контекст: {len(records)} JSON записів, user_id/handler у записах хендлера та пулу БД")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bot.log')
+
+    for title, extra, count in (("швидкий диск", None, calls), ("повільний диск (2 мс)", 0.002, 200)):
+        legacy_setup(path, SlowDiskHandler(extra) if extra else None)
+        legacy_mean, legacy_worst = log_cost(count)
+        queued_setup(path, SlowDiskHandler(extra) if extra else None)
+        queued_mean, queued_worst = log_cost(count)
+        started = time.perf_counter()
+        stop_logging()
+        drain = time.perf_counter() - started
+        print(f"logger.info, {title}: синхронно {legacy_mean:.1f} мкс (макс. {legacy_worst:.0f}), "
+              f"черга {queued_mean:.1f} мкс (макс. {queued_worst:.0f}); дозапис у фоні {drain * 1000:.0f} мс")
+        if extra:
+            assert queued_mean * 10 < legacy_mean
+
+    # Розбір кожного рахунку з записами DEBUG проти рівня модуля utils=WARNING
+    corpus = load_corpus()
+    queued_setup(path, module_levels='utils=DEBUG')
+    verbose = parse_rate(corpus, 200)
+    stop_logging()
+    queued_setup(path)
+    quiet = parse_rate(corpus, 200)
+    stop_logging()
+    print(f"Розбір рахунків: із записами {verbose:,.0f}/с, utils=WARNING {quiet:,.0f}/с (x{quiet / verbose:.1f})")
+
+    os.remove(path)
+    asyncio.run(check_context(path))
+
+    # Ротація: файл не перевищує max_bytes, старі файли - bot.log.1 ... bot.log.3
+    queued_setup(path, max_bytes=20_000, backup_count=3)
+    log_cost(2000)
+    stop_logging()
+    files = sorted(name for name in os.listdir(directory) if name.startswith('bot.log'))
+    assert files == ['bot.log', 'bot.log.1', 'bot.log.2', 'bot.log.3'], files
+    sizes = [os.path.getsize(os.path.join(directory, name)) for name in files]
+    print(f"Ротація: {', '.join(f'{name} ({size // 1024} КБ)' for name, size in zip(files, sizes))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Бенчмарк метрик /metrics (metrics.py)
+
+- Вартість Histogram.observe та HandlerMetricsMiddleware на оновлення
+  (Dispatcher.feed_update з middleware і без)
+- supabase_call_seconds рахує кожен виклик AsyncDatabase (FakeSupabase)
+- Вивід REGISTRY.render() відповідає текстовому формату Prometheus:
+  HELP/TYPE перед рядками, накопичувальні кошики, +Inf == _count
+
+Запуск:
+    python benchmarks/bench_metrics.py [оновлень]
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.filters import Command  # noqa: E402
+from aiogram.types import CallbackQuery, Message, Update, User, Chat  # noqa: E402
+
+from async_database import AsyncDatabase  # noqa: E402
+from callbacks import CallbackRouter, DeletePageCallback  # noqa: E402
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from metrics import (  # noqa: E402
+    HANDLER_SECONDS, REGISTRY, SUPABASE_CALL_SECONDS, Histogram, HandlerMetricsMiddleware
+)
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (-?[0-9.e+-]+|\+Inf|NaN)$')
+LABELS_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def make_dispatcher(with_metrics: bool) -> Dispatcher:
+    dp = Dispatcher()
+    router = CallbackRouter()
+    dp.callback_query.register(router.dispatch)
+
+    async def cmd_start(message: Message):
+        pass
+
+    dp.message.register(cmd_start, Command("start"))
+
+    @router.route(DeletePageCallback)
+    async def delete_page_navigation(callback: CallbackQuery, callback_data: DeletePageCallback, state):
+        pass
+
+    @router.fallback
+    async def unknown_callback(callback: CallbackQuery):
+        pass
+
+    if with_metrics:
+        dp.message.middleware(HandlerMetricsMiddleware(callback_router=router))
+        dp.callback_query.middleware(HandlerMetricsMiddleware(callback_router=router))
+    return dp
+
+
+def updates():
+    user = User(id=1, is_bot=False, first_name="bench")
+    return [
+        Update(update_id=1, message=Message(message_id=1, date=0, chat=Chat(id=1, type="private"),
+                                            from_user=user, text="/start")),
+        Update(update_id=2, callback_query=CallbackQuery(id="1", from_user=user, chat_instance="c",
+                                                         data=DeletePageCallback(page=2).pack())),
+        Update(update_id=3, callback_query=CallbackQuery(id="2", from_user=user, chat_instance="c", data="old_data")),
+    ]
+
+
+async def feed_cost(dp: Dispatcher, bot: Bot, repeats: int) -> float:
+    batch = updates()
+    started = time.perf_counter()
+    for i in range(repeats):
+        await dp.feed_update(bot, batch[i % len(batch)])
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def check_exposition(text: str):
+    """Перевірка текстового формату Prometheus 0.0.4"""
+    declared = {}
+    histograms = {}
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            continue
+        if line.startswith('# TYPE '):
+            _, _, name, metric_type = line.split(' ')
+            assert name not in declared, name
+            declared[name] = metric_type
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        labels = dict(LABELS_RE.findall(labels or ''))
+        base = re.sub(r'_(bucket|sum|count)$', '', name)
+        assert name in declared or declared.get(base) == 'histogram', line
+        if declared.get(base) == 'histogram' and name != base:
+            key = (base, tuple(sorted((k, v) for k, v in labels.items() if k != 'le')))
+            series = histograms.setdefault(key, {'buckets': [], 'count': None})
+            if name.endswith('_bucket'):
+                series['buckets'].append(float(value))
+            elif name.endswith('_count'):
+                series['count'] = float(value)
+
+    for key, series in histograms.items():
+        buckets = series['buckets']
+        assert buckets == sorted(buckets), key
+        assert buckets[-1] == series['count'], key
+    return len(histograms)
+
+
+async def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    logging.disable(logging.WARNING)
+    bot = Bot("1:bench")
+
+    histogram = Histogram('bench_seconds', 'bench', 'name')
+    started = time.perf_counter()
+    for i in range(200_000):
+        histogram.observe('handler', (i % 1000) / 1000)
+    observe_ns = (time.perf_counter() - started) / 200_000 * 1e9
+    print(f"Histogram.observe: {observe_ns:.0f} нс")
+
+    plain, measured = make_dispatcher(False), make_dispatcher(True)
+    await feed_cost(plain, bot, 300)
+    await feed_cost(measured, bot, 300)
+    before = await feed_cost(plain, bot, repeats)
+    after = await feed_cost(measured, bot, repeats)
+    print(f"feed_update: без метрик {before:.0f} мкс, з HandlerMetricsMiddleware {after:.0f} мкс "
+          f"(+{after - before:.0f} мкс)")
+    for name in ('cmd_start', 'delete_page_navigation', 'unknown_callback'):
+        assert HANDLER_SECONDS.count(name) > 0, name
+
+    # Кожен виклик SupabaseDatabase через AsyncDatabase потрапляє в гістограму
+    db = AsyncDatabase(make_database(FakeSupabase()))
+    await db.add_payment(7, 100.0, "01.02.2025")
+    for _ in range(5):
+        await db.get_balance(7)
+    operations = [operation async for operation in db.iter_operations(7)]
+    await db.close()
+    assert SUPABASE_CALL_SECONDS.count('get_balance') == 5
+    assert SUPABASE_CALL_SECONDS.count('add_payment') == 1
+    assert SUPABASE_CALL_SECONDS.count('iter_operations_batch') == 2, operations
+
+    @REGISTRY.collector
+    async def collect_example():
+        return ['# HELP bot_example Приклад колектора', '# TYPE bot_example gauge', 'bot_example{cache="a\\"b"} 1']
+
+    started = time.perf_counter()
+    text = await REGISTRY.render()
+    render_ms = (time.perf_counter() - started) * 1000
+    series = check_exposition(text)
+    print(f"/metrics: {len(text.encode())} байт, {series} гістограм, збір {render_ms:.2f} мс, формат коректний")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
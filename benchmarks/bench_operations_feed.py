@@ -0,0 +1,95 @@
+"""
+Бенчмарк об'єднаної стрічки операцій (get_operations / iter_operations)
+
+Перевіряє, що:
+- "останні N операцій" читають не більше N рядків з кожної таблиці;
+- потокове читання всієї історії (експорт) читає кожен рядок один раз,
+  в обох напрямках, у правильному порядку, і збігається з SQLite.
+
+Запуск:
+    python benchmarks/bench_operations_feed.py [кількість_операцій]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+from utils import operation_cursor  # noqa: E402
+
+USER_ID = 3
+
+
+def make_rows(operations: int):
+    start = datetime(2021, 6, 1)
+    invoices, payments = [], []
+    for i in range(operations):
+        # Кожна третя операція має ту саму дату, що й попередня
+        created = (start + timedelta(seconds=i - (i % 3 == 2))).isoformat()
+        if i % 2 == 0:
+            invoices.append({'id': i + 1, 'user_id': USER_ID, 'car_info': f"VW GOLF #{i}",
+                             'amount': 300.0, 'original_text': '', 'date_created': created})
+        else:
+            payments.append({'id': i + 1, 'user_id': USER_ID, 'amount': 120.0,
+                             'date_paid': '01.06.2021', 'date_created': created,
+                             'invoice_id': None, 'car_info': None})
+    return invoices, payments
+
+
+async def sqlite_feed(invoices, payments, directory):
+    db = SQLiteDatabase(os.path.join(directory, 'feed.db'))
+    await db.connect()
+    await db._connection.executemany(
+        "INSERT INTO invoices (id, user_id, car_info, amount, original_text, date_created) "
+        "VALUES (:id, :user_id, :car_info, :amount, :original_text, :date_created)", invoices)
+    await db._connection.executemany(
+        "INSERT INTO payments (id, user_id, amount, date_paid, date_created, invoice_id, car_info) "
+        "VALUES (:id, :user_id, :amount, :date_paid, :date_created, :invoice_id, :car_info)", payments)
+    await db._connection.commit()
+    result = {}
+    for descending in (True, False):
+        result[descending] = [operation_cursor(op) async for op in db.iter_operations(USER_ID, 97, descending)]
+    result['latest'] = [operation_cursor(op) for op in await db.get_operations(USER_ID, limit=15)]
+    await db.close()
+    return result
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    invoices, payments = make_rows(operations)
+
+    client = FakeSupabase()
+    client.tables['invoices'] = [dict(r) for r in invoices]
+    client.tables['payments'] = [dict(r) for r in payments]
+    db = make_database(client)
+
+    client.reset_counter()
+    latest = db.get_history(USER_ID, limit=15)
+    assert client.rows_read <= 2 * 15, client.rows_read
+    print(f"Останні 15 операцій: прочитано {client.rows_read} рядків (раніше {operations})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        expected = asyncio.run(sqlite_feed(invoices, payments, directory))
+    assert [operation_cursor(op) for op in latest] == expected['latest']
+
+    for descending in (True, False):
+        client.reset_counter()
+        started = time.perf_counter()
+        keys = [operation_cursor(op) for op in db.iter_operations(USER_ID, batch_size=97, descending=descending)]
+        elapsed = time.perf_counter() - started
+
+        assert keys == sorted(keys, reverse=descending), "порушено порядок"
+        assert len(keys) == operations and client.rows_read == operations, (len(keys), client.rows_read)
+        assert keys == expected[descending], "Supabase та SQLite розходяться"
+        direction = 'новіші спочатку' if descending else 'хронологічно'
+        print(f"Уся історія ({direction}): {operations} операцій, {client.rows_read} рядків, "
+              f"{client.request_count} запитів, {elapsed * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Бенчмарк keyset пагінації get_paginated_history
+
+Для історій різного розміру проходить усі сторінки меню видалення так само,
+як це робить delete_page_navigation (з курсорами та кількістю операцій,
+порахованою при відкритті меню), та перевіряє, що:
+- кожна операція показана рівно один раз і в правильному порядку;
+- кількість рядків, прочитаних з БД на сторінку, не залежить від розміру історії,
+  а підрахунок операцій (count='exact') виконується лише для першої сторінки
+  (час сторінки у FakeSupabase росте лише через повний перебір списку в пам'яті;
+  у Postgres запит обслуговує індекс (user_id, date_created, id));
+- час наступних сторінок SQLite (ті самі індекси) не росте з розміром історії.
+
+Запуск:
+    python benchmarks/bench_pagination.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+from utils import operation_cursor  # noqa: E402
+
+PER_PAGE = 5
+
+
+def seed(client: FakeSupabase, user_id: int, operations: int):
+    start = datetime(2020, 1, 1)
+    for i in range(operations):
+        # Кожна третя пара операцій має однакову дату - перевіряємо розв'язання нічиїх
+        created = (start + timedelta(minutes=i - (i % 3 == 1))).isoformat()
+        if i % 2 == 0:
+            client.tables['invoices'].append({
+                'id': i + 1, 'user_id': user_id, 'car_info': f"AUDI A6 #{i}",
+                'amount': 500.0, 'original_text': '', 'date_created': created
+            })
+        else:
+            client.tables['payments'].append({
+                'id': i + 1, 'user_id': user_id, 'amount': 250.0,
+                'date_paid': '01.01.2020', 'date_created': created
+            })
+
+
+def walk_pages(db, client, user_id: int):
+    cursors, total, counted = {}, None, 0
+    page, seen, rows_per_page, elapsed = 1, [], [], 0.0
+    while True:
+        client.reset_counter()
+        started = time.perf_counter()
+        operations, total_count, total_pages = db.get_paginated_history(
+            user_id, page=page, per_page=PER_PAGE, cursor=cursors.get(str(page)), total_count=total
+        )
+        elapsed += time.perf_counter() - started
+        total = total_count
+        if page > 1:
+            # Перша сторінка рахує операції (один раз на відкриття меню)
+            rows_per_page.append(client.rows_read)
+            counted += client.count_requests
+        seen.extend(operations)
+        if page >= total_pages:
+            assert counted == 0, f"{counted} запитів з підрахунком після першої сторінки"
+            return seen, total_count, max(rows_per_page, default=0), elapsed / page
+        cursors[str(page + 1)] = operation_cursor(operations[-1])
+        page += 1
+
+
+async def sqlite_page_time(size: int) -> float:
+    """Середній час сторінок після першої в SQLite, мс"""
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLiteDatabase(os.path.join(directory, 'bench.db'))
+        await db.connect()
+        invoices = [{'car_info': f"AUDI A6 #{i}", 'amount': 500.0, 'original_text': ''} for i in range(size)]
+        await db.add_invoices(1, invoices)
+
+        operations, total, total_pages = await db.get_paginated_history(1, 1, PER_PAGE)
+        pages = min(total_pages, 50)
+        started = time.perf_counter()
+        for page in range(2, pages + 1):
+            operations, _, _ = await db.get_paginated_history(
+                1, page, PER_PAGE, operation_cursor(operations[-1]), total
+            )
+        elapsed = (time.perf_counter() - started) / (pages - 1) * 1000
+        await db.close()
+        return elapsed
+
+
+def main():
+    for size in (10, 1000, 5000):
+        client = FakeSupabase()
+        db = make_database(client)
+        seed(client, user_id=1, operations=size)
+
+        seen, total_count, max_rows, avg_page = walk_pages(db, client, 1)
+
+        keys = [operation_cursor(op) for op in seen]
+        assert total_count == size, (total_count, size)
+        assert len(seen) == size, f"показано {len(seen)} з {size} операцій"
+        assert len({(k[1], k[2]) for k in keys}) == size, "операції дублюються"
+        assert keys == sorted(keys, reverse=True), "порушено порядок операцій"
+        assert max_rows <= 2 * PER_PAGE, f"прочитано {max_rows} рядків на сторінку"
+
+        print(f"Операцій: {size:6d} | рядків з БД на сторінку: {max_rows:3d} | "
+              f"середній час сторінки: {avg_page * 1000:.2f} мс | "
+              f"SQLite: {asyncio.run(sqlite_page_time(size)):.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Бенчмарк профілювання оновлень (profiling.py)
+
+- Вартість ProfilingMiddleware + ApiPhaseMiddleware на оновлення
+  (Dispatcher.feed_update з ними і без)
+- Журнал повільного оновлення: розбивка на БД, рендер і Telegram API
+  відповідає затримкам фейкової бази та фейкового Bot API
+- SamplingProfiler записує файл folded stacks для N оновлень,
+  у якому видно функцію рендеру
+
+Запуск:
+    python benchmarks/bench_profiling.py [оновлень]
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.types import CallbackQuery, Update, User  # noqa: E402
+
+from callbacks import CallbackRouter  # noqa: E402
+from profiling import (  # noqa: E402
+    ApiPhaseMiddleware, ProfiledDatabase, ProfilingMiddleware, SamplingProfiler, render_phase
+)
+import utils  # noqa: E402
+
+# Як у main.py: форматування у фазі 'render'
+format_operation_summary = render_phase(utils.format_operation_summary)
+
+OPERATIONS = [
+    {'type': 'invoice', 'id': i, 'amount': -700.0 - i, 'date': '2025-02-01T10:00:00',
+     'car_info': f'BMW X5 | VIN: WBAFG4106XLN{i:05d}'}
+    for i in range(15)
+]
+
+
+class FakeSession(BaseSession):
+    """Сесія бота без мережі: кожен запит триває latency секунд"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(self.latency)
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class FakeStorage:
+    """Сховище з затримкою запиту latency секунд"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def get_history(self, user_id: int, limit: int = 50):
+        await asyncio.sleep(self.latency)
+        return OPERATIONS[:limit]
+
+    async def get_balance(self, user_id: int) -> float:
+        await asyncio.sleep(self.latency)
+        return -10650.0
+
+
+def make_dispatcher(db, profiled: bool, sampler=None, render_repeats: int = 1,
+                    slow_threshold: float = 1.0, operations: int = 15) -> Dispatcher:
+    dp = Dispatcher()
+    router = CallbackRouter()
+    dp.callback_query.register(router.dispatch)
+
+    # Як show_history: два запити паралельно, рендер, відповідь через Bot API
+    @router.route("menu_history")
+    async def show_history(callback: CallbackQuery):
+        history, balance = await asyncio.gather(db.get_history(callback.from_user.id, operations), db.get_balance(1))
+        for _ in range(render_repeats):
+            text = "\n\n".join(format_operation_summary(operation) for operation in history)
+        await callback.answer(text[:10])
+
+    if profiled:
+        dp.callback_query.middleware(ProfilingMiddleware(slow_threshold, sampler, callback_router=router))
+    return dp
+
+
+def make_bot(api_latency: float, profiled: bool) -> Bot:
+    bot = Bot("1:bench", session=FakeSession(api_latency))
+    if profiled:
+        bot.session.middleware(ApiPhaseMiddleware())
+    return bot
+
+
+def update(update_id: int) -> Update:
+    user = User(id=1, is_bot=False, first_name="bench")
+    return Update(update_id=update_id, callback_query=CallbackQuery(
+        id=str(update_id), from_user=user, chat_instance="c", data="menu_history"))
+
+
+async def feed_cost(dp: Dispatcher, bot: Bot, repeats: int) -> float:
+    started = time.perf_counter()
+    for i in range(repeats):
+        await dp.feed_update(bot, update(i))
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+async def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    logging.getLogger('aiogram').setLevel(logging.ERROR)
+
+    # Накладні витрати без затримок і з однією операцією: лише middleware та обгортки фаз
+    plain = make_dispatcher(FakeStorage(0), False, operations=1)
+    measured = make_dispatcher(ProfiledDatabase(FakeStorage(0)), True, operations=1)
+    plain_bot, measured_bot = make_bot(0, False), make_bot(0, True)
+    await feed_cost(plain, plain_bot, 300)
+    await feed_cost(measured, measured_bot, 300)
+    # Найкращий з п'яти чергованих замірів (менше впливу шуму)
+    before, after = float('inf'), float('inf')
+    for _ in range(5):
+        before = min(before, await feed_cost(plain, plain_bot, repeats // 5))
+        after = min(after, await feed_cost(measured, measured_bot, repeats // 5))
+    print(f"feed_update: без профілювання {before:.0f} мкс, з ProfilingMiddleware {after:.0f} мкс "
+          f"({after - before:+.0f} мкс, {(after - before) / before:+.1%})")
+
+    # Повільне оновлення: БД 60 мс (два паралельні запити), Bot API 20 мс
+    records = Records()
+    logging.getLogger('profiling').addHandler(records)
+    slow = make_dispatcher(ProfiledDatabase(FakeStorage(0.06)), True, slow_threshold=0.05)
+    await slow.feed_update(make_bot(0.02, True), update(1))
+    assert len(records.messages) == 1, records.messages
+    message = records.messages[0]
+    print(f"Журнал: {message}")
+    phases = {name: (float(seconds), int(calls)) for name, seconds, calls in
+              re.findall(r'(БД|рендер|Telegram API) ([0-9.]+) с \((\d+)\)', message)}
+    assert 'show_history' in message
+    assert 0.055 <= phases['БД'][0] < 0.1 and phases['БД'][1] == 2, phases
+    assert 0.018 <= phases['Telegram API'][0] < 0.05 and phases['Telegram API'][1] == 1, phases
+    assert phases['рендер'][1] == 15, phases
+
+    # Профілювання на вимогу: 20 оновлень з важким рендером
+    with tempfile.TemporaryDirectory() as directory:
+        sampler = SamplingProfiler(directory)
+        dp = make_dispatcher(ProfiledDatabase(FakeStorage(0.001)), True, sampler, render_repeats=200)
+        bot = make_bot(0.001, True)
+        path = sampler.start(20)
+        assert sampler.start(5) is None
+        await asyncio.gather(*(dp.feed_update(bot, update(i)) for i in range(25)))
+        assert not sampler.active and os.path.exists(path)
+        with open(path, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        samples = sum(int(line.rsplit(' ', 1)[1]) for line in lines)
+        rendering = sum(int(line.rsplit(' ', 1)[1]) for line in lines if 'format_operation_summary' in line)
+        print(f"Профіль: {len(lines)} стеків, {samples} знімків, рендер у {rendering / samples:.0%}")
+        assert rendering > 0
+
+    await plain_bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+"""
+Бенчмарк збереженого балансу після операції (balance_after)
+
+- Міграція старого файлу SQLite: balance_after збігається з
+  еталонним перерахунком історії (balance_reference.py)
+- Видалення старої операції змінює лише суфікс стрічки після неї
+- Баланс на дату: пошук за індексом проти сканування історії (SQLite) та
+  прочитані рядки Supabase (FakeSupabase) з тригерами та без міграції
+
+Запуск:
+    python benchmarks/bench_running_balance.py [кількість_операцій]
+"""
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balance_reference import calculate_balance_for_operations  # noqa: E402
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from sqlite_database import SQLiteDatabase  # noqa: E402
+from utils import next_day_iso  # noqa: E402
+
+USER_ID = 7
+
+# Схема до появи balance_after
+OLD_SCHEMA = """
+CREATE TABLE invoices (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, car_info TEXT NOT NULL,
+                       amount REAL NOT NULL, original_text TEXT NOT NULL, date_created TEXT NOT NULL,
+                       car_model TEXT, vin TEXT);
+CREATE TABLE payments (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, amount REAL NOT NULL,
+                       date_paid TEXT NOT NULL, date_created TEXT NOT NULL, invoice_id INTEGER, car_info TEXT,
+                       car_model TEXT, vin TEXT);
+"""
+
+
+def ledger_rows(operations: int, seed: int = 7):
+    """Рахунки та платежі, рівномірно розподілені з 2020 року (кожні 2 години)"""
+    rng = random.Random(seed)
+    started = datetime(2020, 1, 1)
+    invoices, payments = [], []
+    for i in range(operations):
+        date_created = (started + timedelta(hours=2 * i)).isoformat()
+        if rng.random() < 0.5:
+            invoices.append((USER_ID, f"2019 BMW X5 WBAKR0105K0{i:06d}", float(rng.randint(500, 1500)),
+                             "= 900 євро", date_created))
+        else:
+            payments.append((USER_ID, float(rng.randint(100, 1500)), "01.02.2025", date_created))
+    return invoices, payments
+
+
+def create_old_file(path: str, operations: int):
+    invoices, payments = ledger_rows(operations)
+    connection = sqlite3.connect(path)
+    connection.executescript(OLD_SCHEMA)
+    connection.executemany(
+        "INSERT INTO invoices (user_id, car_info, amount, original_text, date_created) VALUES (?, ?, ?, ?, ?)",
+        invoices
+    )
+    connection.executemany(
+        "INSERT INTO payments (user_id, amount, date_paid, date_created) VALUES (?, ?, ?, ?)",
+        payments
+    )
+    connection.commit()
+    connection.close()
+
+
+async def check_running_balances(db) -> list:
+    """balance_after кожної операції дорівнює префіксній сумі"""
+    history = [operation async for operation in db.iter_operations(USER_ID, descending=False)]
+    expected = calculate_balance_for_operations(history)
+    for operation in history:
+        key = f"{operation['type']}_{operation['id']}"
+        assert abs(operation['balance_after'] - expected[key]) < 0.005, key
+    return history
+
+
+async def scan_balance_on_date(db, day: str) -> float:
+    """Баланс на дату без balance_after: сума всіх операцій до кінця дня"""
+    before = next_day_iso(day)
+    balance = 0.0
+    async for operation in db.iter_operations(USER_ID, descending=False):
+        if operation['date'] >= before:
+            break
+        balance += operation['amount']
+    return balance
+
+
+async def bench_sqlite(directory: str, operations: int):
+    path = os.path.join(directory, 'old.db')
+    create_old_file(path, operations)
+
+    db = SQLiteDatabase(path)
+    started = time.perf_counter()
+    await db.connect()
+    migrate_time = time.perf_counter() - started
+    history = await check_running_balances(db)
+    print(f"SQLite: міграція {operations} операцій: {migrate_time:.2f} с, balance_after = префіксні суми")
+
+    # Видалення операції на 90% стрічки: оновлюється лише хвіст після неї
+    victim = history[int(len(history) * 0.9)]
+    suffix = len(history) - int(len(history) * 0.9) - 1
+    changes_before = db._connection.total_changes
+    if victim['type'] == 'invoice':
+        await db.delete_invoice_by_id(USER_ID, victim['id'])
+    else:
+        await db.delete_payment_by_id(USER_ID, victim['id'])
+    changed = db._connection.total_changes - changes_before
+    history = await check_running_balances(db)
+    # Рядки суфікса + видалений рядок + рядок balance
+    assert changed == suffix + 2, (changed, suffix)
+    print(f"видалення операції: оновлено {suffix} з {len(history)} рядків (лише суфікс)")
+
+    # Нова операція через API продовжує стрічку
+    await db.add_payment(USER_ID, 123.0, "01.02.2025")
+    await check_running_balances(db)
+
+    rng = random.Random(1)
+    first = datetime.fromisoformat(history[0]['date']).date()
+    days = [(first + timedelta(days=rng.randint(0, operations // 12))).isoformat() for _ in range(200)]
+
+    started = time.perf_counter()
+    indexed = [await db.get_balance_on_date(USER_ID, day) for day in days]
+    indexed_time = (time.perf_counter() - started) / len(days)
+
+    scan_days = days[:20]
+    started = time.perf_counter()
+    scanned = [await scan_balance_on_date(db, day) for day in scan_days]
+    scan_time = (time.perf_counter() - started) / len(scan_days)
+
+    for day, expected, actual in zip(scan_days, scanned, indexed):
+        assert abs(expected - actual) < 0.005, day
+    print(f"баланс на дату: індекс {indexed_time * 1000:.3f} мс, сканування історії {scan_time * 1000:.1f} мс")
+    await db.close()
+
+
+async def bench_supabase(operations: int):
+    answers = {}
+    for triggers in (True, False):
+        client = FakeSupabase(ledger_triggers=triggers)
+        db = make_database(client)
+        invoices, payments = ledger_rows(operations)
+        # Рядки вставляються в хронологічному порядку, як їх створював бот
+        rows = sorted(
+            [('invoices', {'user_id': u, 'car_info': c, 'amount': a, 'original_text': t, 'date_created': d})
+             for u, c, a, t, d in invoices] +
+            [('payments', {'user_id': u, 'amount': a, 'date_paid': p, 'date_created': d})
+             for u, a, p, d in payments],
+            key=lambda item: item[1]['date_created']
+        )
+        for table, row in rows:
+            client.table(table).insert(row).execute()
+
+        day = datetime.fromisoformat(rows[len(rows) // 2][1]['date_created']).date().isoformat()
+        client.reset_counter()
+        answers[triggers] = (db.get_balance_on_date(USER_ID, day), client.request_count, client.rows_read)
+
+    assert abs(answers[True][0] - answers[False][0]) < 0.005, answers
+    print(f"Supabase баланс на дату: з тригерами {answers[True][1]} запити / {answers[True][2]} рядки, "
+          f"без міграції {answers[False][1]} запитів / {answers[False][2]} рядків")
+
+
+async def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        await bench_sqlite(directory, operations)
+    await bench_supabase(min(operations, 2000))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Бенчмарк холодного старту: час до першого обробленого оновлення
+
+Запускає `python main.py` (як Procfile) окремим процесом проти
+локального фейкового сервера, який відповідає і як Bot API
+(BOT_API_URL), і як PostgREST Supabase (SUPABASE_URL), з затримкою
+мережі на кожен запит. Оновлення (/start та натискання «Баланс»)
+вже чекають у черзі Telegram, як після перезапуску dyno. Фіксується
+час від запуску процесу до:
+
+- першого запиту до Bot API (інтерпретатор та імпорти)
+- першого getUpdates (бот готовий отримувати оновлення)
+- відповіді на /start (sendMessage) та на «Баланс» (editMessageText,
+  потребує запиту до Supabase)
+
+Запуск:
+    python benchmarks/bench_startup.py [запусків] [затримка_мс]
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USER = {'id': 42, 'is_bot': False, 'first_name': 'bench'}
+CHAT = {'id': 42, 'type': 'private'}
+MENU_MESSAGE = {'message_id': 1, 'date': 0, 'chat': CHAT, 'text': 'menu'}
+
+# Оновлення, що надійшли під час перезапуску
+PENDING_UPDATES = [
+    {'update_id': 1, 'message': {'message_id': 2, 'date': 0, 'chat': CHAT, 'from': USER, 'text': '/start',
+                                 'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}]}},
+    {'update_id': 2, 'callback_query': {'id': '1', 'from': USER, 'chat_instance': 'c',
+                                        'message': MENU_MESSAGE, 'data': 'menu_balance'}},
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeServer:
+    """Bot API та PostgREST з затримкою rtt на кожен запит; час подій від запуску процесу"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.started = 0.0
+        self.events = {}
+        self.pending = list(PENDING_UPDATES)
+        self.done = asyncio.Event()
+
+    def mark(self, name: str):
+        self.events.setdefault(name, time.perf_counter() - self.started)
+
+    async def bot_api(self, request):
+        await request.read()
+        method = request.match_info['method']
+        self.mark('bot_api')
+        await asyncio.sleep(self.rtt)
+        result = True
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'bench', 'username': 'bench_bot'}
+        elif method == 'getUpdates':
+            self.mark('get_updates')
+            result, self.pending = self.pending, []
+            if not result:
+                await asyncio.sleep(0.5)
+        elif method in ('sendMessage', 'editMessageText'):
+            self.mark(method)
+            result = MENU_MESSAGE
+            if 'sendMessage' in self.events and 'editMessageText' in self.events:
+                self.done.set()
+        return web.json_response({'ok': True, 'result': result})
+
+    async def postgrest(self, request):
+        await request.read()
+        self.mark('supabase')
+        await asyncio.sleep(self.rtt)
+        return web.json_response([])
+
+
+async def run_once(rtt: float) -> dict:
+    server = FakeServer(rtt)
+    app = web.Application()
+    app.router.add_route('*', '/bot{token}/{method}', server.bot_api)
+    app.router.add_route('*', '/rest/v1/{table}', server.postgrest)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    port = free_port()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            BOT_TOKEN='1:bench',
+            BOT_API_URL=f'http://127.0.0.1:{port}',
+            SUPABASE_URL=f'http://127.0.0.1:{port}',
+            SUPABASE_KEY='bench.bench.bench',
+            STORAGE_BACKEND='supabase',
+            PORT=str(free_port()),
+            LOG_FILE=os.path.join(directory, 'bot.log'),
+            FSM_DATABASE_NAME=os.path.join(directory, 'fsm_states.db'),
+        )
+        server.started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(ROOT, 'main.py'), cwd=directory, env=env,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            await asyncio.wait_for(server.done.wait(), 60)
+            # Відповідь на останній запит має дійти до бота до зупинки
+            await asyncio.sleep(rtt + 0.1)
+        finally:
+            process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+    await runner.cleanup()
+    return server.events
+
+
+async def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+
+    results = [await run_once(rtt) for _ in range(runs)]
+    labels = {
+        'bot_api': 'перший запит до Bot API',
+        'supabase': 'перший запит до Supabase',
+        'get_updates': 'перший getUpdates',
+        'sendMessage': 'відповідь на /start',
+        'editMessageText': 'відповідь на «Баланс»',
+    }
+    print(f"Запусків: {runs}, затримка мережі: {rtt * 1000:.0f} мс (медіана, с від запуску процесу)")
+    for key, label in labels.items():
+        values = [events[key] for events in results if key in events]
+        print(f"  {label:26s} {statistics.median(values):6.2f}")
+    print(json.dumps({key: round(statistics.median(events[key] for events in results), 3) for key in labels}))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Бенчмарк локального сховища SQLite
+
+Виконує послідовність операцій тестів сумісності на локальному SQLite та
+показує середню затримку запису та читання. Збіг історії, балансу,
+сторінок меню видалення та пошуку за VIN із Supabase (FakeSupabase)
+перевіряє tests/test_storage.py.
+
+Запуск:
+    python benchmarks/bench_storage_backends.py [кількість_операцій]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_database import SQLiteDatabase  # noqa: E402
+
+USER_ID = 7
+
+
+async def workload(db, operations: int):
+    for i in range(operations):
+        if i % 3 == 0:
+            await db.add_invoice(USER_ID, f"2019 BMW X5 WBAKR0105K0{i:06d}", 900.0 + i, "= 900 євро")
+        elif i % 3 == 1:
+            invoices = await db.get_recent_invoices(USER_ID, limit=1)
+            await db.add_payment_for_invoice(USER_ID, invoices[0]['id'], 400.0, "01.02.2025")
+        else:
+            await db.add_payment(USER_ID, 100.0, "02.02.2025")
+    history = await db.get_history(USER_ID, limit=3)
+    await db.delete_invoice_by_id(USER_ID, next(op['id'] for op in history if op['type'] == 'invoice'))
+    await db.delete_last_operation(USER_ID)
+
+
+async def timed(db, operations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(operations):
+        await db.get_balance(USER_ID)
+        await db.get_history(USER_ID, limit=15)
+    return (time.perf_counter() - started) / (operations * 2)
+
+
+async def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_db = SQLiteDatabase(os.path.join(directory, 'bench.db'))
+        await sqlite_db.connect()
+
+        started = time.perf_counter()
+        await workload(sqlite_db, operations)
+        write_latency = (time.perf_counter() - started) / operations
+
+        read_latency = await timed(sqlite_db, 500)
+        history = await sqlite_db.get_history(USER_ID, limit=operations * 2)
+        balance = await sqlite_db.get_balance(USER_ID)
+        await sqlite_db.close()
+
+    print(f"Операцій: {operations}, операцій в історії: {len(history)}, баланс: {balance:.2f}")
+    print(f"SQLite запис: {write_latency * 1000:.3f} мс/операцію, читання: {read_latency * 1000:.3f} мс/запит")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Стрес-тест черги записів користувача (AsyncDatabase + UserLocks)
+
+- Сотні одночасних платежів одного користувача на базі без
+  adjust_balance (SELECT + UPDATE балансу): скільки оновлень втрачається
+  без lock і скільки часу займають записи з ним
+- Користувачі не чекають один на одного: N користувачів записують
+  приблизно за той самий час, що й один
+
+Точний баланс, одноразове повернення суми при подвійному видаленні та
+порожній реєстр lock перевіряє tests/test_user_locks.py.
+
+Запуск:
+    python benchmarks/bench_user_locks.py [платежів] [затримка_мс]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+
+from async_database import AsyncDatabase  # noqa: E402
+
+DATE = '01.02.2025'
+
+
+def make_async_database(latency: float) -> AsyncDatabase:
+    database = make_database(FakeSupabase(latency=latency))
+    # База без міграції: баланс змінюється через SELECT + UPDATE
+    database._balance_rpc_available = False
+    return AsyncDatabase(database)
+
+
+async def pay_all(db: AsyncDatabase, users: int, payments: int, locked: bool = True) -> float:
+    """Одночасні платежі по 1 євро: payments на кожного з users користувачів"""
+    if locked:
+        pay = db.add_payment
+    else:
+        # Попередня поведінка: виклик у пулі потоків без черги користувача
+        async def pay(user_id, amount, date_paid):
+            return await db._run(db.database.add_payment, user_id, amount, date_paid)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        pay(user_id, 1.0, DATE) for _ in range(payments) for user_id in range(1, users + 1)
+    ))
+    elapsed = time.perf_counter() - started
+    assert None not in results
+    return elapsed
+
+
+async def main():
+    payments = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 1.0) / 1000
+    print(f"Платежів: {payments}, затримка запиту: {latency * 1000:.0f} мс, потоків БД: 8")
+
+    # Один користувач, сотні одночасних платежів
+    for locked in (False, True):
+        db = make_async_database(latency)
+        elapsed = await pay_all(db, 1, payments, locked)
+        balance = await db.get_balance(1)
+        print(f"  {'з lock ' if locked else 'без lock'} | баланс: {balance:.0f}/{payments} "
+              f"(втрачено {payments - balance:.0f}) | {elapsed:.2f} с")
+        await db.close()
+
+    # Паралельність між користувачами: 8 користувачів проти одного
+    per_user = max(payments // 10, 10)
+    db = make_async_database(latency)
+    single = await pay_all(db, 1, per_user)
+    await db.close()
+    db = make_async_database(latency)
+    parallel = await pay_all(db, 8, per_user)
+    await db.close()
+    print(f"{per_user} платежів на користувача: 1 користувач {single:.2f} с, 8 користувачів {parallel:.2f} с "
+          f"(x{parallel / single:.1f} часу, x8 записів)")
+    assert parallel < single * 4
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
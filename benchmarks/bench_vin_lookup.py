@@ -0,0 +1,92 @@
+"""
+Бенчмарк пошуку операцій за VIN та відображення операцій
+
+Порівнює пошук усіх операцій по одному авто через get_operations_by_vin
+(індекс user_id, vin) з попереднім способом - читанням усієї історії та
+розбором car_info кожного рядка - за кількістю прочитаних рядків, а
+також час форматування історії зі збереженими полями car_model/vin і з
+розбором car_info. Перевіряє контрольні цифри відомих VIN.
+
+Запуск:
+    python benchmarks/bench_vin_lookup.py [кількість_авто]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+from utils import (  # noqa: E402
+    extract_car_model_and_vin, format_operation_summary, is_valid_vin, vin_check_digit
+)
+
+USER_ID = 7
+
+# (VIN, чи правильна контрольна цифра)
+KNOWN_VINS = [
+    ('5XYZUDLA8HG502333', True),
+    ('1M8GDM9AXKP042788', True),
+    ('5YJSA1E22JF272459', True),
+    ('5YJSA1E22JF272454', False),
+    ('WVWZZZ1JZYW123456', False),
+]
+
+
+def make_vin(index: int) -> str:
+    """Синтетичний VIN з правильною контрольною цифрою"""
+    vin = f"1HGCM8263{index:08d}"
+    return vin[:8] + vin_check_digit(vin) + vin[9:]
+
+
+def check_vins():
+    for vin, valid in KNOWN_VINS:
+        assert is_valid_vin(vin) == valid, vin
+    # Європейський VIN без контрольної цифри все одно виділяється з рядка
+    assert extract_car_model_and_vin("VW GOLF WVWZZZ1JZYW123456") == ("VW GOLF", "WVWZZZ1JZYW123456")
+    assert extract_car_model_and_vin("2017HYUNDAI SANTAFE 5XYZUDLA8HG502333") == ("2017HYUNDAI SANTAFE", "5XYZUDLA8HG502333")
+
+
+def main():
+    cars = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    check_vins()
+
+    client = FakeSupabase()
+    db = make_database(client)
+    for index in range(cars):
+        db.add_invoice(USER_ID, f"2019 BMW X5 {make_vin(index)}", 900.0, "= 900 євро")
+        invoice_id = client.tables['invoices'][-1]['id']
+        db.add_payment_for_invoice(USER_ID, invoice_id, 400.0, "01.02.2025")
+
+    target = make_vin(cars // 2)
+
+    client.reset_counter()
+    by_index = db.get_operations_by_vin(USER_ID, target)
+    index_rows = client.rows_read
+
+    client.reset_counter()
+    history = list(db.iter_operations(USER_ID))
+    by_scan = [op for op in history if extract_car_model_and_vin(op.get('car_info', ''))[1] == target]
+    scan_rows = client.rows_read
+
+    assert [op['id'] for op in by_index] == [op['id'] for op in by_scan] and len(by_index) == 2
+
+    started = time.perf_counter()
+    stored = [format_operation_summary(op) for op in history]
+    stored_time = time.perf_counter() - started
+
+    legacy_history = [{k: v for k, v in op.items() if k not in ('car_model', 'vin')} for op in history]
+    started = time.perf_counter()
+    parsed = [format_operation_summary(op) for op in legacy_history]
+    parsed_time = time.perf_counter() - started
+    assert stored == parsed
+
+    print(f"Авто: {cars}, операцій в історії: {len(history)}")
+    print(f"пошук за VIN через індекс : {index_rows} рядків з БД")
+    print(f"пошук розбором історії    : {scan_rows} рядків з БД")
+    print(f"форматування зі збереженими полями: {stored_time * 1000:.2f} мс, "
+          f"з розбором car_info: {parsed_time * 1000:.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Бенчмарк доставки оновлень: long polling проти webhook
+
+Локальний фейковий Bot API (aiohttp) видає оновлення через getUpdates, а
+в режимі webhook ті самі оновлення надсилаються POST-запитом на aiohttp
+застосунок з SimpleRequestHandler, як у main.create_web_app. Затримка -
+від появи оновлення "на сервері Telegram" до входу в хендлер aiogram.
+Мережеву затримку між ботом і Telegram імітує rtt (половина в кожен бік).
+Маршрут webhook у main.create_web_app та перевірку секрету покриває
+tests/test_webhook.py.
+
+Запуск:
+    python benchmarks/bench_webhook.py [оновлень] [rtt_мс ...]
+"""
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler  # noqa: E402
+from aiohttp import ClientSession, web  # noqa: E402
+
+TOKEN = "42:bench"
+API_PORT = 8781
+WEBHOOK_PORT = 8782
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_SECRET = "bench-secret"
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": str(update_id),
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+        },
+    }
+
+
+class FakeTelegram:
+    """Мінімальний Bot API: getMe, getUpdates (long polling), решта методів - ok"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.updates = []
+        self.arrived = asyncio.Condition()
+
+    async def push(self, update: dict):
+        async with self.arrived:
+            self.updates.append(update)
+            self.arrived.notify_all()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        data = await request.post()
+        # Запит іде від бота до Telegram
+        await asyncio.sleep(self.rtt / 2)
+        if method == 'getMe':
+            result = {"id": 42, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        elif method == 'getUpdates':
+            offset = int(data.get('offset') or 0)
+            timeout = float(data.get('timeout') or 0)
+            async with self.arrived:
+                self.updates = [update for update in self.updates if update['update_id'] >= offset]
+                if not self.updates and timeout:
+                    try:
+                        await asyncio.wait_for(self.arrived.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                result = list(self.updates)
+        else:
+            result = True
+        # Відповідь іде від Telegram до бота
+        await asyncio.sleep(self.rtt / 2)
+        return web.json_response({"ok": True, "result": result})
+
+
+async def start_site(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+def make_dispatcher(started: dict, latencies: dict, done: asyncio.Event, total: int) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def record(message: Message):
+        update_id = int(message.text)
+        latencies[update_id] = time.perf_counter() - started[update_id]
+        if len(latencies) == total:
+            done.set()
+
+    return dp
+
+
+def arrivals(total: int, seed: int = 3):
+    """Інтервали між оновленнями: поодинокі (200 мс) та пачки (в середньому 10 мс)"""
+    rng = random.Random(seed)
+    return [0.2 if i % 20 == 0 else rng.expovariate(100) for i in range(total)]
+
+
+async def run_polling(total: int, rtt: float) -> list:
+    telegram = FakeTelegram(rtt)
+    api = web.Application()
+    api.router.add_route('POST', '/bot{token}/{method}', telegram.handle)
+    api_runner = await start_site(api, API_PORT)
+
+    started, latencies, done = {}, {}, asyncio.Event()
+    dp = make_dispatcher(started, latencies, done, total)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")))
+    polling = asyncio.create_task(dp.start_polling(bot, polling_timeout=10, handle_signals=False))
+    await asyncio.sleep(0.5 + rtt)
+
+    for update_id, delay in enumerate(arrivals(total), 1):
+        await asyncio.sleep(delay)
+        started[update_id] = time.perf_counter()
+        await telegram.push(make_update(update_id))
+    await asyncio.wait_for(done.wait(), 30)
+
+    await dp.stop_polling()
+    await polling
+    await bot.session.close()
+    await api_runner.cleanup()
+    return [latencies[update_id] for update_id in sorted(latencies)]
+
+
+async def run_webhook(total: int, rtt: float) -> list:
+    started, latencies, done = {}, {}, asyncio.Event()
+    dp = make_dispatcher(started, latencies, done, total)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{API_PORT}")))
+
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET).register(app, path=WEBHOOK_PATH)
+    runner = await start_site(app, WEBHOOK_PORT)
+
+    async with ClientSession() as session:
+        url = f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}"
+        headers = {"X-Telegram-Bot-Api-Secret-Token": WEBHOOK_SECRET}
+
+        async def deliver(update_id: int):
+            # Telegram надсилає кожне оновлення окремим запитом
+            await asyncio.sleep(rtt / 2)
+            async with session.post(url, json=make_update(update_id), headers=headers) as response:
+                assert response.status == 200
+
+        deliveries = []
+        for update_id, delay in enumerate(arrivals(total), 1):
+            await asyncio.sleep(delay)
+            started[update_id] = time.perf_counter()
+            deliveries.append(asyncio.create_task(deliver(update_id)))
+        await asyncio.gather(*deliveries)
+        await asyncio.wait_for(done.wait(), 30)
+
+    await runner.cleanup()
+    await bot.session.close()
+    return [latencies[update_id] for update_id in sorted(latencies)]
+
+
+def summary(latencies: list) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return (f"медіана {statistics.median(ordered) * 1000:6.1f} мс, p95 {p95 * 1000:6.1f} мс, "
+            f"макс {ordered[-1] * 1000:6.1f} мс")
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rtts = [float(value) / 1000 for value in sys.argv[2:]] or [0.0, 0.06]
+    logging.disable(logging.WARNING)
+
+    for rtt in rtts:
+        polling = await run_polling(total, rtt)
+        webhook = await run_webhook(total, rtt)
+        assert len(polling) == len(webhook) == total
+        print(f"rtt {rtt * 1000:3.0f} мс, оновлень {total}")
+        print(f"  long polling: {summary(polling)}")
+        print(f"  webhook     : {summary(webhook)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,341 @@
+"""
+In-memory імітація клієнта Supabase (PostgREST) для бенчмарків
+
+Підтримує підмножину API, яку використовує SupabaseDatabase, та рахує
+кількість HTTP запитів (викликів execute/rpc), щоб бенчмарки могли
+перевіряти кількість round trip'ів.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _coerce(value: str, sample):
+    """Приведення значення з рядка фільтра до типу колонки"""
+    if isinstance(sample, bool):
+        return value == 'true'
+    if isinstance(sample, int):
+        return int(value)
+    if isinstance(sample, float):
+        return float(value)
+    return value
+
+
+def _split_top_level(expression: str):
+    """Розбиття виразу or(...) по комах верхнього рівня"""
+    parts, depth, current = [], 0, ''
+    for char in expression:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_condition(expression: str):
+    """Перетворення умови PostgREST (col.op.value, and(...), or(...)) на функцію"""
+    for group, combine in (('and(', all), ('or(', any)):
+        if expression.startswith(group):
+            inner = [_parse_condition(p) for p in _split_top_level(expression[len(group):-1])]
+            return lambda row, inner=inner, combine=combine: combine(c(row) for c in inner)
+    column, op, value = expression.split('.', 2)
+    if len(value) > 1 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return _make_filter(column, op, value)
+
+
+def _make_filter(column: str, op: str, value):
+    def check(row):
+        actual = row.get(column)
+        expected = value
+        if isinstance(value, str) and actual is not None and op != 'in':
+            expected = _coerce(value, actual)
+        if op == 'eq':
+            return actual == expected
+        if op == 'neq':
+            return actual != expected
+        if op == 'is':
+            return actual is None if value in (None, 'null') else actual == value
+        if actual is None:
+            return False
+        if op == 'lt':
+            return actual < expected
+        if op == 'lte':
+            return actual <= expected
+        if op == 'gt':
+            return actual > expected
+        if op == 'gte':
+            return actual >= expected
+        if op == 'in':
+            return actual in value
+        raise ValueError(f"Непідтримуваний оператор: {op}")
+    return check
+
+
+class FakeQuery:
+    """Ланцюжок запиту до однієї таблиці"""
+
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.action = 'select'
+        self.columns = '*'
+        self.count = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.offset = 0
+        self.row_limit = None
+
+    # --- дії ---
+    def select(self, columns: str = '*', count: str = None):
+        self.columns = columns
+        self.count = count
+        return self
+
+    def insert(self, payload):
+        self.action = 'insert'
+        self.payload = payload
+        return self
+
+    def update(self, payload):
+        self.action = 'update'
+        self.payload = payload
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    # --- фільтри ---
+    def eq(self, column, value):
+        self.filters.append(_make_filter(column, 'eq', value))
+        return self
+
+    def neq(self, column, value):
+        self.filters.append(_make_filter(column, 'neq', value))
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(_make_filter(column, 'lt', value))
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(_make_filter(column, 'lte', value))
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(_make_filter(column, 'gt', value))
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(_make_filter(column, 'gte', value))
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(_make_filter(column, 'in', list(values)))
+        return self
+
+    def is_(self, column, value):
+        self.filters.append(_make_filter(column, 'is', value))
+        return self
+
+    def filter(self, column, operator, criteria):
+        self.filters.append(_parse_condition(f"{column}.{operator}.{criteria}"))
+        return self
+
+    def or_(self, expression: str):
+        self.filters.append(_parse_condition(f"or({expression})"))
+        return self
+
+    # --- модифікатори ---
+    def order(self, column, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    def _project(self, row):
+        if self.columns.strip() == '*':
+            return dict(row)
+        names = [c.strip() for c in self.columns.split(',')]
+        return {name: row.get(name) for name in names}
+
+    def execute(self):
+        self.client.request_count += 1
+        self.client.requests.append((self.action, self.table))
+        if self.count:
+            self.client.count_requests += 1
+        if self.client.latency:
+            time.sleep(self.client.latency)
+
+        rows = self.client.tables.setdefault(self.table, [])
+
+        if self.action == 'insert':
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = []
+            for item in payload:
+                row = dict(item)
+                if 'id' not in row and self.table != 'balance':
+                    self.client.sequences[self.table] = self.client.sequences.get(self.table, 0) + 1
+                    row['id'] = self.client.sequences[self.table]
+                if self.client.ledger_triggers and self.table in _LEDGER_TYPES:
+                    _ledger_on_insert(self.client, self.table, row)
+                rows.append(row)
+                inserted.append(dict(row))
+            return SimpleNamespace(data=inserted, count=None)
+
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+
+        if self.action == 'update':
+            for row in matched:
+                row.update(self.payload)
+            return SimpleNamespace(data=[dict(r) for r in matched], count=None)
+
+        if self.action == 'delete':
+            matched_ids = {id(r) for r in matched}
+            self.client.tables[self.table] = [r for r in rows if id(r) not in matched_ids]
+            if self.client.ledger_triggers and self.table in _LEDGER_TYPES:
+                for row in matched:
+                    _ledger_shift(self.client, row['user_id'], _ledger_key(self.table, row),
+                                  -_ledger_delta(self.table, row))
+            return SimpleNamespace(data=[dict(r) for r in matched], count=None)
+
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda r: r.get(column), reverse=desc)
+        total = len(matched)
+        if self.row_limit is not None:
+            matched = matched[self.offset:self.offset + self.row_limit]
+        else:
+            matched = matched[self.offset:]
+        self.client.rows_read += len(matched)
+        return SimpleNamespace(
+            data=[self._project(r) for r in matched],
+            count=total if self.count else None
+        )
+
+
+class FakeRpc:
+    """Виклик збереженої процедури"""
+
+    def __init__(self, client, name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.client.request_count += 1
+        self.client.requests.append(('rpc', self.name))
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        # Збережені процедури Postgres виконуються атомарно
+        with self.client.lock:
+            data = self.client.functions[self.name](self.client, **self.params)
+        return SimpleNamespace(data=data, count=None)
+
+
+def _adjust_balance(client, p_user_id, p_delta):
+    """Аналог функції adjust_balance з supabase_migrations.sql"""
+    for row in client.tables['balance']:
+        if row['user_id'] == p_user_id:
+            row['current_balance'] = float(row['current_balance']) + p_delta
+            return row['current_balance']
+    client.tables['balance'].append({'user_id': p_user_id, 'current_balance': p_delta})
+    return p_delta
+
+
+# Тригери balance_after з supabase_migrations.sql
+_LEDGER_TYPES = {'invoices': 'invoice', 'payments': 'payment'}
+
+
+def _ledger_key(table: str, row: dict):
+    return (row['date_created'], _LEDGER_TYPES[table], row['id'])
+
+
+def _ledger_delta(table: str, row: dict) -> float:
+    return -float(row['amount']) if table == 'invoices' else float(row['amount'])
+
+
+def _ledger_shift(client, user_id, key, delta: float):
+    """Аналог shift_balances_after: зсув операцій після key"""
+    for table in _LEDGER_TYPES:
+        for row in client.tables[table]:
+            if row['user_id'] == user_id and _ledger_key(table, row) > key:
+                row['balance_after'] = (row.get('balance_after') or 0.0) + delta
+
+
+def _ledger_on_insert(client, table: str, row: dict):
+    """Аналог ledger_balance_on_insert: баланс попередньої операції + зміна"""
+    key = _ledger_key(table, row)
+    previous = [
+        (_ledger_key(other, existing), existing.get('balance_after') or 0.0)
+        for other in _LEDGER_TYPES
+        for existing in client.tables[other]
+        if existing['user_id'] == row['user_id'] and _ledger_key(other, existing) < key
+    ]
+    delta = _ledger_delta(table, row)
+    row['balance_after'] = (max(previous)[1] if previous else 0.0) + delta
+    _ledger_shift(client, row['user_id'], key, delta)
+
+
+class FakeSupabase:
+    """Клієнт з таблицями в пам'яті та лічильником запитів"""
+
+    def __init__(self, latency: float = 0.0, ledger_triggers: bool = True):
+        self.tables = {'invoices': [], 'payments': [], 'balance': []}
+        self.sequences = {}
+        self.functions = {'adjust_balance': _adjust_balance}
+        self.lock = threading.Lock()
+        self.latency = latency
+        # False - база без міграції balance_after (колонка не заповнюється)
+        self.ledger_triggers = ledger_triggers
+        self.request_count = 0
+        self.rows_read = 0
+        # Запити з підрахунком рядків (select(count='exact'))
+        self.count_requests = 0
+        self.requests = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None) -> FakeRpc:
+        if name not in self.functions:
+            raise RuntimeError(f"Функцію {name} не знайдено")
+        return FakeRpc(self, name, params or {})
+
+    def reset_counter(self):
+        self.request_count = 0
+        self.rows_read = 0
+        self.count_requests = 0
+        self.requests = []
+
+
+def make_database(client: FakeSupabase = None):
+    """Створення SupabaseDatabase поверх FakeSupabase без мережі"""
+    from supabase_database import SupabaseDatabase
+
+    # INFO логи кожної операції спотворюють вимірювання
+    logging.disable(logging.INFO)
+
+    database = SupabaseDatabase.__new__(SupabaseDatabase)
+    database.supabase = client or FakeSupabase()
+    return database
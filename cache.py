@@ -0,0 +1,182 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+from config import CACHE_MAX_USERS, CACHE_TTL_SECONDS
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Позначка відсутності значення (None - допустиме значення в кеші)
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Кеш з обмеженням за кількістю записів (LRU) та часом життя (TTL)
+
+    Призначений для використання з одного циклу подій, тому без блокувань.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Args:
+            max_size: Максимальна кількість записів
+            ttl: Час життя запису в секундах
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Отримання значення; прострочені записи видаляються"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Запис значення з витісненням найдавніше використаного"""
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        """Видалення запису (інвалідація)"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """Лічильники для підбору розміру кешу"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class CachedDatabase:
+    """
+    Кеш балансу та історії перед асинхронною базою даних
+
+    Баланс оновлюється на місці значенням, яке повертають методи запису,
+    а кешована історія користувача скидається після кожної зміни.
+    Методи без кешування передаються базі даних без змін.
+    """
+
+    def __init__(self, database, max_users: int = CACHE_MAX_USERS, ttl: float = CACHE_TTL_SECONDS):
+        """
+        Args:
+            database: Асинхронна база даних (AsyncDatabase)
+            max_users: Максимальна кількість користувачів у кожному кеші
+            ttl: Час життя запису в секундах
+        """
+        self.database = database
+        self.balance_cache = LRUCache(max_users, ttl)
+        self.history_cache = LRUCache(max_users, ttl)
+        # Лічильник записів: читання, що почалося до запису, не потрапляє в кеш
+        self._generation = 0
+
+    def __getattr__(self, name: str):
+        # Методи без кешування (get_recent_invoices, iter_operations, ...)
+        return getattr(self.database, name)
+
+    def _after_write(self, user_id: int, new_balance: Optional[float]):
+        """Оновлення кешу після зміни даних користувача"""
+        self._generation += 1
+        self.history_cache.pop(user_id)
+        if new_balance is not None:
+            self.balance_cache.set(user_id, new_balance)
+        else:
+            self.balance_cache.pop(user_id)
+
+    async def get_balance(self, user_id: int) -> float:
+        balance = self.balance_cache.get(user_id, _MISSING)
+        if balance is not _MISSING:
+            return balance
+
+        generation = self._generation
+        balance = await self.database.get_balance(user_id)
+        if generation == self._generation:
+            self.balance_cache.set(user_id, balance)
+        return balance
+
+    async def get_history(self, user_id: int, limit: int = 50) -> List[Dict]:
+        cached = self.history_cache.get(user_id)
+        if cached is not None:
+            cached_limit, history = cached
+            # Кешована історія підходить, якщо вона не коротша за запит
+            if cached_limit >= limit or len(history) < cached_limit:
+                return history[:limit]
+
+        generation = self._generation
+        history = await self.database.get_history(user_id, limit)
+        if generation == self._generation:
+            self.history_cache.set(user_id, (limit, history))
+        return history
+
+    async def add_invoice(self, user_id: int, car_info: str, amount: float, original_text: str) -> Optional[float]:
+        new_balance = await self.database.add_invoice(user_id, car_info, amount, original_text)
+        self._after_write(user_id, new_balance)
+        return new_balance
+
+    async def add_invoices(self, user_id: int, invoices: List[Dict]) -> Optional[float]:
+        new_balance = await self.database.add_invoices(user_id, invoices)
+        self._after_write(user_id, new_balance)
+        return new_balance
+
+    async def add_payment(self, user_id: int, amount: float, date_paid: str, invoice_id: int = None) -> Optional[float]:
+        new_balance = await self.database.add_payment(user_id, amount, date_paid, invoice_id)
+        self._after_write(user_id, new_balance)
+        return new_balance
+
+    async def add_payment_for_invoice(self, user_id: int, invoice_id: int, amount: float, date_paid: str) -> Optional[float]:
+        new_balance = await self.database.add_payment_for_invoice(user_id, invoice_id, amount, date_paid)
+        self._after_write(user_id, new_balance)
+        return new_balance
+
+    async def delete_invoice_by_id(self, user_id: int, invoice_id: int) -> Optional[float]:
+        new_balance = await self.database.delete_invoice_by_id(user_id, invoice_id)
+        self._after_write(user_id, new_balance)
+        return new_balance
+
+    async def delete_payment_by_id(self, user_id: int, payment_id: int) -> Optional[float]:
+        new_balance = await self.database.delete_payment_by_id(user_id, payment_id)
+        self._after_write(user_id, new_balance)
+        return new_balance
+
+    async def delete_last_operation(self, user_id: int) -> bool:
+        success = await self.database.delete_last_operation(user_id)
+        self._after_write(user_id, None)
+        return success
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Лічильники влучань/промахів обох кешів"""
+        return {
+            'balance': self.balance_cache.stats(),
+            'history': self.history_cache.stats()
+        }
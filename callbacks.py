@@ -0,0 +1,252 @@
+import asyncio
+import inspect
+import logging
+import re
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple, Type, Union
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.methods import AnswerCallbackQuery
+from aiogram.types import CallbackQuery
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Роздільник полів CallbackData (типовий для aiogram)
+SEPARATOR = ':'
+
+
+# Дані кнопок з полями: префікс і значення через ':' (до 64 байт)
+class CalendarCallback(CallbackData, prefix='cal'):
+    """Перехід календаря на інший місяць"""
+    year: int
+    month: int
+
+
+class DateCallback(CallbackData, prefix='day'):
+    """Вибір дати платежу в календарі"""
+    year: int
+    month: int
+    day: int
+
+
+class InvoiceSelectCallback(CallbackData, prefix='pay'):
+    """Вибір рахунку для платежу (None - платіж на баланс)"""
+    invoice_id: Optional[int] = None
+
+
+class DeletePageCallback(CallbackData, prefix='dpage'):
+    """Сторінка меню видалення операцій"""
+    page: int
+
+
+class DeleteOperationCallback(CallbackData, prefix='del'):
+    """Вибір операції для видалення"""
+    operation_type: str
+    operation_id: int
+
+
+class ConfirmDeleteCallback(CallbackData, prefix='cdel'):
+    """Підтвердження видалення операції"""
+    operation_type: str
+    operation_id: int
+
+
+# Формати callback_data до CallbackData ('calendar_prev_2025_1' тощо). Кнопки
+# з ними лишаються в чатах користувачів після оновлення бота.
+_LEGACY_FORMATS = (
+    (re.compile(r'calendar_(?:prev|next)_(\d+)_(\d+)'),
+     lambda m: CalendarCallback(year=int(m[1]), month=int(m[2]))),
+    (re.compile(r'date_selected_(\d+)_(\d+)_(\d+)'),
+     lambda m: DateCallback(year=int(m[1]), month=int(m[2]), day=int(m[3]))),
+    (re.compile(r'select_invoice_(\d+|balance)'),
+     lambda m: InvoiceSelectCallback(invoice_id=None if m[1] == 'balance' else int(m[1]))),
+    (re.compile(r'delete_page_(\d+)'),
+     lambda m: DeletePageCallback(page=int(m[1]))),
+    (re.compile(r'delete_(invoice|payment)_(\d+)'),
+     lambda m: DeleteOperationCallback(operation_type=m[1], operation_id=int(m[2]))),
+    (re.compile(r'confirm_delete_(invoice|payment)_(\d+)'),
+     lambda m: ConfirmDeleteCallback(operation_type=m[1], operation_id=int(m[2]))),
+)
+
+
+def upgrade_legacy_data(data: str) -> Optional[str]:
+    """
+    Перетворення callback_data старого формату на поточний
+
+    Args:
+        data: callback_data кнопки
+
+    Returns:
+        Optional[str]: callback_data у форматі CallbackData або None, якщо формат невідомий
+    """
+    for pattern, build in _LEGACY_FORMATS:
+        match = pattern.fullmatch(data)
+        if match is not None:
+            return build(match).pack()
+    return None
+
+
+Handler = Callable[..., Awaitable]
+
+
+class CallbackRouter:
+    """
+    Маршрутизація callback-запитів за префіксом callback_data
+
+    aiogram перевіряє фільтри хендлерів по черзі, тому кожен хендлер
+    callback-запитів додає затримку до натискань, що обробляються після нього.
+    Роутер реєструється в диспетчері одним хендлером і знаходить потрібний
+    за префіксом (частина до ':' або весь рядок) одним пошуком у плоскому
+    словнику префіксів; дерева префіксів (trie) немає, бо префікс завжди
+    відомий повністю. Дані кнопок старого формату спершу перетворюються
+    через upgrade_legacy_data. Хендлер отримує вже розібрані поля в
+    аргументі callback_data.
+    """
+
+    def __init__(self):
+        # префікс -> (хендлер, клас CallbackData або None, імена аргументів)
+        self._routes: Dict[str, Tuple[Handler, Optional[Type[CallbackData]], Tuple[str, ...]]] = {}
+        self._fallback: Optional[Handler] = None
+
+    def route(self, *keys: Union[str, Type[CallbackData]]) -> Callable[[Handler], Handler]:
+        """
+        Декоратор реєстрації хендлера
+
+        Args:
+            keys: Точні значення callback_data (без ':') або класи CallbackData
+
+        Returns:
+            Callable: Декоратор, що повертає хендлер без змін
+        """
+        def decorator(handler: Handler) -> Handler:
+            arguments = tuple(inspect.signature(handler).parameters)
+            for key in keys:
+                if isinstance(key, type) and issubclass(key, CallbackData):
+                    prefix, callback_data = key.__prefix__, key
+                else:
+                    if SEPARATOR in key:
+                        raise ValueError(f"Точний callback_data не може містити {SEPARATOR!r}: {key!r}")
+                    prefix, callback_data = key, None
+
+                if prefix in self._routes:
+                    raise ValueError(f"Префікс callback_data {prefix!r} вже зареєстровано")
+                self._routes[prefix] = (handler, callback_data, arguments)
+            return handler
+
+        return decorator
+
+    def fallback(self, handler: Handler) -> Handler:
+        """Декоратор хендлера для невідомих callback_data"""
+        self._fallback = handler
+        return handler
+
+    def _resolve(self, data: Optional[str]):
+        return self._routes.get((data or '').split(SEPARATOR, 1)[0])
+
+    def _resolve_legacy(self, data: str):
+        """Маршрут для callback_data старого формату: (дані в поточному форматі, маршрут)"""
+        upgraded = upgrade_legacy_data(data)
+        if upgraded is None:
+            return data, None
+        return upgraded, self._resolve(upgraded)
+
+    def handler_name(self, data: Optional[str]) -> str:
+        """Назва хендлера для callback_data (для метрик)"""
+        route = self._resolve(data)
+        if route is None and data:
+            route = self._resolve_legacy(data)[1]
+        if route is not None:
+            return route[0].__name__
+        return self._fallback.__name__ if self._fallback is not None else 'unknown'
+
+    async def dispatch(self, callback: CallbackQuery, state: FSMContext):
+        """Хендлер aiogram: пошук маршруту та виклик хендлера з розібраними даними"""
+        data = callback.data or ''
+        route = self._resolve(data)
+        if route is None:
+            # Кнопки, надіслані до переходу на CallbackData
+            data, route = self._resolve_legacy(data)
+        if route is None:
+            return await self._call_fallback(callback, state)
+
+        handler, callback_data, arguments = route
+        kwargs = {}
+        if callback_data is not None:
+            try:
+                kwargs['callback_data'] = callback_data.unpack(data)
+            except (TypeError, ValueError):
+                return await self._call_fallback(callback, state)
+        if 'state' in arguments:
+            kwargs['state'] = state
+
+        return await handler(callback, **kwargs)
+
+    async def _call_fallback(self, callback: CallbackQuery, state: FSMContext):
+        if self._fallback is None:
+            logger.warning(f"Невідомий callback: {callback.data}")
+            return None
+        return await self._fallback(callback)
+
+
+# (ID callback-запиту, чат) оновлення, на яке вже відповів EarlyAnswerMiddleware
+_early_answer: ContextVar[Optional[Tuple[str, int]]] = ContextVar('early_answer', default=None)
+
+
+class EarlyAnswerMiddleware(BaseMiddleware):
+    """
+    Зовнішній middleware callback-запитів: відповідь Telegram до хендлера
+
+    Хендлери викликають callback.answer() після запитів до БД та
+    edit_text, і весь цей час Telegram показує індикатор завантаження
+    на кнопці. answerCallbackQuery надсилається у фоні одразу, тому
+    індикатор зникає через один round trip, а хендлер не чекає на нього.
+    Пізніші callback.answer() хендлера обробляє DeferredAnswerMiddleware.
+    """
+
+    def __init__(self):
+        # Посилання на фонові відповіді (інакше задачу може зібрати GC)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event: CallbackQuery,
+                       data: Dict[str, Any]) -> Optional[Any]:
+        task = asyncio.create_task(self._answer(data['bot'], event.id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        chat_id = event.message.chat.id if event.message else event.from_user.id
+        token = _early_answer.set((event.id, chat_id))
+        try:
+            return await handler(event, data)
+        finally:
+            _early_answer.reset(token)
+
+    @staticmethod
+    async def _answer(bot, callback_query_id: str):
+        try:
+            await bot.answer_callback_query(callback_query_id)
+        except Exception as e:
+            logger.warning(f"Помилка відповіді на callback {callback_query_id}: {e}")
+
+
+class DeferredAnswerMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сесії бота: callback.answer() після ранньої відповіді
+
+    Telegram приймає одну відповідь на callback-запит, тому повторна
+    відповідь без тексту не надсилається, а текст (помилка,
+    попередження) надсилається повідомленням у чат.
+    """
+
+    async def __call__(self, make_request, bot, method):
+        answered = _early_answer.get()
+        if answered is None or not isinstance(method, AnswerCallbackQuery) \
+                or method.callback_query_id != answered[0]:
+            return await make_request(bot, method)
+
+        if method.text:
+            await bot.send_message(answered[1], method.text)
+        return True
@@ -7,12 +7,76 @@ load_dotenv('bot_config.env')
 # Токен бота від BotFather
 BOT_TOKEN = os.getenv('BOT_TOKEN', 'YOUR_BOT_TOKEN_HERE')
 
+# Адреса Bot API (порожня - api.telegram.org; для власного telegram-bot-api сервера)
+BOT_API_URL = os.getenv('BOT_API_URL', '').rstrip('/')
+
+# Webhook замість long polling: публічна адреса бота (порожня - polling)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '').rstrip('/')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+
+# Порт HTTP сервера (health check та webhook); Heroku передає PORT
+WEB_SERVER_PORT = int(os.getenv('PORT', '8000'))
+
 # Конфігурація Supabase
 SUPABASE_URL = os.getenv('SUPABASE_URL', '')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY', '')
 
-# Назва файлу бази даних (не використовується, залишено для сумісності)
-DATABASE_NAME = 'car_payments.db'
+# Кількість потоків для викликів бази даних (PostgREST клієнт синхронний)
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', '8'))
+
+# Кеш балансу та історії: максимум користувачів та час життя запису (секунди)
+CACHE_MAX_USERS = int(os.getenv('CACHE_MAX_USERS', '1000'))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '300'))
+
+# Стани діалогів (FSM): sqlite (файл FSM_DATABASE_NAME) або memory (втрачаються при перезапуску).
+# Щоб стани пережили перезапуск, FSM_DATABASE_NAME має вказувати на постійний диск
+# (на Heroku файлова система dyno очищується при кожному перезапуску)
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite').lower()
+FSM_DATABASE_NAME = os.getenv('FSM_DATABASE_NAME', 'fsm_states.db')
+# Незавершений діалог видаляється через FSM_TTL_SECONDS без змін; FSM_CACHE_SIZE станів у пам'яті (0 - без кешу)
+FSM_TTL_SECONDS = float(os.getenv('FSM_TTL_SECONDS', '86400'))
+FSM_CACHE_SIZE = int(os.getenv('FSM_CACHE_SIZE', '1000'))
+
+# Журнал: файл (JSON, ротація після LOG_MAX_BYTES), формат stdout (text або json),
+# рівень та рівні окремих модулів ('модуль=РІВЕНЬ,...'; гарячі шляхи - WARNING)
+LOG_FILE = os.getenv('LOG_FILE', 'bot.log')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_LEVELS = os.getenv('LOG_LEVELS', 'utils=WARNING,httpx=WARNING')
+
+# Профілювання: поріг повільного оновлення в журналі (секунди), тека та
+# інтервал знімків семплінгового профайлера, токен для /debug/profile
+# (порожній - ендпоінт вимкнено)
+SLOW_UPDATE_SECONDS = float(os.getenv('SLOW_UPDATE_SECONDS', '1.0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.001'))
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+
+# Кількість місяців календаря в кеші клавіатур
+CALENDAR_CACHE_MONTHS = int(os.getenv('CALENDAR_CACHE_MONTHS', '24'))
+
+# Кеш вмісту надісланих повідомлень для пропуску редагувань без змін:
+# максимум повідомлень та час життя запису (секунди)
+EDIT_CACHE_SIZE = int(os.getenv('EDIT_CACHE_SIZE', '5000'))
+EDIT_CACHE_TTL_SECONDS = float(os.getenv('EDIT_CACHE_TTL_SECONDS', '86400'))
+
+# Сховище даних: 'supabase' або 'sqlite' (локальний файл, без мережі)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'supabase').lower()
+
+# Назва файлу бази даних SQLite (для STORAGE_BACKEND=sqlite)
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'car_payments.db')
+
+# Вікно збору пересланих повідомлень з рахунками в одну пачку (секунди)
+BULK_WINDOW_SECONDS = float(os.getenv('BULK_WINDOW_SECONDS', '1.5'))
+
+# Фонові експорти: потоки для форматування, одночасні експорти одного
+# користувача та мінімальний інтервал оновлення прогресу (секунди)
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '2'))
+EXPORT_JOBS_PER_USER = int(os.getenv('EXPORT_JOBS_PER_USER', '1'))
+EXPORT_PROGRESS_INTERVAL = float(os.getenv('EXPORT_PROGRESS_INTERVAL', '2'))
 
 # Формати дат
 DATE_FORMAT = '%d.%m.%Y'
@@ -30,6 +94,7 @@ MESSAGES = {
     'balance': '📊 Ваш поточний баланс:',
     'history': '📋 Історія операцій:',
     'invoice_added': '✅ Рахунок успішно додано!',
+    'invoices_added': '✅ Рахунки успішно додано!',
     'payment_added': '✅ Платіж успішно додано!',
     'error': '❌ Сталася помилка. Спробуйте ще раз.',
     'invalid_amount': '❌ Некоректна сума. Введіть число.',
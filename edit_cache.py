@@ -0,0 +1,101 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    DeleteMessage, EditMessageCaption, EditMessageMedia, EditMessageReplyMarkup, EditMessageText, SendMessage
+)
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from cache import LRUCache
+from config import EDIT_CACHE_SIZE, EDIT_CACHE_TTL_SECONDS
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Помилка Telegram для редагування, яке нічого не змінює
+NOT_MODIFIED = 'message is not modified'
+
+
+def _text_hash(method) -> int:
+    """Хеш тексту повідомлення разом з параметрами його відображення"""
+    return hash((method.text, repr(method.parse_mode), repr(method.entities), repr(method.link_preview_options)))
+
+
+def _markup_hash(markup) -> int:
+    """Хеш inline клавіатури повідомлення (None - без клавіатури)"""
+    if not isinstance(markup, InlineKeyboardMarkup):
+        return hash(None)
+    return hash(markup.model_dump_json(exclude_none=True))
+
+
+class EditCacheMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сесії бота: пропуск редагувань, що не змінюють повідомлення
+
+    Для кожного повідомлення (chat_id, message_id), надісланого або
+    відредагованого ботом, зберігаються хеші тексту та клавіатури.
+    editMessageText / editMessageReplyMarkup з тим самим вмістом не
+    надсилаються в Telegram (результат - True, як для повідомлень без
+    змін), а помилка 'message is not modified' для повідомлень, яких
+    немає в кеші, також повертає True. Кеш - LRU з TTL, тому зберігаються
+    лише нещодавні повідомлення; після перезапуску перше редагування
+    кожного повідомлення надсилається як раніше.
+    """
+
+    def __init__(self, max_size: int = EDIT_CACHE_SIZE, ttl: float = EDIT_CACHE_TTL_SECONDS):
+        """
+        Args:
+            max_size: Максимальна кількість повідомлень у кеші
+            ttl: Час життя запису в секундах
+        """
+        # (chat_id, message_id) -> (хеш тексту або None - невідомий, хеш клавіатури)
+        self.cache = LRUCache(max_size, ttl)
+        # Зекономлені запити до Telegram API за методом
+        self.skipped: Dict[str, int] = {'editMessageText': 0, 'editMessageReplyMarkup': 0}
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, EditMessageText):
+            content = (_text_hash(method), _markup_hash(method.reply_markup))
+        elif isinstance(method, EditMessageReplyMarkup):
+            # Текст не змінюється
+            content = (None, _markup_hash(method.reply_markup))
+        elif isinstance(method, SendMessage):
+            result = await make_request(bot, method)
+            if isinstance(result, Message):
+                self.cache.set((result.chat.id, result.message_id),
+                               (_text_hash(method), _markup_hash(method.reply_markup)))
+            return result
+        elif isinstance(method, (EditMessageCaption, EditMessageMedia, DeleteMessage)):
+            self.cache.pop((method.chat_id, method.message_id))
+            return await make_request(bot, method)
+        else:
+            return await make_request(bot, method)
+
+        # Повідомлення inline режиму (без chat_id) не кешуються
+        if method.chat_id is None:
+            return await make_request(bot, method)
+
+        key = (method.chat_id, method.message_id)
+        cached: Optional[Tuple[Optional[int], int]] = self.cache.get(key)
+        if cached is not None and content[1] == cached[1] and content[0] in (None, cached[0]):
+            self.skipped[method.__api_method__] += 1
+            logger.debug("Редагування без змін пропущено: %s %s", method.__api_method__, key)
+            return True
+
+        try:
+            result = await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if NOT_MODIFIED not in e.message:
+                self.cache.pop(key)
+                raise
+            result = True
+
+        text_hash = content[0] if content[0] is not None else (cached[0] if cached is not None else None)
+        self.cache.set(key, (text_hash, content[1]))
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        """Розмір кешу та витіснення (для /metrics)"""
+        return {'size': len(self.cache), 'evictions': self.cache.evictions}
@@ -0,0 +1,378 @@
+import asyncio
+import csv
+import logging
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import TextIOWrapper
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Dict, List, Optional, Set, Tuple
+from xml.sax.saxutils import escape
+
+from config import EXPORT_JOBS_PER_USER, EXPORT_WORKERS
+from utils import (
+    EXPORT_HEADER, format_export_operation, format_export_summary, operation_balance_after, to_iso_date
+)
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Скільки операцій форматувати за один виклик у пулі потоків
+EXPORT_BATCH_SIZE = 1000
+
+# Вміст файлу, якщо операцій немає
+EMPTY_EXPORT_TEXT = "Історія операцій порожня."
+
+# Колонки таблиці операцій (CSV/XLSX) - стабільні назви для обробки програмами
+LEDGER_COLUMNS = (
+    'date', 'type', 'id', 'invoice_id', 'date_paid',
+    'car_model', 'vin', 'description', 'amount', 'balance_after'
+)
+
+# Колонки з числами (решта - текст)
+LEDGER_NUMERIC_COLUMNS = frozenset({'id', 'invoice_id', 'amount', 'balance_after'})
+
+# Колонки з текстом, який ввів користувач
+LEDGER_USER_TEXT_COLUMNS = frozenset({'car_model', 'vin', 'description'})
+
+# Перші символи, з яких Excel та Google Sheets починають формулу в CSV
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Мінімальний набір частин XLSX (SpreadsheetML, ECMA-376) для однієї таблиці
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Operations" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+_XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_END = '</sheetData></worksheet>'
+
+# Керівні символи, заборонені в XML 1.0 (можуть потрапити з тексту рахунку)
+_XML_ILLEGAL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Форматування пакетів експорту виконується тут, цикл подій лише чекає результат
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='export')
+
+# Функція звіту про прогрес: отримує кількість уже записаних операцій
+ProgressCallback = Optional[Callable[[int], Awaitable[None]]]
+
+
+async def _operation_batches(db, user_id: int) -> AsyncIterator[List[Dict]]:
+    """Хронологічна історія користувача пакетами по EXPORT_BATCH_SIZE операцій"""
+    batch = []
+    async for operation in db.iter_operations(user_id, batch_size=EXPORT_BATCH_SIZE, descending=False):
+        batch.append(operation)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _export_batches(db, user_id: int, write_batch: Callable, progress: ProgressCallback) -> int:
+    """
+    Обхід історії з записом кожного пакета в пулі потоків
+
+    Args:
+        db: Сховище (Storage або CachedDatabase)
+        user_id: ID користувача в Telegram
+        write_batch: write_batch(operations, operation_count, balance) -> новий баланс
+        progress: Функція звіту про прогрес або None
+
+    Returns:
+        int: Кількість експортованих операцій
+    """
+    loop = asyncio.get_running_loop()
+    operation_count = 0
+    balance = 0.0
+
+    async for batch in _operation_batches(db, user_id):
+        balance = await loop.run_in_executor(_executor, partial(write_batch, batch, operation_count, balance))
+        operation_count += len(batch)
+        if progress is not None:
+            await progress(operation_count)
+
+    return operation_count
+
+
+def _write_text_batch(buffer: BinaryIO, operations: List[Dict], operation_count: int, balance: float) -> float:
+    """Форматування пакета операцій текстового експорту (у пулі потоків)"""
+    chunks = [EXPORT_HEADER] if operation_count == 0 else []
+    for operation in operations:
+        operation_count += 1
+        balance = operation_balance_after(operation, balance)
+        chunks.append(format_export_operation(operation, operation_count, balance))
+
+    buffer.write(''.join(chunks).encode('utf-8'))
+    return balance
+
+
+async def write_text_export(db, user_id: int, buffer: BinaryIO, progress: ProgressCallback = None) -> int:
+    """
+    Потоковий запис текстового експорту історії в буфер (UTF-8)
+
+    Операції читаються пакетами через db.iter_operations, а кожен пакет
+    форматується в пулі потоків і одразу записується в буфер, тому в
+    пам'яті немає ні списку всієї історії, ні проміжних рядків звіту.
+
+    Args:
+        db: Сховище (Storage або CachedDatabase)
+        user_id: ID користувача в Telegram
+        buffer: Буфер для запису (наприклад, io.BytesIO)
+        progress: Функція звіту про прогрес (викликається після кожного пакета)
+
+    Returns:
+        int: Кількість експортованих операцій
+    """
+    operation_count = await _export_batches(db, user_id, partial(_write_text_batch, buffer), progress)
+
+    if operation_count == 0:
+        buffer.write(EMPTY_EXPORT_TEXT.encode('utf-8'))
+        return 0
+
+    buffer.write(format_export_summary(await db.get_balance(user_id), operation_count).encode('utf-8'))
+
+    logger.info(f"Експорт для користувача {user_id}: {operation_count} операцій")
+    return operation_count
+
+
+def _ledger_rows(operations: List[Dict], balance: float) -> Tuple[List[Tuple], float]:
+    """
+    Рядки таблиці операцій (колонки LEDGER_COLUMNS) для пакета операцій
+
+    Баланс після операції береться зі збереженої колонки balance_after;
+    для рядків без неї - наростаючий підсумок по пакету.
+
+    Args:
+        operations: Пакет операцій у хронологічному порядку
+        balance: Баланс перед першою операцією пакета
+
+    Returns:
+        Tuple[List[Tuple], float]: Рядки з датами у форматі ISO 8601 та баланс після пакета
+    """
+    rows = []
+    for operation in operations:
+        amount = float(operation.get('amount', 0))
+        balance = operation_balance_after(operation, balance)
+        rows.append((
+            operation.get('date', ''),
+            operation['type'],
+            operation['id'],
+            operation.get('invoice_id') or '',
+            to_iso_date(operation.get('date_paid')),
+            operation.get('car_model') or '',
+            operation.get('vin') or '',
+            operation.get('car_info') or '',
+            round(amount, 2),
+            round(balance, 2)
+        ))
+    return rows, balance
+
+
+def _csv_text_cell(value):
+    """Текст користувача, що починається як формула ('=1+1'), записується з апострофом"""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+# Функція комірки CSV для кожної колонки обирається один раз
+_CSV_CELLS = tuple(
+    _csv_text_cell if name in LEDGER_USER_TEXT_COLUMNS else None
+    for name in LEDGER_COLUMNS
+)
+
+
+def _write_csv_batch(writer, operations: List[Dict], operation_count: int, balance: float) -> float:
+    """Запис пакета рядків CSV (у пулі потоків)"""
+    rows, balance = _ledger_rows(operations, balance)
+    writer.writerows(
+        tuple(value if cell is None else cell(value) for cell, value in zip(_CSV_CELLS, row))
+        for row in rows
+    )
+    return balance
+
+
+async def write_csv_export(db, user_id: int, buffer: BinaryIO, progress: ProgressCallback = None) -> int:
+    """
+    Потоковий запис таблиці операцій у CSV (UTF-8 з BOM для Excel)
+
+    Args:
+        db: Сховище (Storage або CachedDatabase)
+        user_id: ID користувача в Telegram
+        buffer: Буфер для запису (наприклад, io.BytesIO)
+        progress: Функція звіту про прогрес (викликається після кожного пакета)
+
+    Returns:
+        int: Кількість експортованих операцій
+    """
+    text = TextIOWrapper(buffer, encoding='utf-8-sig', newline='')
+    writer = csv.writer(text)
+    writer.writerow(LEDGER_COLUMNS)
+
+    operation_count = await _export_batches(db, user_id, partial(_write_csv_batch, writer), progress)
+
+    # Від'єднуємо обгортку, щоб вона не закрила буфер
+    text.flush()
+    text.detach()
+
+    logger.info(f"CSV експорт для користувача {user_id}: {operation_count} операцій")
+    return operation_count
+
+
+def _xlsx_text_cell(value) -> str:
+    """Комірка з рядком (inline string, без таблиці спільних рядків; не обчислюється як формула)"""
+    if not value:
+        return '<c/>'
+    return f'<c t="inlineStr"><is><t>{escape(_XML_ILLEGAL_CHARS_RE.sub("", str(value)))}</t></is></c>'
+
+
+def _xlsx_number_cell(value) -> str:
+    """Числова комірка; порожнє значення - порожня комірка"""
+    if value == '' or value is None:
+        return '<c/>'
+    return f'<c><v>{value}</v></c>'
+
+
+# Функція комірки для кожної колонки обирається один раз
+_XLSX_CELLS = tuple(
+    _xlsx_number_cell if name in LEDGER_NUMERIC_COLUMNS else _xlsx_text_cell
+    for name in LEDGER_COLUMNS
+)
+
+
+def _write_xlsx_batch(sheet: BinaryIO, operations: List[Dict], operation_count: int, balance: float) -> float:
+    """Запис пакета рядків XML аркуша XLSX (у пулі потоків)"""
+    rows, balance = _ledger_rows(operations, balance)
+    sheet.write(''.join(
+        '<row>' + ''.join(cell(value) for cell, value in zip(_XLSX_CELLS, row)) + '</row>'
+        for row in rows
+    ).encode('utf-8'))
+    return balance
+
+
+async def write_xlsx_export(db, user_id: int, buffer: BinaryIO, progress: ProgressCallback = None) -> int:
+    """
+    Потоковий запис таблиці операцій у XLSX
+
+    Книга з одного аркуша пишеться напряму у ZIP архів без сторонніх
+    бібліотек: тип кожної колонки відомий наперед (LEDGER_NUMERIC_COLUMNS),
+    тому рядки XML аркуша збираються з готових функцій комірок і
+    стискаються пакетами.
+
+    Args:
+        db: Сховище (Storage або CachedDatabase)
+        user_id: ID користувача в Telegram
+        buffer: Буфер для запису (наприклад, io.BytesIO)
+        progress: Функція звіту про прогрес (викликається після кожного пакета)
+
+    Returns:
+        int: Кількість експортованих операцій
+    """
+    header = '<row>' + ''.join(_xlsx_text_cell(name) for name in LEDGER_COLUMNS) + '</row>'
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((_XLSX_SHEET_START + header).encode('utf-8'))
+            operation_count = await _export_batches(db, user_id, partial(_write_xlsx_batch, sheet), progress)
+            sheet.write(_XLSX_SHEET_END.encode('utf-8'))
+
+    logger.info(f"XLSX експорт для користувача {user_id}: {operation_count} операцій")
+    return operation_count
+
+
+class ExportJobs:
+    """
+    Фонові задачі експорту з обмеженням кількості задач на користувача
+
+    Обробник callback лише запускає задачу і одразу відповідає, а файл
+    надсилає сама задача. Посилання на задачі зберігаються, щоб asyncio
+    не прибрав їх збирачем сміття до завершення.
+    """
+
+    def __init__(self, per_user_limit: int = EXPORT_JOBS_PER_USER):
+        """
+        Args:
+            per_user_limit: Максимум одночасних експортів одного користувача
+        """
+        self.per_user_limit = per_user_limit
+        self._tasks: Dict[int, Set[asyncio.Task]] = {}
+
+    def running(self, user_id: int) -> int:
+        """Кількість незавершених експортів користувача"""
+        return len(self._tasks.get(user_id, ()))
+
+    def start(self, user_id: int, job: Awaitable) -> Optional[asyncio.Task]:
+        """
+        Запуск задачі експорту у фоні
+
+        Args:
+            user_id: ID користувача в Telegram
+            job: Корутина експорту
+
+        Returns:
+            Optional[asyncio.Task]: Задача або None, якщо ліміт користувача вичерпано
+        """
+        if self.running(user_id) >= self.per_user_limit:
+            job.close()
+            return None
+
+        task = asyncio.create_task(job)
+        tasks = self._tasks.setdefault(user_id, set())
+        tasks.add(task)
+        task.add_done_callback(partial(self._finished, user_id))
+        return task
+
+    def _finished(self, user_id: int, task: asyncio.Task):
+        """Видалення завершеної задачі та логування її помилки"""
+        tasks = self._tasks.get(user_id)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._tasks[user_id]
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Фоновий експорт для користувача {user_id} завершився помилкою: {task.exception()}")
+
+    async def close(self):
+        """Скасування незавершених експортів та зупинка пулу потоків"""
+        tasks = [task for user_tasks in self._tasks.values() for task in user_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _executor.shutdown(wait=False)
@@ -0,0 +1,195 @@
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional
+
+import aiosqlite
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from cache import LRUCache
+from config import FSM_CACHE_SIZE, FSM_DATABASE_NAME, FSM_STORAGE, FSM_TTL_SECONDS
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+FSM_SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_states_expires_at ON fsm_states (expires_at);
+"""
+
+# Запис лише однієї частини стану; друга зберігає попереднє значення
+UPSERT_STATE_SQL = """
+INSERT INTO fsm_states (key, state, expires_at) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET state = excluded.state, expires_at = excluded.expires_at
+"""
+UPSERT_DATA_SQL = """
+INSERT INTO fsm_states (key, data, expires_at) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+"""
+
+# Після state.clear() рядок не потрібен
+DELETE_EMPTY_SQL = "DELETE FROM fsm_states WHERE key = ? AND state IS NULL AND data = '{}'"
+
+# Як часто (секунди) видаляти прострочені стани під час запису
+CLEANUP_INTERVAL = 600
+
+EMPTY_DATA = '{}'
+
+
+class SQLiteFSMStorage(BaseStorage):
+    """
+    Сховище станів FSM aiogram у локальному файлі SQLite
+
+    Стани та дані незавершених діалогів (сума платежу, вибрана дата,
+    курсори сторінок) зберігаються, доки існує файл path. Перезапуск
+    процесу вони переживають лише тоді, коли path лежить на постійному
+    диску: файлова система dyno Heroku очищується при кожному
+    перезапуску та деплої. Стан, який не змінювався ttl секунд,
+    вважається відсутнім і видаляється з файлу.
+    Необов'язковий гарячий кеш (LRU) відповідає на читання без запиту
+    до SQLite; запис завжди йде у файл.
+    """
+
+    def __init__(self, path: str = FSM_DATABASE_NAME, ttl: float = FSM_TTL_SECONDS,
+                 cache_size: int = FSM_CACHE_SIZE):
+        """
+        Args:
+            path: Шлях до файлу бази даних
+            ttl: Час життя стану без змін у секундах
+            cache_size: Кількість станів у гарячому кеші (0 - без кешу)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True, with_destiny=True)
+        # ключ -> [state, data (JSON), expires_at]; порожній запис теж кешується
+        self.cache = LRUCache(cache_size, ttl) if cache_size > 0 else None
+        self._connection: Optional[aiosqlite.Connection] = None
+        self._last_cleanup = 0.0
+
+    async def connect(self):
+        """Відкриття з'єднання, створення таблиці та видалення прострочених станів"""
+        # Автокомміт: кожен запис - одна інструкція без окремого commit()
+        self._connection = await aiosqlite.connect(self.path, isolation_level=None)
+        await self._connection.executescript(FSM_SCHEMA)
+        await self._delete_expired()
+        logger.info(f"Сховище станів FSM: SQLite ({self.path}), TTL {self.ttl:.0f} с")
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _load(self, storage_key: str) -> list:
+        """Запис [state, data, expires_at] з кешу або файлу (порожній, якщо стан прострочено)"""
+        now = time.time()
+        if self.cache is not None:
+            record = self.cache.get(storage_key)
+            if record is not None and record[2] > now:
+                return record
+
+        # Один виклик у потік aiosqlite замість execute + fetchone + close
+        rows = await self._connection.execute_fetchall(
+            "SELECT state, data, expires_at FROM fsm_states WHERE key = ? AND expires_at > ?",
+            (storage_key, now)
+        )
+        record = list(rows[0]) if rows else [None, EMPTY_DATA, now + self.ttl]
+        if self.cache is not None:
+            self.cache.set(storage_key, record)
+        return record
+
+    async def _save(self, storage_key: str, sql: str, value: Optional[str], part: int):
+        """Запис стану (part=0) або даних (part=1) з продовженням TTL"""
+        now = time.time()
+        expires_at = now + self.ttl
+        await self._connection.execute(sql, (storage_key, value, expires_at))
+        if value is None or value == EMPTY_DATA:
+            await self._connection.execute(DELETE_EMPTY_SQL, (storage_key,))
+
+        if self.cache is not None:
+            record = self.cache.get(storage_key)
+            if record is not None:
+                record[part] = value
+                record[2] = expires_at
+                self.cache.set(storage_key, record)
+
+        if now - self._last_cleanup > CLEANUP_INTERVAL:
+            await self._delete_expired()
+
+    async def _delete_expired(self):
+        """Видалення станів, які не змінювались довше за TTL"""
+        now = time.time()
+        cursor = await self._connection.execute("DELETE FROM fsm_states WHERE expires_at <= ?", (now,))
+        self._last_cleanup = now
+        if cursor.rowcount:
+            logger.info(f"Видалено прострочених станів FSM: {cursor.rowcount}")
+
+    async def count_states(self) -> Dict[str, int]:
+        """Кількість незавершених діалогів за станом (для метрик)"""
+        rows = await self._connection.execute_fetchall(
+            "SELECT state, COUNT(*) FROM fsm_states WHERE state IS NOT NULL AND expires_at > ? GROUP BY state",
+            (time.time(),)
+        )
+        return {state: count for state, count in rows}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await self._save(self.key_builder.build(key), UPSERT_STATE_SQL, state, 0)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._load(self.key_builder.build(key))
+        return record[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        await self._save(self.key_builder.build(key), UPSERT_DATA_SQL, json.dumps(data, ensure_ascii=False), 1)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._load(self.key_builder.build(key))
+        return json.loads(record[1])
+
+
+async def count_fsm_states(storage: BaseStorage) -> Dict[str, int]:
+    """
+    Кількість діалогів за станом для SQLiteFSMStorage або MemoryStorage
+
+    Args:
+        storage: Сховище станів диспетчера (dp.storage)
+
+    Returns:
+        Dict[str, int]: Назва стану -> кількість користувачів у ньому
+    """
+    if isinstance(storage, SQLiteFSMStorage):
+        return await storage.count_states()
+    if isinstance(storage, MemoryStorage):
+        return dict(Counter(record.state for record in storage.storage.values() if record.state))
+    return {}
+
+
+def create_fsm_storage(backend: str = FSM_STORAGE) -> BaseStorage:
+    """
+    Створення сховища станів FSM, обраного в config.FSM_STORAGE
+
+    Args:
+        backend: 'sqlite' або 'memory'
+
+    Returns:
+        BaseStorage: SQLiteFSMStorage (потребує connect()) або MemoryStorage
+    """
+    if backend == 'sqlite':
+        return SQLiteFSMStorage()
+    if backend == 'memory':
+        return MemoryStorage()
+    raise ValueError(f"Невідоме сховище FSM_STORAGE={backend!r} (очікується 'sqlite' або 'memory')")
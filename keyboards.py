@@ -1,11 +1,16 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from datetime import datetime, timedelta
+from functools import lru_cache
 import calendar
-from config import MAIN_MENU_BUTTONS, MONTHS_UA, WEEKDAYS_UA
+from callbacks import (
+    CalendarCallback, ConfirmDeleteCallback, DateCallback,
+    DeleteOperationCallback, DeletePageCallback, InvoiceSelectCallback
+)
+from config import CALENDAR_CACHE_MONTHS, MAIN_MENU_BUTTONS, MONTHS_UA, WEEKDAYS_UA
 
 
-def get_main_menu() -> InlineKeyboardMarkup:
+def _build_main_menu() -> InlineKeyboardMarkup:
     """
     Створення головного меню бота
     
@@ -58,7 +63,7 @@ def get_main_menu() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def get_back_to_menu() -> InlineKeyboardMarkup:
+def _build_back_to_menu() -> InlineKeyboardMarkup:
     """
     Створення клавіатури для повернення в головне меню
     
@@ -75,10 +80,62 @@ def get_back_to_menu() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=CALENDAR_CACHE_MONTHS)
+def _calendar_month_rows(year: int, month: int) -> tuple:
+    """
+    Незмінна частина календаря на місяць (кешується, LRU)
+
+    Args:
+        year: Рік
+        month: Місяць
+
+    Returns:
+        tuple: Ряди кнопок: заголовок, навігація, дні тижня та тижні місяця
+    """
+    # Кнопки навігації
+    prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    # Заголовок з місяцем та роком
+    rows = [
+        (InlineKeyboardButton(text=f"{MONTHS_UA[month-1]} {year}", callback_data="ignore"),),
+        (
+            InlineKeyboardButton(text="⬅️", callback_data=CalendarCallback(year=prev_year, month=prev_month).pack()),
+            InlineKeyboardButton(text="➡️", callback_data=CalendarCallback(year=next_year, month=next_month).pack())
+        ),
+        _WEEKDAYS_ROW
+    ]
+
+    # Дні місяця (0 - порожній день)
+    for week in calendar.monthcalendar(year, month):
+        rows.append(tuple(
+            InlineKeyboardButton(text=str(day), callback_data=DateCallback(year=year, month=month, day=day).pack())
+            if day else _EMPTY_DAY
+            for day in week
+        ))
+
+    return tuple(rows)
+
+
+def calendar_cache_stats() -> dict:
+    """Лічильники кешу місяців календаря (як cache.LRUCache.stats)"""
+    info = _calendar_month_rows.cache_info()
+    total = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'hit_rate': info.hits / total if total else 0.0
+    }
+
+
 def get_calendar(year: int = None, month: int = None) -> InlineKeyboardMarkup:
     """
     Створення інлайн календаря для вибору дати
     
+    Сітка місяця береться з кешу, заново створюються лише тиждень
+    з позначкою сьогоднішнього дня та кнопка "Сьогодні".
+    
     Args:
         year: Рік (за замовчуванням поточний)
         month: Місяць (за замовчуванням поточний)
@@ -92,100 +149,21 @@ def get_calendar(year: int = None, month: int = None) -> InlineKeyboardMarkup:
     if month is None:
         month = now.month
     
-    builder = InlineKeyboardBuilder()
+    rows = [list(row) for row in _calendar_month_rows(year, month)]
     
-    # Заголовок з місяцем та роком
-    builder.add(
-        InlineKeyboardButton(
-            text=f"{MONTHS_UA[month-1]} {year}",
-            callback_data="ignore"
-        )
-    )
-    builder.adjust(1)
-    
-    # Кнопки навігації
-    prev_month = month - 1
-    prev_year = year
-    if prev_month == 0:
-        prev_month = 12
-        prev_year -= 1
-    
-    next_month = month + 1
-    next_year = year
-    if next_month == 13:
-        next_month = 1
-        next_year += 1
+    # Позначка сьогоднішнього дня
+    if year == now.year and month == now.month:
+        today_data = DateCallback(year=year, month=month, day=now.day).pack()
+        for row in rows[3:]:
+            for index, button in enumerate(row):
+                if button.callback_data == today_data:
+                    row[index] = InlineKeyboardButton(text=f"[{now.day}]", callback_data=today_data)
     
-    builder.add(
-        InlineKeyboardButton(
-            text="⬅️",
-            callback_data=f"calendar_prev_{prev_year}_{prev_month}"
-        ),
-        InlineKeyboardButton(
-            text="➡️",
-            callback_data=f"calendar_next_{next_year}_{next_month}"
-        )
-    )
-    builder.adjust(2)
+    # Кнопка "Сьогодні" та "Назад"
+    rows.append([InlineKeyboardButton(text="📅 Сьогодні", callback_data=DateCallback(year=now.year, month=now.month, day=now.day).pack())])
+    rows.append([_CALENDAR_BACK_BUTTON])
     
-    # Дні тижня
-    for day in WEEKDAYS_UA:
-        builder.add(
-            InlineKeyboardButton(
-                text=day,
-                callback_data="ignore"
-            )
-        )
-    builder.adjust(7)
-    
-    # Дні місяця
-    cal = calendar.monthcalendar(year, month)
-    
-    for week in cal:
-        week_buttons = []
-        for day in week:
-            if day == 0:
-                # Порожній день
-                week_buttons.append(
-                    InlineKeyboardButton(
-                        text=" ",
-                        callback_data="ignore"
-                    )
-                )
-            else:
-                # Перевіряємо, чи це сьогоднішній день
-                is_today = (day == now.day and month == now.month and year == now.year)
-                day_text = f"[{day}]" if is_today else str(day)
-                
-                week_buttons.append(
-                    InlineKeyboardButton(
-                        text=day_text,
-                        callback_data=f"date_selected_{year}_{month:02d}_{day:02d}"
-                    )
-                )
-        
-        builder.row(*week_buttons)
-    
-    # Кнопка "Сьогодні"
-    today_date = now.strftime("%Y_%m_%d")
-    builder.add(
-        InlineKeyboardButton(
-            text="📅 Сьогодні",
-            callback_data=f"date_selected_{today_date}"
-        )
-    )
-    builder.adjust(1)
-    
-    # Кнопка "Назад"
-    builder.add(
-        InlineKeyboardButton(
-            text="🔙 Назад",
-            callback_data="back_to_menu"
-        )
-    )
-    builder.adjust(1)
-    
-    return builder.as_markup()
+    return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
 def get_confirm_keyboard(action: str, data: str = "") -> InlineKeyboardMarkup:
@@ -242,7 +220,7 @@ def get_invoice_selection_keyboard(invoices: list) -> InlineKeyboardMarkup:
             builder.add(
                 InlineKeyboardButton(
                     text=f"📄 {invoice['display_text']}",
-                    callback_data=f"select_invoice_{invoice['id']}"
+                    callback_data=InvoiceSelectCallback(invoice_id=invoice['id']).pack()
                 )
             )
     
@@ -250,7 +228,7 @@ def get_invoice_selection_keyboard(invoices: list) -> InlineKeyboardMarkup:
     builder.add(
         InlineKeyboardButton(
             text="💰 Платіж на баланс",
-            callback_data="select_invoice_balance"
+            callback_data=InvoiceSelectCallback().pack()
         )
     )
     
@@ -268,7 +246,7 @@ def get_invoice_selection_keyboard(invoices: list) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def get_operations_keyboard() -> InlineKeyboardMarkup:
+def _build_operations_keyboard() -> InlineKeyboardMarkup:
     """
     Створення клавіатури для роботи з операціями
     
@@ -288,7 +266,7 @@ def get_operations_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def get_history_keyboard() -> InlineKeyboardMarkup:
+def _build_history_keyboard() -> InlineKeyboardMarkup:
     """
     Створення клавіатури для історії операцій
     
@@ -351,7 +329,7 @@ def get_amount_confirmation_keyboard(amount: float) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
-def get_export_keyboard() -> InlineKeyboardMarkup:
+def _build_export_keyboard() -> InlineKeyboardMarkup:
     """
     Створення клавіатури для експорту даних
     
@@ -366,15 +344,24 @@ def get_export_keyboard() -> InlineKeyboardMarkup:
             callback_data="export_text"
         )
     )
-    builder.adjust(1)
-    
+    builder.add(
+        InlineKeyboardButton(
+            text="📊 CSV таблиця",
+            callback_data="export_csv"
+        ),
+        InlineKeyboardButton(
+            text="📗 Excel (XLSX)",
+            callback_data="export_xlsx"
+        )
+    )
     builder.add(
         InlineKeyboardButton(
             text="🏠 Головне меню",
             callback_data="back_to_menu"
         )
     )
-    builder.adjust(1)
+    # Текстовий файл, CSV та XLSX в одному рядку, головне меню
+    builder.adjust(1, 2, 1)
     
     return builder.as_markup()
 
@@ -399,10 +386,9 @@ def get_operations_list_keyboard(operations: list, page: int, total_pages: int)
     # Додаємо кнопки операцій
     for operation in operations:
         if operation['type'] == 'invoice':
-            from utils import extract_car_model_and_vin, format_date
+            from utils import operation_car_model_and_vin, format_date
             
-            car_info = operation.get('car_info', 'Невідоме авто')
-            model, vin = extract_car_model_and_vin(car_info)
+            model, vin = operation_car_model_and_vin(operation)
             date = format_date(operation.get('date', ''))
             
             # Кольоровий формат: червоний індикатор для рахунків
@@ -448,7 +434,9 @@ def get_operations_list_keyboard(operations: list, page: int, total_pages: int)
         builder.add(
             InlineKeyboardButton(
                 text=text,
-                callback_data=f"delete_{operation['type']}_{operation['id']}"
+                callback_data=DeleteOperationCallback(
+                    operation_type=operation['type'], operation_id=operation['id']
+                ).pack()
             )
         )
     
@@ -461,7 +449,7 @@ def get_operations_list_keyboard(operations: list, page: int, total_pages: int)
         nav_buttons.append(
             InlineKeyboardButton(
                 text="⬅️ Попередня",
-                callback_data=f"delete_page_{page - 1}"
+                callback_data=DeletePageCallback(page=page - 1).pack()
             )
         )
     
@@ -469,7 +457,7 @@ def get_operations_list_keyboard(operations: list, page: int, total_pages: int)
         nav_buttons.append(
             InlineKeyboardButton(
                 text="➡️ Наступна",
-                callback_data=f"delete_page_{page + 1}"
+                callback_data=DeletePageCallback(page=page + 1).pack()
             )
         )
     
@@ -514,7 +502,9 @@ def get_delete_confirmation_keyboard(operation_type: str, operation_id: int) ->
     builder.add(
         InlineKeyboardButton(
             text="🗑️ Так, видалити",
-            callback_data=f"confirm_delete_{operation_type}_{operation_id}"
+            callback_data=ConfirmDeleteCallback(
+                operation_type=operation_type, operation_id=operation_id
+            ).pack()
         ),
         InlineKeyboardButton(
             text="❌ Скасувати",
@@ -523,4 +513,42 @@ def get_delete_confirmation_keyboard(operation_type: str, operation_id: int) ->
     )
     builder.adjust(2)
     
-    return builder.as_markup() 
\ No newline at end of file
+    return builder.as_markup()
+
+
+def get_main_menu() -> InlineKeyboardMarkup:
+    """Головне меню бота (створене при імпорті модуля)"""
+    return MAIN_MENU
+
+
+def get_back_to_menu() -> InlineKeyboardMarkup:
+    """Клавіатура з кнопкою повернення в головне меню"""
+    return BACK_TO_MENU
+
+
+def get_operations_keyboard() -> InlineKeyboardMarkup:
+    """Клавіатура для роботи з операціями"""
+    return OPERATIONS_KEYBOARD
+
+
+def get_history_keyboard() -> InlineKeyboardMarkup:
+    """Клавіатура для історії операцій"""
+    return HISTORY_KEYBOARD
+
+
+def get_export_keyboard() -> InlineKeyboardMarkup:
+    """Клавіатура для експорту даних"""
+    return EXPORT_KEYBOARD
+
+
+# Незмінні кнопки календаря
+_WEEKDAYS_ROW = tuple(InlineKeyboardButton(text=day, callback_data="ignore") for day in WEEKDAYS_UA)
+_EMPTY_DAY = InlineKeyboardButton(text=" ", callback_data="ignore")
+_CALENDAR_BACK_BUTTON = InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_menu")
+
+# Клавіатури без змінних даних створюються один раз; aiogram їх не змінює
+MAIN_MENU = _build_main_menu()
+BACK_TO_MENU = _build_back_to_menu()
+OPERATIONS_KEYBOARD = _build_operations_keyboard()
+HISTORY_KEYBOARD = _build_history_keyboard()
+EXPORT_KEYBOARD = _build_export_keyboard()
@@ -0,0 +1,172 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Awaitable, Callable, Dict, Optional, TextIO, Tuple
+
+from aiogram import BaseMiddleware
+
+from config import LOG_BACKUP_COUNT, LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_MAX_BYTES
+from metrics import resolve_handler_name
+
+# Формат рядків у stdout (LOG_FORMAT=text)
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Потік запису поточного налаштування (setup_logging)
+_listener: Optional[QueueListener] = None
+
+# (user_id, назва хендлера) оновлення, яке обробляється в поточній задачі
+_log_context: ContextVar[Tuple[Optional[int], Optional[str]]] = ContextVar('log_context', default=(None, None))
+
+
+def parse_module_levels(value: str) -> Dict[str, int]:
+    """
+    Розбір рівнів логування модулів
+
+    Args:
+        value: Рядок 'utils=WARNING,httpx=WARNING'
+
+    Returns:
+        Dict[str, int]: Назва логера -> рівень
+    """
+    levels = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        name, level = (part.strip() for part in item.split('=', 1))
+        levels[name] = logging.getLevelName(level.upper())
+        if not isinstance(levels[name], int):
+            raise ValueError(f"Невідомий рівень логування {level!r} для {name!r}")
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON об'єкт на рядок: час, рівень, логер, повідомлення, user_id, handler"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'user_id', None) is not None:
+            entry['user_id'] = record.user_id
+        if getattr(record, 'handler', None) is not None:
+            entry['handler'] = record.handler
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Передача записів у чергу без форматування та запису на диск
+
+    У потоці, що логує, лише підставляються аргументи повідомлення та
+    контекст оновлення (user_id, handler). Форматування та запис
+    виконує потік QueueListener. Як і в QueueHandler.prepare, змінюється
+    копія запису, тому інші обробники того самого логера бачать
+    оригінал. Черга в межах процесу, тому traceback (exc_info)
+    передається як є.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        user_id, handler = _log_context.get()
+        if not hasattr(record, 'user_id'):
+            record.user_id = user_id
+        if not hasattr(record, 'handler'):
+            record.handler = handler
+        return record
+
+
+def setup_logging(path: str = LOG_FILE, level: str = LOG_LEVEL, module_levels: str = LOG_LEVELS,
+                  stream_format: str = LOG_FORMAT, max_bytes: int = LOG_MAX_BYTES,
+                  backup_count: int = LOG_BACKUP_COUNT, stream: Optional[TextIO] = sys.stdout) -> QueueListener:
+    """
+    Налаштування логування через чергу з фоновим потоком запису
+
+    Кореневий логер отримує лише ContextQueueHandler; файл (JSON з
+    ротацією за розміром) та stdout пише QueueListener.
+
+    Args:
+        path: Файл журналу
+        level: Рівень кореневого логера
+        module_levels: Рівні окремих модулів ('utils=WARNING,httpx=WARNING')
+        stream_format: Формат stdout: 'text' або 'json'
+        max_bytes: Розмір файлу, після якого він ротується
+        backup_count: Кількість старих файлів журналу
+        stream: Потік для виводу (None - лише файл)
+
+    Returns:
+        QueueListener: Запущений потік запису (зупиняється при виході з процесу)
+    """
+    global _listener
+    stop_logging()
+
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if stream is not None:
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(JsonFormatter() if stream_format == 'json' else logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream_handler)
+
+    # Ідентифікатори процесу в записах не використовуються, а їх отримання - на кожен запис
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, module_level in parse_module_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Запис решти черги та закриття файлу журналу"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# Записи, що лишились у черзі, потрапляють у файл і при звичайному виході
+atexit.register(stop_logging)
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """Внутрішній middleware: user_id та назва хендлера в записах журналу оновлення"""
+
+    def __init__(self, callback_router=None):
+        """
+        Args:
+            callback_router: callbacks.CallbackRouter для назв callback-хендлерів
+        """
+        self.callback_router = callback_router
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event: Any,
+                       data: Dict[str, Any]) -> Optional[Any]:
+        user = getattr(event, 'from_user', None)
+        token = _log_context.set((user.id if user else None, resolve_handler_name(event, data, self.callback_router)))
+        try:
+            return await handler(event, data)
+        finally:
+            _log_context.reset(token)
@@ -1,54 +1,108 @@
 import asyncio
+import hmac
 import logging
-import sqlite3
-import sys
+import time
 from datetime import datetime
-from io import StringIO
+from io import BytesIO
 
 from aiohttp import web
-from aiogram import Bot, Dispatcher, F
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.types import Message, CallbackQuery, BufferedInputFile
 from aiogram.exceptions import TelegramBadRequest
 
 # Імпорти наших модулів
-from config import BOT_TOKEN, MESSAGES
-from supabase_database import initialize_database
+from config import (
+    BOT_API_URL, BOT_TOKEN, BULK_WINDOW_SECONDS, EXPORT_PROGRESS_INTERVAL, MESSAGES, PROFILE_TOKEN,
+    WEB_SERVER_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_URL
+)
+from storage import create_storage
+from fsm_storage import SQLiteFSMStorage, count_fsm_states, create_fsm_storage
+from metrics import CONTENT_TYPE, EXPORT_SECONDS, REGISTRY, HandlerMetricsMiddleware, metric_lines
+from logging_config import LogContextMiddleware, setup_logging
+from profiling import ApiPhaseMiddleware, ProfiledDatabase, ProfilingMiddleware, SamplingProfiler, render_phase
+from callbacks import (
+    CallbackRouter, CalendarCallback, ConfirmDeleteCallback, DateCallback, DeferredAnswerMiddleware,
+    DeleteOperationCallback, DeletePageCallback, EarlyAnswerMiddleware, InvoiceSelectCallback
+)
+from edit_cache import EditCacheMiddleware
+from exports import ExportJobs, write_csv_export, write_text_export, write_xlsx_export
 from keyboards import (
     get_main_menu, get_back_to_menu, get_calendar, 
     get_history_keyboard, get_operations_keyboard,
     get_amount_confirmation_keyboard, get_export_keyboard,
     get_operations_list_keyboard, get_delete_confirmation_keyboard, 
-    get_invoice_selection_keyboard
+    get_invoice_selection_keyboard, calendar_cache_stats
 )
 from utils import (
     parse_amount_from_text, extract_car_info, validate_amount,
-    format_balance, format_date, parse_date_from_callback,
+    format_balance, format_date, format_callback_date,
     format_operation_summary, format_single_operation_summary, 
-    sanitize_filename
+    sanitize_filename, operation_cursor, split_invoice_texts, truncate_text,
+    is_valid_date, to_iso_date
 )
 
-# Налаштування логування
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Налаштування логування: запис у файл та stdout у фоновому потоці
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Створення бота та диспетчера
-bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+bot = Bot(
+    token=BOT_TOKEN,
+    session=AiohttpSession(api=TelegramAPIServer.from_base(BOT_API_URL)) if BOT_API_URL else None
+)
+dp = Dispatcher(storage=create_fsm_storage())
 
 # Глобальна змінна для бази даних
 db = None
 
+# Тексти пересланих рахунків, що збираються в пачку (по користувачах)
+invoice_batches = {}
+
+# Фонові задачі експорту з обмеженням на користувача
+export_jobs = ExportJobs()
+
+# Усі callback-запити обробляє один хендлер з пошуком за префіксом
+callback_router = CallbackRouter()
+dp.callback_query.register(callback_router.dispatch)
+
+# Індикатор на кнопці зникає до роботи хендлера; його callback.answer() не
+# надсилає другу відповідь, а текст помилки приходить повідомленням у чат
+dp.callback_query.outer_middleware(EarlyAnswerMiddleware())
+bot.session.middleware(DeferredAnswerMiddleware())
+
+# Редагування, що не змінюють повідомлення (повернення в меню з меню тощо),
+# не надсилаються в Telegram
+edit_cache = EditCacheMiddleware()
+bot.session.middleware(edit_cache)
+
+# Час виконання хендлерів для /metrics
+dp.message.middleware(HandlerMetricsMiddleware(callback_router=callback_router))
+dp.callback_query.middleware(HandlerMetricsMiddleware(callback_router=callback_router))
+
+# user_id та назва хендлера в записах журналу
+dp.message.middleware(LogContextMiddleware(callback_router=callback_router))
+dp.callback_query.middleware(LogContextMiddleware(callback_router=callback_router))
+
+# Розбивка часу оновлень (БД, рендер, Telegram API) та профілювання на вимогу
+profiler = SamplingProfiler()
+bot.session.middleware(ApiPhaseMiddleware())
+dp.message.middleware(ProfilingMiddleware(sampler=profiler, callback_router=callback_router))
+dp.callback_query.middleware(ProfilingMiddleware(sampler=profiler, callback_router=callback_router))
+
+# Форматування тексту та клавіатур у хендлерах - фаза 'render'
+format_operation_summary = render_phase(format_operation_summary)
+format_single_operation_summary = render_phase(format_single_operation_summary)
+get_calendar = render_phase(get_calendar)
+get_invoice_selection_keyboard = render_phase(get_invoice_selection_keyboard)
+get_amount_confirmation_keyboard = render_phase(get_amount_confirmation_keyboard)
+get_operations_list_keyboard = render_phase(get_operations_list_keyboard)
+get_delete_confirmation_keyboard = render_phase(get_delete_confirmation_keyboard)
+
 
 # Стани для FSM (Finite State Machine)
 class BotStates(StatesGroup):
@@ -74,8 +128,32 @@ async def cmd_start(message: Message):
         await message.answer(MESSAGES['error'])
 
 
+# Хендлер команди /balance ДД.ММ.РРРР
+@dp.message(Command("balance"))
+async def cmd_balance_on_date(message: Message):
+    """Баланс на кінець вказаного дня (без дати - поточний баланс)"""
+    try:
+        parts = message.text.split(maxsplit=1)
+        if len(parts) == 1:
+            balance = await db.get_balance(message.from_user.id)
+            await message.answer(f"{MESSAGES['balance']}\n\n{format_balance(balance)}")
+            return
+
+        date_str = parts[1].strip()
+        if not is_valid_date(date_str):
+            await message.answer("❌ Невірний формат дати. Приклад: /balance 31.12.2024")
+            return
+
+        balance = await db.get_balance_on_date(message.from_user.id, to_iso_date(date_str))
+        await message.answer(f"📊 Баланс на кінець {date_str}:\n\n{format_balance(balance)}")
+
+    except Exception as e:
+        logger.error(f"Помилка в cmd_balance_on_date: {e}")
+        await message.answer(MESSAGES['error'])
+
+
 # Хендлер для повернення в головне меню
-@dp.callback_query(F.data == "back_to_menu")
+@callback_router.route("back_to_menu")
 async def back_to_menu(callback: CallbackQuery, state: FSMContext):
     """Повернення в головне меню"""
     try:
@@ -98,7 +176,7 @@ async def back_to_menu(callback: CallbackQuery, state: FSMContext):
 
 
 # Хендлер для додавання рахунку
-@dp.callback_query(F.data == "menu_add_invoice")
+@callback_router.route("menu_add_invoice")
 async def add_invoice_start(callback: CallbackQuery, state: FSMContext):
     """Початок додавання рахунку"""
     try:
@@ -113,12 +191,53 @@ async def add_invoice_start(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Сталася помилка")
 
 
+async def collect_invoice_batch(user_id: int, text: str) -> list:
+    """
+    Збір пересланих повідомлень з рахунками в одну пачку
+    
+    Чекає, доки протягом BULK_WINDOW_SECONDS не надійде нових повідомлень
+    (їх додає process_invoice_text), і повертає тексти всієї пачки.
+    
+    Args:
+        user_id: ID користувача в Telegram
+        text: Текст першого повідомлення пачки
+        
+    Returns:
+        list: Тексти повідомлень у порядку надходження
+    """
+    batch = invoice_batches[user_id] = [text]
+    try:
+        collected = 0
+        while collected != len(batch):
+            collected = len(batch)
+            await asyncio.sleep(BULK_WINDOW_SECONDS)
+        return batch
+    finally:
+        invoice_batches.pop(user_id, None)
+
+
 # Хендлер для обробки тексту рахунку
 @dp.message(StateFilter(BotStates.waiting_for_invoice_text))
 async def process_invoice_text(message: Message, state: FSMContext):
-    """Обробка тексту повідомлення з рахунком"""
+    """Обробка тексту повідомлення з рахунком (або кількох рахунків)"""
     try:
-        text = message.text
+        user_id = message.from_user.id
+        text = message.text or message.caption or ''
+        
+        if message.forward_origin is not None:
+            # Переслані повідомлення приходять пачкою - обробляє перше з них
+            if user_id in invoice_batches:
+                invoice_batches[user_id].append(text)
+                return
+            texts = await collect_invoice_batch(user_id, text)
+        else:
+            texts = [text]
+        
+        invoice_texts = [invoice for message_text in texts for invoice in split_invoice_texts(message_text)]
+        if len(invoice_texts) > 1:
+            await process_invoice_batch(message, state, invoice_texts)
+            return
+        text = invoice_texts[0]
         
         # Парсимо суму з тексту
         amount = parse_amount_from_text(text)
@@ -134,16 +253,15 @@ async def process_invoice_text(message: Message, state: FSMContext):
         car_info = extract_car_info(text)
         
         # Додаємо рахунок в базу даних
-        success = db.add_invoice(
-            user_id=message.from_user.id,
+        balance = await db.add_invoice(
+            user_id=user_id,
             car_info=car_info,
             amount=amount,
             original_text=text
         )
         
-        if success:
+        if balance is not None:
             await state.clear()
-            balance = db.get_balance(message.from_user.id)
             
             response = f"{MESSAGES['invoice_added']}\n\n"
             response += f"🚗 Авто: {car_info}\n"
@@ -169,8 +287,65 @@ async def process_invoice_text(message: Message, state: FSMContext):
         await state.clear()
 
 
+async def process_invoice_batch(message: Message, state: FSMContext, texts: list):
+    """
+    Додавання кількох рахунків одним записом з одним підсумком
+    
+    Args:
+        message: Повідомлення, на яке надсилається підсумок
+        state: Стан FSM користувача
+        texts: Тексти окремих рахунків
+    """
+    invoices, skipped = [], []
+    for text in texts:
+        amount = parse_amount_from_text(text)
+        if amount is None:
+            skipped.append(text)
+            continue
+        invoices.append({
+            'car_info': extract_car_info(text),
+            'amount': amount,
+            'original_text': text
+        })
+    
+    if not invoices:
+        await message.answer(
+            MESSAGES['no_amount_found'],
+            reply_markup=get_back_to_menu()
+        )
+        return
+    
+    balance = await db.add_invoices(message.from_user.id, invoices)
+    
+    if balance is None:
+        await message.answer(
+            MESSAGES['error'],
+            reply_markup=get_main_menu()
+        )
+        return
+    
+    await state.clear()
+    
+    response = f"{MESSAGES['invoices_added']}\n\n"
+    for number, invoice in enumerate(invoices, 1):
+        response += f"{number}. 🚗 {truncate_text(invoice['car_info'], 40)} — {invoice['amount']:.2f} €\n"
+    response += f"\n💰 Разом: {sum(invoice['amount'] for invoice in invoices):.2f} € (рахунків: {len(invoices)})\n"
+    
+    if skipped:
+        response += f"\n⚠️ Не знайдено суму ({len(skipped)}):\n"
+        for text in skipped:
+            response += f"• {truncate_text(' '.join(text.split()), 40)}\n"
+    
+    response += f"\n📊 Поточний баланс:\n{format_balance(balance)}"
+    
+    await message.answer(
+        response,
+        reply_markup=get_main_menu()
+    )
+
+
 # Хендлер для додавання платежу
-@dp.callback_query(F.data == "menu_add_payment")
+@callback_router.route("menu_add_payment")
 async def add_payment_start(callback: CallbackQuery, state: FSMContext):
     """Початок додавання платежу - введення суми"""
     try:
@@ -218,25 +393,13 @@ async def process_payment_amount(message: Message, state: FSMContext):
 
 
 # Хендлер для навігації календаря
-@dp.callback_query(F.data.startswith("calendar_"))
-async def calendar_navigation(callback: CallbackQuery):
+@callback_router.route(CalendarCallback)
+async def calendar_navigation(callback: CallbackQuery, callback_data: CalendarCallback):
     """Навігація по календарю"""
     try:
-        data = callback.data
-        
-        if data.startswith("calendar_prev_"):
-            # Попередній місяць
-            _, _, year, month = data.split('_')
-            await callback.message.edit_reply_markup(
-                reply_markup=get_calendar(int(year), int(month))
-            )
-        elif data.startswith("calendar_next_"):
-            # Наступний місяць
-            _, _, year, month = data.split('_')
-            await callback.message.edit_reply_markup(
-                reply_markup=get_calendar(int(year), int(month))
-            )
-        
+        await callback.message.edit_reply_markup(
+            reply_markup=get_calendar(callback_data.year, callback_data.month)
+        )
         await callback.answer()
         
     except Exception as e:
@@ -245,12 +408,11 @@ async def calendar_navigation(callback: CallbackQuery):
 
 
 # Хендлер для вибору дати
-@dp.callback_query(F.data.startswith("date_selected_"))
-async def date_selected(callback: CallbackQuery, state: FSMContext):
+@callback_router.route(DateCallback)
+async def date_selected(callback: CallbackQuery, callback_data: DateCallback, state: FSMContext):
     """Обробка вибору дати платежу - показуємо 5 останніх рахунків"""
     try:
-        # Парсимо дату з callback_data
-        selected_date = parse_date_from_callback(callback.data)
+        selected_date = format_callback_date(callback_data.year, callback_data.month, callback_data.day)
         
         if not selected_date:
             await callback.answer("Помилка вибору дати")
@@ -266,7 +428,7 @@ async def date_selected(callback: CallbackQuery, state: FSMContext):
             return
         
         # Отримуємо останні 5 рахунків користувача
-        recent_invoices = db.get_recent_invoices(callback.from_user.id, limit=5)
+        recent_invoices = await db.get_recent_invoices(callback.from_user.id, limit=5)
         
         response = f"💰 Сума: {payment_amount:.2f} €\n📅 Дата: {selected_date}\n\n"
         if recent_invoices:
@@ -292,8 +454,8 @@ async def date_selected(callback: CallbackQuery, state: FSMContext):
 
 
 # Хендлер для вибору рахунку або "на баланс"
-@dp.callback_query(F.data.startswith("select_invoice_"))
-async def invoice_selected(callback: CallbackQuery, state: FSMContext):
+@callback_router.route(InvoiceSelectCallback)
+async def invoice_selected(callback: CallbackQuery, callback_data: InvoiceSelectCallback, state: FSMContext):
     """Обробка вибору рахунку для оплати - відразу створюємо платіж"""
     try:
         # Отримуємо дані зі стану
@@ -306,12 +468,9 @@ async def invoice_selected(callback: CallbackQuery, state: FSMContext):
             await state.clear()
             return
         
-        # Парсимо ID рахунку з callback_data
-        callback_parts = callback.data.split('_')
-        
-        if callback_parts[2] == "balance":
+        if callback_data.invoice_id is None:
             # Платіж на баланс
-            success = db.add_payment(
+            balance = await db.add_payment(
                 user_id=callback.from_user.id,
                 amount=final_amount,
                 date_paid=payment_date
@@ -319,17 +478,17 @@ async def invoice_selected(callback: CallbackQuery, state: FSMContext):
             payment_description = "на баланс"
         else:
             # Платіж за конкретний рахунок
-            invoice_id = int(callback_parts[2])
+            invoice_id = callback_data.invoice_id
             
             # Отримуємо інформацію про рахунок для перевірки
-            recent_invoices = db.get_recent_invoices(callback.from_user.id, limit=5)
+            recent_invoices = await db.get_recent_invoices(callback.from_user.id, limit=5)
             selected_invoice = next((inv for inv in recent_invoices if inv['id'] == invoice_id), None)
             
             if not selected_invoice:
                 await callback.answer("Рахунок не знайдено")
                 return
             
-            success = db.add_payment_for_invoice(
+            balance = await db.add_payment_for_invoice(
                 user_id=callback.from_user.id,
                 invoice_id=invoice_id,
                 amount=final_amount,
@@ -337,9 +496,8 @@ async def invoice_selected(callback: CallbackQuery, state: FSMContext):
             )
             payment_description = f"за рахунок: {selected_invoice['car_info']}"
         
-        if success:
+        if balance is not None:
             await state.clear()
-            balance = db.get_balance(callback.from_user.id)
             
             response = f"✅ Платіж успішно додано!\n\n"
             response += f"💰 Сума: {final_amount:.2f} €\n"
@@ -370,11 +528,11 @@ async def invoice_selected(callback: CallbackQuery, state: FSMContext):
 
 
 # Хендлер для перегляду балансу
-@dp.callback_query(F.data == "menu_balance")
+@callback_router.route("menu_balance")
 async def show_balance(callback: CallbackQuery):
     """Показ поточного балансу"""
     try:
-        balance = db.get_balance(callback.from_user.id)
+        balance = await db.get_balance(callback.from_user.id)
         
         response = f"{MESSAGES['balance']}\n\n"
         response += format_balance(balance)
@@ -391,13 +549,16 @@ async def show_balance(callback: CallbackQuery):
 
 
 # Хендлер для перегляду історії
-@dp.callback_query(F.data == "menu_history")
+@callback_router.route("menu_history")
 async def show_history(callback: CallbackQuery):
     """Показ історії операцій"""
     try:
         user_id = callback.from_user.id
-        history = db.get_history(user_id)
-        current_balance = db.get_balance(user_id)
+        # Історія та баланс незалежні - запитуємо їх паралельно
+        history, current_balance = await asyncio.gather(
+            db.get_history(user_id),
+            db.get_balance(user_id)
+        )
         
         # Заголовок згідно зображення
         response = "🏠 VA BROTHERS BALANCE\n\n"
@@ -438,7 +599,7 @@ async def show_history(callback: CallbackQuery):
 
 
 # Хендлер для експорту
-@dp.callback_query(F.data == "menu_export")
+@callback_router.route("menu_export")
 async def export_menu(callback: CallbackQuery):
     """Меню експорту"""
     try:
@@ -452,52 +613,93 @@ async def export_menu(callback: CallbackQuery):
         await callback.answer("Сталася помилка")
 
 
-# Хендлер для експорту в текстовий файл
-@dp.callback_query(F.data == "export_text")
-async def export_text(callback: CallbackQuery):
-    """Експорт історії в текстовий файл"""
+# Формати експорту: функція запису, розширення файлу, підпис документа
+EXPORT_FORMATS = {
+    "export_text": (write_text_export, "txt", "📋 Експорт історії операцій"),
+    "export_csv": (write_csv_export, "csv", "📊 Таблиця операцій (CSV)"),
+    "export_xlsx": (write_xlsx_export, "xlsx", "📗 Таблиця операцій (Excel)"),
+}
+
+
+def export_progress(message: Message):
+    """
+    Функція прогресу для фонового експорту
+    
+    Редагує повідомлення "експорт розпочато" не частіше ніж раз на
+    EXPORT_PROGRESS_INTERVAL секунд, тому невеликі експорти завершуються
+    без жодного проміжного оновлення.
+    """
+    last_update = time.monotonic()
+    
+    async def update(operation_count: int):
+        nonlocal last_update
+        if time.monotonic() - last_update < EXPORT_PROGRESS_INTERVAL:
+            return
+        last_update = time.monotonic()
+        try:
+            await message.edit_text(f"⏳ Експорт... оброблено операцій: {operation_count}")
+        except TelegramBadRequest:
+            pass
+    
+    return update
+
+
+async def run_export_job(message: Message, user_id: int, export_format: str):
+    """Фонова задача експорту: запис файлу в пам'ять і відправка користувачу"""
+    write_export, extension, caption = EXPORT_FORMATS[export_format]
+    started = time.perf_counter()
     try:
-        # Отримуємо експорт з бази даних
-        export_data = db.export_history(callback.from_user.id)
+        # Звіт записується потоково в пам'ять, без тимчасового файлу на диску
+        buffer = BytesIO()
+        operation_count = await write_export(db, user_id, buffer, progress=export_progress(message))
         
-        # Створюємо файл
-        filename = f"car_payments_export_{callback.from_user.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        filename = f"car_payments_export_{user_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
         filename = sanitize_filename(filename)
         
-        # Записуємо дані у файл
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(export_data)
-        
         # Відправляємо файл користувачу
-        document = FSInputFile(filename)
-        await callback.message.answer_document(
-            document,
-            caption="📋 Експорт історії операцій"
-        )
+        document = BufferedInputFile(buffer.getvalue(), filename=filename)
+        await message.answer_document(document, caption=caption)
         
-        # Видаляємо тимчасовий файл
-        import os
-        os.remove(filename)
-        
-        await callback.message.edit_text(
-            "✅ Експорт завершено!",
+        await message.edit_text(
+            f"✅ Експорт завершено! Операцій: {operation_count}",
             reply_markup=get_main_menu()
         )
+        EXPORT_SECONDS.observe(export_format, time.perf_counter() - started)
+        
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка експорту {export_format} для користувача {user_id}: {e}")
+        await message.edit_text("❌ Сталася помилка експорту", reply_markup=get_main_menu())
+
+
+# Хендлер для експорту (текст, CSV, XLSX) у фоновій задачі
+@callback_router.route(*EXPORT_FORMATS)
+async def export_history_file(callback: CallbackQuery):
+    """Запуск фонового експорту історії у вибраному форматі"""
+    try:
+        user_id = callback.from_user.id
+        if export_jobs.running(user_id) >= export_jobs.per_user_limit:
+            await callback.answer("⏳ Попередній експорт ще виконується", show_alert=True)
+            return
+        
+        await callback.message.edit_text("⏳ Експорт розпочато, файл надійде в цей чат...")
+        export_jobs.start(user_id, run_export_job(callback.message, user_id, callback.data))
         await callback.answer()
         
     except Exception as e:
-        logger.error(f"Помилка в export_text: {e}")
+        logger.error(f"Помилка в export_history_file: {e}")
         await callback.answer("Сталася помилка експорту")
 
 
 # Хендлер для меню видалення операцій
-@dp.callback_query(F.data == "delete_operations_menu")
+@callback_router.route("delete_operations_menu")
 async def delete_operations_menu(callback: CallbackQuery, state: FSMContext):
     """Відображення списку операцій для видалення"""
     try:
         await state.set_state(BotStates.deleting_operations)
         user_id = callback.from_user.id
-        operations, total_count, total_pages = db.get_paginated_history(user_id, page=1, per_page=5)
+        operations, total_count, total_pages = await db.get_paginated_history(user_id, page=1, per_page=5)
         
         if not operations:
             await callback.message.edit_text(
@@ -507,7 +709,13 @@ async def delete_operations_menu(callback: CallbackQuery, state: FSMContext):
             await callback.answer()
             return
         
-        await state.update_data(delete_page=1)
+        # Курсор наступної сторінки - остання операція поточної; кількість
+        # операцій рахується лише тут (після видалення стан очищується)
+        await state.update_data(
+            delete_page=1,
+            delete_cursors={'2': operation_cursor(operations[-1])},
+            delete_total=total_count
+        )
         
         text = f"🗑️ Оберіть операцію для видалення:\n\n"
         for i, op in enumerate(operations, 1):
@@ -532,20 +740,28 @@ async def delete_operations_menu(callback: CallbackQuery, state: FSMContext):
 
 
 # Хендлер для навігації по сторінках видалення
-@dp.callback_query(F.data.startswith("delete_page_"))
-async def delete_page_navigation(callback: CallbackQuery, state: FSMContext):
+@callback_router.route(DeletePageCallback)
+async def delete_page_navigation(callback: CallbackQuery, callback_data: DeletePageCallback, state: FSMContext):
     """Навігація по сторінках для видалення"""
     try:
-        page = int(callback.data.split("_")[-1])
+        page = callback_data.page
         user_id = callback.from_user.id
         
-        operations, total_count, total_pages = db.get_paginated_history(user_id, page=page, per_page=5)
+        # Курсори сторінок зберігаються в стані, щоб не перечитувати попередні сторінки
+        state_data = await state.get_data()
+        cursors = state_data.get('delete_cursors', {})
+        
+        operations, total_count, total_pages = await db.get_paginated_history(
+            user_id, page=page, per_page=5, cursor=cursors.get(str(page)),
+            total_count=state_data.get('delete_total')
+        )
         
         if not operations:
             await callback.answer("Немає операцій на цій сторінці")
             return
         
-        await state.update_data(delete_page=page)
+        cursors[str(page + 1)] = operation_cursor(operations[-1])
+        await state.update_data(delete_page=page, delete_cursors=cursors, delete_total=total_count)
         
         text = f"🗑️ Оберіть операцію для видалення:\n\n"
         for i, op in enumerate(operations, 1):
@@ -568,30 +784,16 @@ async def delete_page_navigation(callback: CallbackQuery, state: FSMContext):
 
 
 # Хендлер для вибору операції для видалення
-@dp.callback_query(F.data.startswith("delete_invoice_") | F.data.startswith("delete_payment_"))
-async def select_operation_for_deletion(callback: CallbackQuery, state: FSMContext):
+@callback_router.route(DeleteOperationCallback)
+async def select_operation_for_deletion(callback: CallbackQuery, callback_data: DeleteOperationCallback):
     """Підтвердження видалення операції"""
     try:
-        parts = callback.data.split("_")
-        operation_type = parts[1]  # 'invoice' або 'payment'
-        operation_id = int(parts[2])
+        operation_type = callback_data.operation_type  # 'invoice' або 'payment'
+        operation_id = callback_data.operation_id
         user_id = callback.from_user.id
         
-        # Отримуємо деталі операції з Supabase
-        if operation_type == 'invoice':
-            result_data = db.supabase.table('invoices')\
-                .select('car_info, amount, date_created, original_text')\
-                .eq('id', operation_id)\
-                .eq('user_id', user_id)\
-                .execute()
-        else:  # payment
-            result_data = db.supabase.table('payments')\
-                .select('amount, date_paid, date_created')\
-                .eq('id', operation_id)\
-                .eq('user_id', user_id)\
-                .execute()
-        
-        result = result_data.data[0] if result_data.data else None
+        # Отримуємо деталі операції з бази даних
+        result = await db.get_operation(user_id, operation_type, operation_id)
         
         if not result:
             await callback.answer("Операція не знайдена")
@@ -632,26 +834,23 @@ async def select_operation_for_deletion(callback: CallbackQuery, state: FSMConte
 
 
 # Хендлер для підтвердження видалення операції
-@dp.callback_query(F.data.startswith("confirm_delete_"))
-async def confirm_delete_operation(callback: CallbackQuery, state: FSMContext):
+@callback_router.route(ConfirmDeleteCallback)
+async def confirm_delete_operation(callback: CallbackQuery, callback_data: ConfirmDeleteCallback, state: FSMContext):
     """Виконання видалення операції"""
     try:
-        parts = callback.data.split("_")
-        operation_type = parts[2]  # 'invoice' або 'payment'
-        operation_id = int(parts[3])
+        operation_type = callback_data.operation_type  # 'invoice' або 'payment'
+        operation_id = callback_data.operation_id
         user_id = callback.from_user.id
         
         # Видаляємо операцію
         if operation_type == 'invoice':
-            success = db.delete_invoice_by_id(user_id, operation_id)
+            balance = await db.delete_invoice_by_id(user_id, operation_id)
             op_name = "рахунок"
         else:  # payment
-            success = db.delete_payment_by_id(user_id, operation_id)
+            balance = await db.delete_payment_by_id(user_id, operation_id)
             op_name = "платіж"
         
-        if success:
-            balance = db.get_balance(user_id)
-            
+        if balance is not None:
             text = f"✅ {op_name.capitalize()} успішно видалено!\n\n"
             text += f"📊 Поточний баланс:\n{format_balance(balance)}"
             
@@ -674,7 +873,7 @@ async def confirm_delete_operation(callback: CallbackQuery, state: FSMContext):
 
 
 # Хендлер для ігнорування callback'ів
-@dp.callback_query(F.data == "ignore")
+@callback_router.route("ignore")
 async def ignore_callback(callback: CallbackQuery):
     """Ігнорування натискання на неактивні кнопки"""
     await callback.answer()
@@ -697,11 +896,19 @@ async def unknown_message(message: Message, state: FSMContext):
 
 
 # Хендлер для невідомих callback'ів
-@dp.callback_query()
+@callback_router.fallback
 async def unknown_callback(callback: CallbackQuery):
-    """Обробка невідомих callback'ів"""
-    await callback.answer("Невідома команда")
+    """Обробка невідомих callback'ів: застарілі кнопки замінюються головним меню"""
     logger.warning(f"Невідомий callback: {callback.data}")
+    try:
+        await callback.message.edit_text(
+            MESSAGES['start'],
+            reply_markup=get_main_menu()
+        )
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Помилка в unknown_callback: {e}")
+        await callback.answer("Невідома команда")
 
 
 # HTTP сервер для health check
@@ -710,47 +917,156 @@ async def health_check(request):
     return web.Response(text="OK")
 
 
-async def start_web_server():
-    """Запуск HTTP сервера для health check"""
+@REGISTRY.collector
+async def collect_state_metrics():
+    """Стани FSM та лічильники кешів на момент запиту /metrics"""
+    caches = {'calendar': calendar_cache_stats(), 'edits': edit_cache.stats()}
+    if db is not None:
+        caches.update(db.stats())
+    if isinstance(dp.storage, SQLiteFSMStorage) and dp.storage.cache is not None:
+        caches['fsm'] = dp.storage.cache.stats()
+    
+    def by_cache(field: str) -> dict:
+        return {name: stats[field] for name, stats in caches.items() if field in stats}
+    
+    return (
+        metric_lines('bot_fsm_states', 'gauge', 'Незавершені діалоги за станом FSM', 'state',
+                     await count_fsm_states(dp.storage)) +
+        metric_lines('bot_cache_hits_total', 'counter', 'Влучання кешу', 'cache', by_cache('hits')) +
+        metric_lines('bot_cache_misses_total', 'counter', 'Промахи кешу', 'cache', by_cache('misses')) +
+        metric_lines('bot_cache_evictions_total', 'counter', 'Витіснення з кешу', 'cache', by_cache('evictions')) +
+        metric_lines('bot_cache_entries', 'gauge', 'Кількість записів у кеші', 'cache', by_cache('size')) +
+        metric_lines('bot_cache_hit_ratio', 'gauge', 'Частка влучань кешу', 'cache', by_cache('hit_rate')) +
+        metric_lines('bot_edits_skipped_total', 'counter', 'Редагування без змін, не надіслані в Telegram', 'method',
+                     edit_cache.skipped)
+    )
+
+
+async def metrics_endpoint(request):
+    """Метрики в текстовому форматі Prometheus"""
+    return web.Response(body=(await REGISTRY.render()).encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def profile_endpoint(request):
+    """Запуск семплінгового профайлера: POST /debug/profile?updates=N із заголовком X-Profile-Token"""
+    if not hmac.compare_digest(request.headers.get('X-Profile-Token', ''), PROFILE_TOKEN):
+        return web.Response(status=403, text="Forbidden")
+    try:
+        updates = int(request.query.get('updates', '100'))
+        path = profiler.start(updates)
+    except ValueError as e:
+        return web.Response(status=400, text=str(e))
+    if path is None:
+        return web.Response(status=409, text=f"Профілювання вже йде: {profiler.path}")
+    return web.Response(text=f"Профілювання наступних {updates} оновлень: {path}")
+
+
+def create_web_app() -> web.Application:
+    """
+    Створення aiohttp застосунку: health check, /metrics, webhook (якщо WEBHOOK_URL задано)
+    та /debug/profile (якщо PROFILE_TOKEN задано)
+    
+    Returns:
+        web.Application: Застосунок для start_web_server
+    """
+    app = web.Application()
+    app.router.add_get('/', health_check)
+    app.router.add_get('/health', health_check)
+    app.router.add_get('/metrics', metrics_endpoint)
+    if PROFILE_TOKEN:
+        app.router.add_post('/debug/profile', profile_endpoint)
+    
+    if WEBHOOK_URL:
+        from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+        
+        # Оновлення від Telegram обробляються у фоні, відповідь 200 - одразу
+        SimpleRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            secret_token=WEBHOOK_SECRET or None
+        ).register(app, path=WEBHOOK_PATH)
+        setup_application(app, dp, bot=bot)
+    
+    return app
+
+
+async def start_web_server(app: web.Application):
+    """
+    Запуск HTTP сервера на WEB_SERVER_PORT
+    
+    Returns:
+        Optional[web.AppRunner]: Запущений сервер або None у випадку помилки
+    """
     try:
-        app = web.Application()
-        app.router.add_get('/', health_check)
-        app.router.add_get('/health', health_check)
-        
         runner = web.AppRunner(app)
         await runner.setup()
-        site = web.TCPSite(runner, '0.0.0.0', 8000)
+        site = web.TCPSite(runner, '0.0.0.0', WEB_SERVER_PORT)
         await site.start()
         
-        logger.info("HTTP сервер запущено на порту 8000")
+        logger.info(f"HTTP сервер запущено на порту {WEB_SERVER_PORT}")
+        return runner
     except Exception as e:
         logger.error(f"Помилка запуску HTTP сервера: {e}")
+        return None
+
+
+async def init_storage():
+    """Створення сховища та прогрів з'єднання до першого оновлення"""
+    global db
+    logger.info("Ініціалізація бази даних...")
+    storage = await create_storage()
+    await storage.warm_up()
+    db = ProfiledDatabase(storage)
+    logger.info("Підключення до бази даних успішно встановлено")
 
 
 async def main():
     """Основна функція запуску бота"""
-    global db
+    runner = None
     
     try:
         logger.info("Запуск бота...")
         
-        # Ініціалізуємо базу даних
-        logger.info("Ініціалізація бази даних...")
-        db = initialize_database()
-        logger.info("Підключення до Supabase успішно встановлено")
-        
-        # Видаляємо webhook (якщо був встановлений)
-        await bot.delete_webhook(drop_pending_updates=True)
-        
-        # Запускаємо обидва сервіси паралельно
-        await asyncio.gather(
-            start_web_server(),
-            dp.start_polling(bot)
-        )
+        # Сховище (створення клієнта у потоці, перше з'єднання) готується
+        # одночасно з запитами до Telegram - їх затримки перекриваються
+        startup = [init_storage(), bot.me()]
+        if isinstance(dp.storage, SQLiteFSMStorage):
+            # Стани діалогів зберігаються між перезапусками (закриває dp при зупинці)
+            startup.append(dp.storage.connect())
+        
+        if WEBHOOK_URL:
+            # Webhook передає оновлення хендлерам одразу - сервер запускається після БД
+            await asyncio.gather(*startup)
+            runner = await start_web_server(create_web_app())
+            if runner is None:
+                raise RuntimeError("HTTP сервер не запущено, webhook не може приймати оновлення")
+            
+            # Telegram надсилає оновлення на сервер бота замість постійного getUpdates;
+            # оновлення, що надійшли під час перезапуску, не відкидаються
+            await bot.set_webhook(
+                f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=dp.resolve_used_update_types()
+            )
+            logger.info(f"Webhook встановлено: {WEBHOOK_URL}{WEBHOOK_PATH}")
+            await asyncio.Event().wait()
+        else:
+            # Health check не залежить від БД і запускається першим (локальний порт,
+            # без мережі), тому закривається і тоді, коли решта запуску не вдалася
+            runner = await start_web_server(create_web_app())
+            # Webhook (якщо був встановлений) видаляється без відкидання оновлень,
+            # що надійшли під час перезапуску
+            await asyncio.gather(bot.delete_webhook(), *startup)
+            await dp.start_polling(bot)
         
     except Exception as e:
         logger.error(f"Критична помилка: {e}")
     finally:
+        if runner is not None:
+            await runner.cleanup()
+        await export_jobs.close()
+        if db is not None:
+            await db.close()
         await bot.session.close()
 
 
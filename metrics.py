@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Межі кошиків гістограм у секундах (від 5 мс до 30 с)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Формат для Prometheus та сумісних збирачів
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    """Екранування значення мітки для текстового формату Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def metric_lines(name: str, metric_type: str, documentation: str, label: str,
+                 values: Dict[str, float]) -> List[str]:
+    """
+    Рядки метрики з однією міткою (counter або gauge)
+
+    Args:
+        name: Назва метрики
+        metric_type: 'counter' або 'gauge'
+        documentation: Опис для HELP
+        label: Назва мітки
+        values: Значення мітки -> значення метрики
+
+    Returns:
+        List[str]: Рядки HELP, TYPE та значення
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for label_value, value in sorted(values.items()):
+        lines.append(f'{name}{{{label}="{_escape(label_value)}"}} {_format_value(value)}')
+    return lines
+
+
+class Histogram:
+    """
+    Гістограма тривалості з однією міткою
+
+    observe() лише знаходить кошик бінарним пошуком і збільшує лічильник
+    (накопичувальні суми рахуються під час збору), тому її можна
+    викликати на кожне оновлення та з потоків пулу бази даних.
+    """
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            name: Назва метрики
+            documentation: Опис для HELP
+            label: Назва мітки (handler, method, ...)
+            buckets: Верхні межі кошиків у секундах
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(buckets)
+        # значення мітки -> [лічильники кошиків + кошик +Inf, сума]
+        self._series: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float):
+        """Запис одного вимірювання"""
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def count(self, label_value: str) -> int:
+        """Кількість вимірювань для значення мітки"""
+        series = self._series.get(label_value)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_value, (counts, total) in sorted(snapshot.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{_format_value(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total!r}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+Collector = Callable[[], Awaitable[Iterable[str]]]
+
+
+class MetricsRegistry:
+    """Гістограми процесу та колектори, які рахуються під час запиту /metrics"""
+
+    def __init__(self):
+        self.histograms: List[Histogram] = []
+        self._collectors: List[Collector] = []
+
+    def histogram(self, name: str, documentation: str, label: str,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        histogram = Histogram(name, documentation, label, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def collector(self, func: Collector) -> Collector:
+        """Декоратор асинхронної функції, що повертає рядки метрик (metric_lines)"""
+        self._collectors.append(func)
+        return func
+
+    async def render(self) -> str:
+        """Усі метрики в текстовому форматі Prometheus"""
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(await collector())
+            except Exception as e:
+                logger.error(f"Помилка колектора метрик {collector.__name__}: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    'bot_handler_seconds', 'Тривалість обробки оновлення хендлером aiogram', 'handler'
+)
+EXPORT_SECONDS = REGISTRY.histogram(
+    'bot_export_seconds', 'Тривалість фонового експорту історії', 'format'
+)
+SUPABASE_CALL_SECONDS = REGISTRY.histogram(
+    'supabase_call_seconds', 'Тривалість виклику методу SupabaseDatabase (у потоці пулу)', 'method'
+)
+
+
+def resolve_handler_name(event: Any, data: Dict[str, Any], callback_router=None) -> str:
+    """
+    Назва хендлера, що обробляє подію (у внутрішньому middleware)
+
+    Args:
+        event: Повідомлення або callback-запит
+        data: Дані middleware aiogram (містять 'handler')
+        callback_router: callbacks.CallbackRouter, якщо callback-запити йдуть через нього
+
+    Returns:
+        str: Назва функції хендлера
+    """
+    handler = data['handler'].callback
+    if callback_router is not None and handler == callback_router.dispatch:
+        return callback_router.handler_name(getattr(event, 'data', None))
+    return getattr(handler, '__name__', 'unknown')
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутрішній middleware: час виконання хендлера в HANDLER_SECONDS
+
+    Callback-запити обробляє один хендлер CallbackRouter, тому для них
+    міткою стає назва хендлера, знайденого роутером.
+    """
+
+    def __init__(self, histogram: Histogram = HANDLER_SECONDS, callback_router=None):
+        """
+        Args:
+            histogram: Гістограма для вимірювань
+            callback_router: callbacks.CallbackRouter для назв callback-хендлерів
+        """
+        self.histogram = histogram
+        self.callback_router = callback_router
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event: Any,
+                       data: Dict[str, Any]) -> Optional[Any]:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.histogram.observe(resolve_handler_name(event, data, self.callback_router), time.perf_counter() - started)
@@ -0,0 +1,288 @@
+import asyncio
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+from config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL, SLOW_UPDATE_SECONDS
+from metrics import resolve_handler_name
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Фази обробки оновлення та їх назви в журналі
+PHASES = ('db', 'render', 'api')
+PHASE_NAMES = {'db': 'БД', 'render': 'рендер', 'api': 'Telegram API', 'other': 'інше'}
+
+
+class UpdateProfile:
+    """
+    Розбивка часу одного оновлення за фазами
+
+    Фаза рахується від входу в перший виклик до виходу з останнього,
+    тому паралельні запити (asyncio.gather) та вкладені виклики
+    рендеру не додають час двічі.
+    """
+
+    __slots__ = ('started', 'totals', 'calls', '_active', '_since')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self._active = dict.fromkeys(PHASES, 0)
+        self._since = dict.fromkeys(PHASES, 0.0)
+
+    def enter(self, phase: str):
+        if self._active[phase] == 0:
+            self._since[phase] = time.perf_counter()
+        self._active[phase] += 1
+        self.calls[phase] += 1
+
+    def exit(self, phase: str):
+        self._active[phase] -= 1
+        if self._active[phase] == 0:
+            self.totals[phase] += time.perf_counter() - self._since[phase]
+
+    def breakdown(self, elapsed: float) -> str:
+        """Рядок 'БД 0.912 с (3), рендер ...' для журналу"""
+        parts = [
+            f"{PHASE_NAMES[phase]} {self.totals[phase]:.3f} с ({self.calls[phase]})"
+            for phase in PHASES
+        ]
+        other = max(elapsed - sum(self.totals.values()), 0.0)
+        parts.append(f"{PHASE_NAMES['other']} {other:.3f} с")
+        return ', '.join(parts)
+
+
+# Профіль оновлення, яке обробляється в поточній задачі (None - поза хендлером)
+_current_profile: ContextVar[Optional[UpdateProfile]] = ContextVar('update_profile', default=None)
+
+
+def render_phase(func: Callable) -> Callable:
+    """Декоратор функцій форматування тексту та клавіатур (фаза 'render')"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        profile.enter('render')
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.exit('render')
+
+    return wrapper
+
+
+def _db_phase(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return await func(*args, **kwargs)
+        profile.enter('db')
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            profile.exit('db')
+
+    return wrapper
+
+
+class ProfiledDatabase:
+    """
+    Обгортка сховища: час асинхронних методів записується у фазу 'db'
+
+    Синхронні методи (stats) та потокове читання (iter_operations)
+    передаються без змін.
+    """
+
+    def __init__(self, database):
+        """
+        Args:
+            database: Сховище (CachedDatabase з storage.create_storage)
+        """
+        self.database = database
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.database, name)
+        if inspect.iscoroutinefunction(attribute):
+            attribute = _db_phase(attribute)
+        # Наступні звернення не проходять через __getattr__
+        setattr(self, name, attribute)
+        return attribute
+
+
+class ApiPhaseMiddleware(BaseRequestMiddleware):
+    """Middleware сесії бота: запити до Telegram Bot API у фазі 'api'"""
+
+    async def __call__(self, make_request, bot, method):
+        profile = _current_profile.get()
+        if profile is None:
+            return await make_request(bot, method)
+        profile.enter('api')
+        try:
+            return await make_request(bot, method)
+        finally:
+            profile.exit('api')
+
+
+class SamplingProfiler:
+    """
+    Семплінговий профайлер циклу подій для наступних N оновлень
+
+    Окремий потік кожні interval секунд знімає стек потоку циклу подій
+    (sys._current_frames) і рахує однакові стеки. Результат - файл у
+    форматі folded stacks ('a;b;c кількість'), який відкривають
+    speedscope, flamegraph.pl або inferno. Очікування мережі видно як
+    стек selector.select, CPU хендлерів - як стеки корутин.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, interval: float = PROFILE_SAMPLE_INTERVAL):
+        """
+        Args:
+            directory: Тека для файлів профілю
+            interval: Інтервал між знімками стека в секундах
+        """
+        self.directory = directory
+        self.interval = interval
+        self.path: Optional[str] = None
+        self._remaining = 0
+        self._in_flight = 0
+        self._updates = 0
+        self._samples: Counter = Counter()
+        self._stop: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self.path is not None
+
+    def start(self, updates: int) -> Optional[str]:
+        """
+        Профілювання наступних updates оновлень
+
+        Args:
+            updates: Кількість оновлень
+
+        Returns:
+            Optional[str]: Шлях до майбутнього файлу профілю або None, якщо профілювання вже йде
+        """
+        if updates < 1:
+            raise ValueError(f"Кількість оновлень має бути додатною: {updates}")
+        if self.active:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        self._remaining = updates
+        self._updates = 0
+        self._samples = Counter()
+        logger.info(f"Профілювання наступних {updates} оновлень: {self.path}")
+        return self.path
+
+    def begin(self) -> bool:
+        """Початок оновлення (у потоці циклу подій); True, якщо воно профілюється"""
+        if self._remaining <= 0:
+            return False
+        self._remaining -= 1
+        self._in_flight += 1
+        if self._thread is None:
+            # Своя подія зупинки: потік попереднього профілю може ще завершуватися
+            self._stop = threading.Event()
+            self._thread = threading.Thread(
+                target=self._sample, args=(threading.get_ident(), self._stop, self._samples),
+                name='profiler', daemon=True
+            )
+            self._thread.start()
+        return True
+
+    async def end(self):
+        """
+        Завершення профільованого оновлення
+
+        Після останнього оновлення потік знімків зупиняється, а очікування
+        його завершення та запис файлу виконуються в пулі потоків, щоб не
+        затримувати цикл подій саме на повільних оновленнях.
+        """
+        self._in_flight -= 1
+        self._updates += 1
+        if self._remaining <= 0 and self._in_flight == 0:
+            thread, self._thread = self._thread, None
+            path, self.path = self.path, None
+            self._stop.set()
+            await asyncio.to_thread(self._dump, thread, path, self._samples, self._updates)
+
+    def _sample(self, thread_id: int, stop: threading.Event, samples: Counter):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                samples[';'.join(reversed(stack))] += 1
+
+    @staticmethod
+    def _dump(thread: threading.Thread, path: str, samples: Counter, updates: int):
+        """Очікування потоку знімків і запис профілю (у пулі потоків)"""
+        thread.join()
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                for stack, count in samples.most_common():
+                    file.write(f"{stack} {count}\n")
+            logger.info(f"Профіль {updates} оновлень записано: {path} ({sum(samples.values())} знімків)")
+        except OSError as e:
+            logger.error(f"Помилка запису профілю {path}: {e}")
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """
+    Внутрішній middleware: розбивка часу хендлера на БД, рендер і Telegram API
+
+    Оновлення, довші за slow_threshold, потрапляють у журнал з розбивкою.
+    Якщо sampler запущено (SamplingProfiler.start), наступні оновлення
+    профілюються.
+    """
+
+    def __init__(self, slow_threshold: float = SLOW_UPDATE_SECONDS,
+                 sampler: Optional[SamplingProfiler] = None, callback_router=None):
+        """
+        Args:
+            slow_threshold: Поріг повільного оновлення в секундах
+            sampler: Семплінговий профайлер для профілювання на вимогу
+            callback_router: callbacks.CallbackRouter для назв callback-хендлерів
+        """
+        self.slow_threshold = slow_threshold
+        self.sampler = sampler
+        self.callback_router = callback_router
+
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event: Any,
+                       data: Dict[str, Any]) -> Optional[Any]:
+        profile = UpdateProfile()
+        token = _current_profile.set(profile)
+        sampled = self.sampler is not None and self.sampler.begin()
+        try:
+            return await handler(event, data)
+        finally:
+            _current_profile.reset(token)
+            elapsed = time.perf_counter() - profile.started
+            if sampled:
+                await self.sampler.end()
+            if elapsed >= self.slow_threshold:
+                user = getattr(event, 'from_user', None)
+                logger.warning(
+                    f"Повільне оновлення {resolve_handler_name(event, data, self.callback_router)} "
+                    f"(користувач {user.id if user else '-'}): {elapsed:.3f} с - {profile.breakdown(elapsed)}"
+                )
@@ -0,0 +1,636 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+
+import aiosqlite
+
+from config import DATABASE_NAME
+from storage import Storage
+from utils import extract_car_model_and_vin, next_day_iso, operation_cursor
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+# Схема повторює таблиці Supabase (ARCHITECTURE.md) та індекси з supabase_migrations.sql
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    car_info TEXT NOT NULL,
+    amount REAL NOT NULL,
+    original_text TEXT NOT NULL,
+    date_created TEXT NOT NULL,
+    car_model TEXT,
+    vin TEXT,
+    balance_after REAL
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    date_paid TEXT NOT NULL,
+    date_created TEXT NOT NULL,
+    invoice_id INTEGER,
+    car_info TEXT,
+    car_model TEXT,
+    vin TEXT,
+    balance_after REAL
+);
+
+CREATE TABLE IF NOT EXISTS balance (
+    user_id INTEGER PRIMARY KEY,
+    current_balance REAL NOT NULL DEFAULT 0,
+    last_updated TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_user_date ON invoices (user_id, date_created, id);
+CREATE INDEX IF NOT EXISTS idx_payments_user_date ON payments (user_id, date_created, id);
+"""
+
+# Індекси VIN створюються після _migrate (у старих файлах колонок ще немає)
+VIN_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_invoices_user_vin ON invoices (user_id, vin) WHERE vin IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_payments_user_vin ON payments (user_id, vin) WHERE vin IS NOT NULL;
+"""
+
+# Рядки для розбору car_model/vin під час міграції старого файлу
+VEHICLE_BACKFILL_SQL = {
+    'invoices': "SELECT id, car_info FROM invoices",
+    'payments': "SELECT p.id, COALESCE(p.car_info, i.car_info) AS car_info FROM payments p "
+                "LEFT JOIN invoices i ON i.id = p.invoice_id WHERE p.invoice_id IS NOT NULL",
+}
+
+# Наростаючий баланс для файлів без колонки balance_after (префіксна сума
+# в порядку стрічки операцій: дата, тип, id)
+BALANCE_BACKFILL_SQL = """
+    SELECT type, id, SUM(delta) OVER (
+        PARTITION BY user_id ORDER BY date_created, type, id
+    ) AS balance_after
+    FROM (
+        SELECT 'invoice' AS type, id, user_id, date_created, -amount AS delta FROM invoices
+        UNION ALL
+        SELECT 'payment' AS type, id, user_id, date_created, amount AS delta FROM payments
+    )
+"""
+
+# Баланс після останньої операції (до межі {where}): по одному рядку з
+# кожної таблиці за індексом (user_id, date_created, id), без сканування історії
+LAST_BALANCE_SQL = """
+    SELECT balance_after FROM (
+        SELECT * FROM (
+            SELECT balance_after, date_created, 'invoice' AS type, id FROM invoices
+            WHERE user_id = :user_id {where} ORDER BY date_created DESC, id DESC LIMIT 1
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT balance_after, date_created, 'payment' AS type, id FROM payments
+            WHERE user_id = :user_id {where} ORDER BY date_created DESC, id DESC LIMIT 1
+        )
+    ) ORDER BY date_created DESC, type DESC, id DESC LIMIT 1
+"""
+
+# Рядки стрічки операцій з кожної таблиці; {where} - додаткові умови (keyset курсор)
+INVOICE_OPERATIONS_SQL = """
+    SELECT 'invoice' AS type, id, amount, date_created, car_info, original_text,
+           NULL AS date_paid, NULL AS invoice_id, car_model, vin, balance_after
+    FROM invoices
+    WHERE user_id = :user_id {where}
+"""
+
+PAYMENT_OPERATIONS_SQL = """
+    SELECT 'payment' AS type, p.id, p.amount, p.date_created,
+           COALESCE(p.car_info, i.car_info) AS car_info, NULL AS original_text,
+           p.date_paid, p.invoice_id, p.car_model, p.vin, p.balance_after
+    FROM payments p
+    LEFT JOIN invoices i ON i.id = p.invoice_id
+    WHERE p.user_id = :user_id {where}
+"""
+
+# Об'єднана стрічка рахунків та платежів одного користувача
+OPERATIONS_SQL = (
+    INVOICE_OPERATIONS_SQL.format(where='') + "UNION ALL" + PAYMENT_OPERATIONS_SQL.format(where='')
+)
+
+
+class SQLiteDatabase(Storage):
+    """Локальне сховище на SQLite (aiosqlite) з тим самим API, що й Supabase"""
+
+    def __init__(self, path: str = DATABASE_NAME):
+        """
+        Args:
+            path: Шлях до файлу бази даних (':memory:' для тимчасової бази)
+        """
+        self.path = path
+        self._connection: Optional[aiosqlite.Connection] = None
+        # Одне з'єднання: записи (кілька команд + commit) не повинні перемежовуватися
+        self._write_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Відкриття з'єднання та створення таблиць"""
+        self._connection = await aiosqlite.connect(self.path)
+        self._connection.row_factory = aiosqlite.Row
+        await self._connection.executescript(SCHEMA)
+        await self._migrate()
+        await self._connection.executescript(VIN_INDEXES)
+        await self._connection.commit()
+        logger.info(f"Підключення до SQLite ({self.path}) успішно встановлено")
+
+    async def _migrate(self):
+        """Додавання колонок car_model/vin та balance_after до файлів, створених старішою версією схеми"""
+        for table, backfill_sql in VEHICLE_BACKFILL_SQL.items():
+            columns = {row['name'] for row in await self._fetchall(f"PRAGMA table_info({table})")}
+            if 'vin' in columns:
+                continue
+
+            await self._connection.execute(f"ALTER TABLE {table} ADD COLUMN car_model TEXT")
+            await self._connection.execute(f"ALTER TABLE {table} ADD COLUMN vin TEXT")
+
+            # Одноразовий розбір наявних рядків, далі поля заповнюються при записі
+            updates = []
+            for row in await self._fetchall(backfill_sql):
+                car_model, vin = extract_car_model_and_vin(row['car_info'])
+                updates.append((car_model, vin or None, row['id']))
+            await self._connection.executemany(
+                f"UPDATE {table} SET car_model = ?, vin = ? WHERE id = ?",
+                updates
+            )
+            logger.info(f"Таблицю {table} оновлено: car_model та vin для {len(updates)} рядків")
+
+        columns = {row['name'] for row in await self._fetchall("PRAGMA table_info(invoices)")}
+        if 'balance_after' not in columns:
+            await self._connection.execute("ALTER TABLE invoices ADD COLUMN balance_after REAL")
+            await self._connection.execute("ALTER TABLE payments ADD COLUMN balance_after REAL")
+
+            # Одноразовий розрахунок, далі колонка підтримується при записі та видаленні
+            updates = {'invoice': [], 'payment': []}
+            for row in await self._fetchall(BALANCE_BACKFILL_SQL):
+                updates[row['type']].append((row['balance_after'], row['id']))
+            for operation_type, table in (('invoice', 'invoices'), ('payment', 'payments')):
+                await self._connection.executemany(
+                    f"UPDATE {table} SET balance_after = ? WHERE id = ?",
+                    updates[operation_type]
+                )
+            logger.info(f"Розраховано balance_after для {sum(map(len, updates.values()))} операцій")
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    @asynccontextmanager
+    async def _transaction(self):
+        """Транзакція запису під блокуванням: commit при успіху, rollback при помилці"""
+        async with self._write_lock:
+            try:
+                yield
+                await self._connection.commit()
+            except Exception:
+                await self._connection.rollback()
+                raise
+
+    async def _fetchone(self, sql: str, params=()) -> Optional[aiosqlite.Row]:
+        async with self._connection.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    async def _fetchall(self, sql: str, params=()) -> List[aiosqlite.Row]:
+        async with self._connection.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def _update_balance(self, user_id: int, amount: float) -> float:
+        """
+        Атомарна зміна балансу (аналог RPC adjust_balance)
+
+        Args:
+            user_id: ID користувача
+            amount: Сума для зміни балансу (+ або -)
+
+        Returns:
+            float: Новий баланс
+        """
+        row = await self._fetchone(
+            """
+            INSERT INTO balance (user_id, current_balance, last_updated)
+            VALUES (?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE
+                SET current_balance = current_balance + excluded.current_balance,
+                    last_updated = excluded.last_updated
+            RETURNING current_balance
+            """,
+            (user_id, amount, datetime.now().isoformat())
+        )
+        return float(row['current_balance'])
+
+    async def _last_balance_after(self, user_id: int, before: Optional[str] = None) -> float:
+        """
+        Баланс після останньої операції користувача (колонка balance_after)
+
+        Args:
+            user_id: ID користувача
+            before: Лише операції з date_created < before (None - уся історія)
+
+        Returns:
+            float: Баланс або 0.0, якщо операцій немає
+        """
+        where = "AND date_created < :before" if before is not None else ""
+        row = await self._fetchone(LAST_BALANCE_SQL.format(where=where), {'user_id': user_id, 'before': before})
+        return float(row['balance_after'] or 0.0) if row else 0.0
+
+    async def _shift_balances_after(self, user_id: int, cursor: List, delta: float):
+        """
+        Зміна balance_after усіх операцій після курсора (при видаленні операції)
+
+        Оновлюється лише суфікс стрічки після операції - індекс
+        (user_id, date_created, id) відсікає старіші рядки.
+
+        Args:
+            user_id: ID користувача
+            cursor: [дата, тип, id] видаленої операції
+            delta: Зміна балансу наступних операцій
+        """
+        params = {'user_id': user_id, 'delta': delta, 'cursor_date': cursor[0], 'cursor_id': cursor[2]}
+        for table, operation_type in (('invoices', 'invoice'), ('payments', 'payment')):
+            await self._connection.execute(
+                f"UPDATE {table} SET balance_after = balance_after + :delta "
+                f"WHERE user_id = :user_id {self._keyset_condition(operation_type, '', cursor, False)}",
+                params
+            )
+
+    async def add_invoice(self, user_id: int, car_info: str, amount: float, original_text: str) -> Optional[float]:
+        try:
+            async with self._transaction():
+                # Модель та VIN розбираються один раз - при збереженні рахунку
+                car_model, vin = extract_car_model_and_vin(car_info)
+                # Нова операція - остання в стрічці: баланс після неї = попередній + зміна
+                balance_after = await self._last_balance_after(user_id) - amount
+                await self._connection.execute(
+                    "INSERT INTO invoices (user_id, car_info, amount, original_text, date_created, car_model, vin, "
+                    "balance_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, car_info, amount, original_text, datetime.now().isoformat(), car_model, vin or None,
+                     balance_after)
+                )
+                new_balance = await self._update_balance(user_id, -amount)
+
+            logger.info(f"Рахунок додано для користувача {user_id}: {amount} євро")
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Помилка додавання рахунку: {e}")
+            return None
+
+    async def add_invoices(self, user_id: int, invoices: List[Dict]) -> Optional[float]:
+        try:
+            date_created = datetime.now().isoformat()
+            total = sum(invoice['amount'] for invoice in invoices)
+            async with self._transaction():
+                balance_after = await self._last_balance_after(user_id)
+                rows = []
+                for invoice in invoices:
+                    car_model, vin = extract_car_model_and_vin(invoice['car_info'])
+                    balance_after -= invoice['amount']
+                    rows.append((user_id, invoice['car_info'], invoice['amount'], invoice['original_text'],
+                                 date_created, car_model, vin or None, balance_after))
+
+                await self._connection.executemany(
+                    "INSERT INTO invoices (user_id, car_info, amount, original_text, date_created, car_model, vin, "
+                    "balance_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                new_balance = await self._update_balance(user_id, -total)
+
+            logger.info(f"Додано {len(invoices)} рахунків для користувача {user_id}: {total} євро")
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Помилка пакетного додавання рахунків: {e}")
+            return None
+
+    async def add_payment(self, user_id: int, amount: float, date_paid: str, invoice_id: int = None) -> Optional[float]:
+        try:
+            async with self._transaction():
+                balance_after = await self._last_balance_after(user_id) + amount
+                await self._connection.execute(
+                    "INSERT INTO payments (user_id, amount, date_paid, date_created, invoice_id, balance_after) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (user_id, amount, date_paid, datetime.now().isoformat(), invoice_id, balance_after)
+                )
+                new_balance = await self._update_balance(user_id, amount)
+
+            logger.info(f"Платіж додано для користувача {user_id}: {amount} євро на {date_paid}")
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Помилка додавання платежу: {e}")
+            return None
+
+    async def add_payment_for_invoice(self, user_id: int, invoice_id: int, amount: float, date_paid: str) -> Optional[float]:
+        try:
+            async with self._transaction():
+                invoice = await self._fetchone(
+                    "SELECT car_info, car_model, vin FROM invoices WHERE id = ? AND user_id = ?",
+                    (invoice_id, user_id)
+                )
+                if invoice is None:
+                    logger.error(f"Рахунок {invoice_id} не знайдено")
+                    return None
+
+                balance_after = await self._last_balance_after(user_id) + amount
+                await self._connection.execute(
+                    "INSERT INTO payments (user_id, amount, date_paid, date_created, invoice_id, car_info, car_model, "
+                    "vin, balance_after) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, amount, date_paid, datetime.now().isoformat(), invoice_id,
+                     invoice['car_info'], invoice['car_model'], invoice['vin'], balance_after)
+                )
+                new_balance = await self._update_balance(user_id, amount)
+
+            logger.info(f"Платіж {amount} євро додано для рахунку {invoice_id} користувача {user_id}")
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Помилка додавання платежу для рахунку: {e}")
+            return None
+
+    async def get_balance(self, user_id: int) -> float:
+        try:
+            row = await self._fetchone("SELECT current_balance FROM balance WHERE user_id = ?", (user_id,))
+            return float(row['current_balance']) if row else 0.0
+
+        except Exception as e:
+            logger.error(f"Помилка отримання балансу: {e}")
+            return 0.0
+
+    async def get_balance_on_date(self, user_id: int, date: str) -> float:
+        try:
+            # Пошук за індексом останньої операції до кінця дня
+            return await self._last_balance_after(user_id, before=next_day_iso(date))
+
+        except Exception as e:
+            logger.error(f"Помилка отримання балансу на дату: {e}")
+            return 0.0
+
+    @staticmethod
+    def _row_to_operation(row: aiosqlite.Row) -> Dict:
+        """Перетворення рядка OPERATIONS_SQL на операцію історії (формат SupabaseDatabase)"""
+        if row['type'] == 'invoice':
+            return {
+                'type': 'invoice',
+                'id': row['id'],
+                'car_info': row['car_info'],
+                'car_model': row['car_model'],
+                'vin': row['vin'],
+                'amount': -float(row['amount']),
+                'date': row['date_created'],
+                'original_text': row['original_text'],
+                'balance_after': row['balance_after']
+            }
+
+        operation = {
+            'type': 'payment',
+            'id': row['id'],
+            'amount': float(row['amount']),
+            'date_paid': row['date_paid'],
+            'date': row['date_created'],
+            'invoice_id': row['invoice_id'],
+            'payment_type': 'invoice' if row['invoice_id'] else 'balance',
+            'balance_after': row['balance_after']
+        }
+        if row['invoice_id'] and row['car_info']:
+            operation['car_info'] = row['car_info']
+        if row['car_model']:
+            operation['car_model'] = row['car_model']
+            operation['vin'] = row['vin']
+        return operation
+
+    @staticmethod
+    def _keyset_condition(operation_type: str, prefix: str, cursor: List, descending: bool) -> str:
+        """
+        Умова "після курсора" для однієї таблиці (як у SupabaseDatabase._operations_query)
+
+        Операції впорядковані за (дата, тип, id); 'invoice' < 'payment'.
+        Умова виражена через date_created та id, тому використовує індекс
+        (user_id, date_created, id).
+        """
+        after = '<' if descending else '>'
+        if operation_type == cursor[1]:
+            return (f"AND {prefix}date_created {after}= :cursor_date "
+                    f"AND ({prefix}date_created {after} :cursor_date OR {prefix}id {after} :cursor_id)")
+        if (operation_type < cursor[1]) == descending:
+            # Операції цього типу з тією ж датою йдуть після курсора
+            return f"AND {prefix}date_created {after}= :cursor_date"
+        return f"AND {prefix}date_created {after} :cursor_date"
+
+    async def _fetch_operations(self, user_id: int, limit: int, cursor: Optional[List] = None,
+                                offset: int = 0, descending: bool = True) -> List[Dict]:
+        """
+        Читання операцій у порядку (дата, тип, id) після курсора
+
+        Кожна таблиця віддає за індексом не більше offset + limit рядків
+        після курсора, тому час читання сторінки не залежить від розміру історії.
+        """
+        params = {'user_id': user_id, 'limit': limit, 'offset': offset, 'table_limit': offset + limit}
+        invoices_where = payments_where = ''
+        if cursor is not None:
+            invoices_where = self._keyset_condition('invoice', '', cursor, descending)
+            payments_where = self._keyset_condition('payment', 'p.', cursor, descending)
+            params.update(cursor_date=cursor[0], cursor_id=cursor[2])
+
+        direction = 'DESC' if descending else 'ASC'
+        invoices_sql = INVOICE_OPERATIONS_SQL.format(where=invoices_where)
+        payments_sql = PAYMENT_OPERATIONS_SQL.format(where=payments_where)
+        rows = await self._fetchall(
+            f"SELECT * FROM ("
+            f"SELECT * FROM ({invoices_sql} ORDER BY date_created {direction}, id {direction} LIMIT :table_limit) "
+            f"UNION ALL "
+            f"SELECT * FROM ({payments_sql} ORDER BY p.date_created {direction}, p.id {direction} LIMIT :table_limit)"
+            f") ORDER BY date_created {direction}, type {direction}, id {direction} "
+            f"LIMIT :limit OFFSET :offset",
+            params
+        )
+        return [self._row_to_operation(row) for row in rows]
+
+    async def get_history(self, user_id: int, limit: int = 50) -> List[Dict]:
+        return await self.get_operations(user_id, limit=limit)
+
+    async def get_operations(self, user_id: int, limit: int = 50, cursor: Optional[List] = None,
+                             descending: bool = True) -> List[Dict]:
+        try:
+            return await self._fetch_operations(user_id, limit, cursor, descending=descending)
+        except Exception as e:
+            logger.error(f"Помилка отримання історії: {e}")
+            return []
+
+    async def iter_operations(self, user_id: int, batch_size: int = 500,
+                              descending: bool = True) -> AsyncIterator[Dict]:
+        cursor = None
+        while True:
+            operations = await self._fetch_operations(user_id, batch_size, cursor, descending=descending)
+            for operation in operations:
+                yield operation
+            if len(operations) < batch_size:
+                return
+            cursor = operation_cursor(operations[-1])
+
+    async def get_operations_by_vin(self, user_id: int, vin: str) -> List[Dict]:
+        try:
+            rows = await self._fetchall(
+                f"SELECT * FROM ({OPERATIONS_SQL}) WHERE vin = :vin "
+                f"ORDER BY date_created DESC, type DESC, id DESC",
+                {'user_id': user_id, 'vin': vin.strip().upper()}
+            )
+            return [self._row_to_operation(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Помилка пошуку операцій за VIN: {e}")
+            return []
+
+    async def get_last_operation(self, user_id: int) -> Optional[Dict]:
+        history = await self.get_history(user_id, limit=1)
+        return history[0] if history else None
+
+    async def delete_last_operation(self, user_id: int) -> bool:
+        last_operation = await self.get_last_operation(user_id)
+        if last_operation is None:
+            return False  # Немає операцій для видалення
+
+        if last_operation['type'] == 'invoice':
+            new_balance = await self.delete_invoice_by_id(user_id, last_operation['id'])
+        else:
+            new_balance = await self.delete_payment_by_id(user_id, last_operation['id'])
+        return new_balance is not None
+
+    async def get_paginated_history(self, user_id: int, page: int = 1, per_page: int = 5,
+                                    cursor: Optional[List] = None,
+                                    total_count: Optional[int] = None) -> Tuple[List[Dict], int, int]:
+        try:
+            if total_count is None:
+                # Лише при відкритті меню; наступні сторінки передають збережену кількість
+                row = await self._fetchone(
+                    "SELECT (SELECT COUNT(*) FROM invoices WHERE user_id = :user_id) + "
+                    "(SELECT COUNT(*) FROM payments WHERE user_id = :user_id) AS total",
+                    {'user_id': user_id}
+                )
+                total_count = row['total']
+            if total_count == 0:
+                return [], 0, 0
+
+            total_pages = (total_count + per_page - 1) // per_page
+
+            if cursor is not None or page == 1:
+                operations = await self._fetch_operations(user_id, per_page, cursor)
+            else:
+                # Курсор втрачено: пропускаємо попередні сторінки
+                operations = await self._fetch_operations(user_id, per_page, offset=(page - 1) * per_page)
+
+            return operations, total_count, total_pages
+
+        except Exception as e:
+            logger.error(f"Помилка отримання історії з пагінацією: {e}")
+            return [], 0, 0
+
+    async def get_operation(self, user_id: int, operation_type: str, operation_id: int) -> Optional[Dict]:
+        try:
+            if operation_type == 'invoice':
+                sql = "SELECT car_info, amount, date_created, original_text FROM invoices WHERE id = ? AND user_id = ?"
+            else:  # payment
+                sql = "SELECT amount, date_paid, date_created FROM payments WHERE id = ? AND user_id = ?"
+
+            row = await self._fetchone(sql, (operation_id, user_id))
+            return dict(row) if row else None
+
+        except Exception as e:
+            logger.error(f"Помилка отримання операції: {e}")
+            return None
+
+    async def _delete_operation(self, table: str, user_id: int, operation_id: int, sign: int) -> Optional[float]:
+        """
+        Видалення рядка та повернення його суми в баланс (sign: +1 рахунок, -1 платіж)
+
+        balance_after наступних операцій змінюється на ту ж суму; старіші
+        операції не оновлюються.
+        """
+        async with self._transaction():
+            row = await self._fetchone(
+                f"SELECT amount, date_created FROM {table} WHERE id = ? AND user_id = ?",
+                (operation_id, user_id)
+            )
+            if row is None:
+                logger.warning(f"Операцію {table} {operation_id} не знайдено для користувача {user_id}")
+                return None
+
+            await self._connection.execute(
+                f"DELETE FROM {table} WHERE id = ? AND user_id = ?",
+                (operation_id, user_id)
+            )
+            new_balance = await self._update_balance(user_id, sign * float(row['amount']))
+
+            operation_type = 'invoice' if table == 'invoices' else 'payment'
+            await self._shift_balances_after(
+                user_id, [row['date_created'], operation_type, operation_id], sign * float(row['amount'])
+            )
+            return new_balance
+
+    async def delete_invoice_by_id(self, user_id: int, invoice_id: int) -> Optional[float]:
+        try:
+            new_balance = await self._delete_operation('invoices', user_id, invoice_id, 1)
+            if new_balance is not None:
+                logger.info(f"Рахунок {invoice_id} видалено для користувача {user_id}")
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Помилка видалення рахунку: {e}")
+            return None
+
+    async def delete_payment_by_id(self, user_id: int, payment_id: int) -> Optional[float]:
+        try:
+            new_balance = await self._delete_operation('payments', user_id, payment_id, -1)
+            if new_balance is not None:
+                logger.info(f"Платіж {payment_id} видалено для користувача {user_id}")
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Помилка видалення платежу: {e}")
+            return None
+
+    @staticmethod
+    def _invoice_choice(row: aiosqlite.Row) -> Dict:
+        """Рахунок у форматі для клавіатури вибору (як у SupabaseDatabase)"""
+        car_info = row['car_info']
+        amount = float(row['amount'])
+        return {
+            'id': row['id'],
+            'car_info': car_info,
+            'amount': amount,
+            'date_created': row['date_created'][:10] if row['date_created'] else '',
+            'display_text': f"{car_info[:30]}{'...' if len(car_info) > 30 else ''} - {amount:.2f}€"
+        }
+
+    async def get_unpaid_invoices(self, user_id: int) -> List[Dict]:
+        try:
+            rows = await self._fetchall(
+                "SELECT id, car_info, amount, date_created FROM invoices "
+                "WHERE user_id = ? ORDER BY date_created DESC",
+                (user_id,)
+            )
+            return [self._invoice_choice(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Помилка отримання рахунків: {e}")
+            return []
+
+    async def get_recent_invoices(self, user_id: int, limit: int = 5) -> List[Dict]:
+        try:
+            rows = await self._fetchall(
+                "SELECT id, car_info, amount, date_created FROM invoices "
+                "WHERE user_id = ? ORDER BY date_created DESC LIMIT ?",
+                (user_id, limit)
+            )
+            return [self._invoice_choice(row) for row in rows]
+
+        except Exception as e:
+            logger.error(f"Помилка отримання останніх рахунків: {e}")
+            return []
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+
+from config import STORAGE_BACKEND
+
+# Налаштування логування
+logger = logging.getLogger(__name__)
+
+
+class Storage(ABC):
+    """
+    Асинхронний інтерфейс сховища рахунків, платежів та балансу
+
+    Реалізації: AsyncDatabase (Supabase через пул потоків) та
+    SQLiteDatabase (локальний файл через aiosqlite). Методи запису
+    повертають новий баланс або None у випадку помилки.
+    """
+
+    @abstractmethod
+    async def add_invoice(self, user_id: int, car_info: str, amount: float, original_text: str) -> Optional[float]:
+        """Додавання нового рахунку"""
+
+    @abstractmethod
+    async def add_invoices(self, user_id: int, invoices: List[Dict]) -> Optional[float]:
+        """Пакетне додавання рахунків (car_info, amount, original_text) з однією зміною балансу"""
+
+    @abstractmethod
+    async def add_payment(self, user_id: int, amount: float, date_paid: str, invoice_id: int = None) -> Optional[float]:
+        """Додавання платежу на баланс"""
+
+    @abstractmethod
+    async def add_payment_for_invoice(self, user_id: int, invoice_id: int, amount: float, date_paid: str) -> Optional[float]:
+        """Додавання платежу для конкретного рахунку"""
+
+    @abstractmethod
+    async def get_balance(self, user_id: int) -> float:
+        """Отримання поточного балансу користувача"""
+
+    @abstractmethod
+    async def get_balance_on_date(self, user_id: int, date: str) -> float:
+        """Баланс на кінець дня date (YYYY-MM-DD) за колонкою balance_after"""
+
+    @abstractmethod
+    async def get_history(self, user_id: int, limit: int = 50) -> List[Dict]:
+        """Отримання історії операцій (найновіші спочатку)"""
+
+    @abstractmethod
+    async def get_operations(self, user_id: int, limit: int = 50, cursor: Optional[List] = None,
+                             descending: bool = True) -> List[Dict]:
+        """Сторінка об'єднаної стрічки операцій після курсора (utils.operation_cursor)"""
+
+    @abstractmethod
+    def iter_operations(self, user_id: int, batch_size: int = 500,
+                        descending: bool = True) -> AsyncIterator[Dict]:
+        """Потокове читання всієї історії пакетами по batch_size рядків"""
+
+    @abstractmethod
+    async def get_operations_by_vin(self, user_id: int, vin: str) -> List[Dict]:
+        """Усі операції по одному авто (індекс user_id, vin)"""
+
+    @abstractmethod
+    async def get_last_operation(self, user_id: int) -> Optional[Dict]:
+        """Отримання останньої операції користувача"""
+
+    @abstractmethod
+    async def delete_last_operation(self, user_id: int) -> bool:
+        """Видалення останньої операції"""
+
+    @abstractmethod
+    async def get_paginated_history(self, user_id: int, page: int = 1, per_page: int = 5,
+                                    cursor: Optional[List] = None,
+                                    total_count: Optional[int] = None) -> Tuple[List[Dict], int, int]:
+        """Отримання сторінки історії для меню видалення (total_count=None - з підрахунком операцій)"""
+
+    @abstractmethod
+    async def get_operation(self, user_id: int, operation_type: str, operation_id: int) -> Optional[Dict]:
+        """Отримання деталей однієї операції"""
+
+    @abstractmethod
+    async def delete_invoice_by_id(self, user_id: int, invoice_id: int) -> Optional[float]:
+        """Видалення рахунку за ID"""
+
+    @abstractmethod
+    async def delete_payment_by_id(self, user_id: int, payment_id: int) -> Optional[float]:
+        """Видалення платежу за ID"""
+
+    @abstractmethod
+    async def get_unpaid_invoices(self, user_id: int) -> List[Dict]:
+        """Отримання списку всіх рахунків користувача"""
+
+    @abstractmethod
+    async def get_recent_invoices(self, user_id: int, limit: int = 5) -> List[Dict]:
+        """Отримання останніх N рахунків користувача"""
+
+    async def warm_up(self):
+        """Підготовка з'єднання під час запуску, щоб перше оновлення не чекало на нього"""
+
+    async def close(self):
+        """Звільнення ресурсів при завершенні роботи бота"""
+
+
+def _create_supabase_database():
+    from supabase_database import initialize_database
+
+    return initialize_database()
+
+
+async def create_storage(backend: str = STORAGE_BACKEND):
+    """
+    Створення сховища, обраного в config.STORAGE_BACKEND
+
+    Args:
+        backend: 'supabase' або 'sqlite'
+
+    Returns:
+        CachedDatabase: Сховище з кешем балансу та історії
+    """
+    from cache import CachedDatabase
+
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteDatabase
+
+        database = SQLiteDatabase()
+        await database.connect()
+    elif backend == 'supabase':
+        from async_database import AsyncDatabase
+
+        # Імпорт бібліотеки supabase та створення клієнта - у потоці,
+        # цикл подій тим часом виконує запити до Telegram
+        database = AsyncDatabase(await asyncio.to_thread(_create_supabase_database))
+    else:
+        raise ValueError(f"Невідоме сховище STORAGE_BACKEND={backend!r} (очікується 'supabase' або 'sqlite')")
+
+    logger.info(f"Сховище даних: {backend}")
+    return CachedDatabase(database)
@@ -1,18 +1,28 @@
+import heapq
 import logging
 import os
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from supabase import create_client, Client
+from itertools import islice
+from typing import Iterator, List, Dict, Optional, Tuple
+from postgrest import SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from postgrest.exceptions import APIError
 from config import DATE_FORMAT, DATETIME_FORMAT
-from utils import calculate_balance_for_operations
+from utils import extract_car_model_and_vin, next_day_iso, operation_cursor
 
 # Налаштування логування
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class SupabaseDatabase:
     """Клас для роботи з базою даних Supabase"""
+
+    # Чи створено в базі функцію adjust_balance (supabase_migrations.sql)
+    _balance_rpc_available = True
+    # Чи додано колонки car_model та vin (supabase_migrations.sql)
+    _vehicle_columns_available = True
+    # Чи додано колонку balance_after з тригерами (supabase_migrations.sql)
+    _balance_after_available = True
     
     def __init__(self):
         """Ініціалізація підключення до Supabase"""
@@ -24,14 +34,37 @@ class SupabaseDatabase:
             if not supabase_url or not supabase_key:
                 raise ValueError("SUPABASE_URL та SUPABASE_KEY мають бути встановлені в змінних середовища")
             
-            self.supabase: Client = create_client(supabase_url, supabase_key)
+            # Бот звертається лише до PostgREST (таблиці та RPC), тому клієнт
+            # supabase (auth, storage, realtime, functions) не імпортується:
+            # це ~0.5 с процесора при кожному запуску
+            self.supabase = SyncPostgrestClient(
+                f"{supabase_url.rstrip('/')}/rest/v1",
+                headers={
+                    **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                    'apikey': supabase_key,
+                    'Authorization': f"Bearer {supabase_key}"
+                }
+            )
             logger.info("Підключення до Supabase успішно встановлено")
             
         except Exception as e:
             logger.error(f"Помилка підключення до Supabase: {e}")
             raise
     
-    def add_invoice(self, user_id: int, car_info: str, amount: float, original_text: str) -> bool:
+    def warm_up(self):
+        """
+        Перший запит до PostgREST під час запуску бота
+
+        Клієнт PostgREST створюється в __init__, але HTTP з'єднання
+        (TCP + TLS) відкривається лише при першому запиті. Без прогріву
+        воно додається до відповіді на перше оновлення після перезапуску.
+        """
+        try:
+            self.supabase.table('balance').select('user_id').limit(1).execute()
+        except Exception as e:
+            logger.warning(f"Не вдалося прогріти з'єднання з Supabase: {e}")
+    
+    def add_invoice(self, user_id: int, car_info: str, amount: float, original_text: str) -> Optional[float]:
         """
         Додавання нового рахунку
         
@@ -42,7 +75,7 @@ class SupabaseDatabase:
             original_text: Оригінальний текст повідомлення
             
         Returns:
-            bool: True якщо успішно додано, False у випадку помилки
+            Optional[float]: Новий баланс якщо успішно додано, None у випадку помилки
         """
         try:
             # Додаємо рахунок
@@ -54,22 +87,96 @@ class SupabaseDatabase:
                 'date_created': datetime.now().isoformat()
             }
             
-            result = self.supabase.table('invoices').insert(invoice_data).execute()
+            # Модель та VIN розбираються один раз - при збереженні рахунку
+            result = self._insert_with_vehicle('invoices', [invoice_data])
             
             if result.data:
                 # Оновлюємо баланс (віднімаємо суму рахунку)
-                self._update_balance(user_id, -amount)
+                new_balance = self._update_balance(user_id, -amount)
                 logger.info(f"Рахунок додано для користувача {user_id}: {amount} євро")
-                return True
+                return new_balance
             else:
                 logger.error("Помилка додавання рахунку: відсутні дані у відповіді")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"Помилка додавання рахунку: {e}")
-            return False
+            return None
     
-    def add_payment(self, user_id: int, amount: float, date_paid: str, invoice_id: int = None) -> bool:
+    def _insert_with_vehicle(self, table: str, rows: List[Dict]):
+        """
+        Вставка рядків (одним запитом) разом з розібраними полями car_model та vin
+
+        Якщо колонки ще не додано (PGRST204), рядки зберігаються без них,
+        а операції показуються з розбором car_info, як раніше.
+
+        Args:
+            table: 'invoices' або 'payments'
+            rows: Дані рядків; поля авто розбираються з row['car_info']
+
+        Returns:
+            Результат запиту insert
+        """
+        if self._vehicle_columns_available:
+            payload = []
+            for row in rows:
+                car_model, vin = extract_car_model_and_vin(row['car_info'])
+                payload.append({**row, 'car_model': car_model, 'vin': vin or None})
+            try:
+                return self.supabase.table(table).insert(payload).execute()
+            except APIError as e:
+                if e.code != 'PGRST204':
+                    raise
+                # Колонок немає - більше не пробуємо до перезапуску
+                self._vehicle_columns_available = False
+                logger.warning("Колонки car_model/vin не знайдено, виконайте supabase_migrations.sql")
+
+        return self.supabase.table(table).insert(rows).execute()
+
+    def add_invoices(self, user_id: int, invoices: List[Dict]) -> Optional[float]:
+        """
+        Пакетне додавання рахунків (кілька рахунків в одному повідомленні
+        або пачка пересланих повідомлень)
+
+        Усі рахунки вставляються одним запитом, а баланс змінюється один
+        раз на загальну суму.
+
+        Args:
+            user_id: ID користувача в Telegram
+            invoices: Рахунки з ключами car_info, amount, original_text
+
+        Returns:
+            Optional[float]: Новий баланс якщо успішно додано, None у випадку помилки
+        """
+        try:
+            date_created = datetime.now().isoformat()
+            rows = [
+                {
+                    'user_id': user_id,
+                    'car_info': invoice['car_info'],
+                    'amount': invoice['amount'],
+                    'original_text': invoice['original_text'],
+                    'date_created': date_created
+                }
+                for invoice in invoices
+            ]
+
+            result = self._insert_with_vehicle('invoices', rows)
+
+            if result.data:
+                total = sum(invoice['amount'] for invoice in invoices)
+                new_balance = self._update_balance(user_id, -total)
+                logger.info(f"Додано {len(invoices)} рахунків для користувача {user_id}: {total} євро")
+                return new_balance
+            else:
+                logger.error("Помилка пакетного додавання рахунків: відсутні дані у відповіді")
+                return None
+
+        except Exception as e:
+            logger.error(f"Помилка пакетного додавання рахунків: {e}")
+            return None
+
+    def add_payment(self, user_id: int, amount: float, date_paid: str, invoice_id: int = None) -> Optional[float]:
         """
         Додавання платежу (на баланс або за конкретний рахунок)
         
@@ -80,7 +187,7 @@ class SupabaseDatabase:
             invoice_id: ID рахунку (опціонально, для платежу за конкретний рахунок)
             
         Returns:
-            bool: True якщо успішно додано, False у випадку помилки
+            Optional[float]: Новий баланс якщо успішно додано, None у випадку помилки
         """
         try:
             # Додаємо платіж
@@ -99,21 +206,21 @@ class SupabaseDatabase:
             
             if result.data:
                 # Оновлюємо баланс (додаємо суму платежу)
-                self._update_balance(user_id, amount)
+                new_balance = self._update_balance(user_id, amount)
                 
                 # Логування залежно від типу платежу
                 if invoice_id is not None:
                     logger.info(f"Платіж {amount} євро додано для рахунку {invoice_id} користувача {user_id}")
                 else:
                     logger.info(f"Платіж додано для користувача {user_id}: {amount} євро на {date_paid}")
-                return True
+                return new_balance
             else:
                 logger.error("Помилка додавання платежу: відсутні дані у відповіді")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"Помилка додавання платежу: {e}")
-            return False
+            return None
     
     def get_balance(self, user_id: int) -> float:
         """
@@ -137,6 +244,77 @@ class SupabaseDatabase:
             logger.error(f"Помилка отримання балансу: {e}")
             return 0.0
     
+    def get_balance_on_date(self, user_id: int, date: str) -> float:
+        """
+        Баланс на кінець дня
+
+        Колонку balance_after підтримують тригери бази даних, тому достатньо
+        знайти за індексом (user_id, date_created, id) останню операцію до
+        кінця дня в кожній таблиці - два запити по одному рядку.
+
+        Args:
+            user_id: ID користувача в Telegram
+            date: Дата YYYY-MM-DD
+
+        Returns:
+            float: Баланс після останньої операції, створеної до кінця цього дня
+        """
+        try:
+            before = next_day_iso(date)
+
+            if self._balance_after_available:
+                try:
+                    balance = self._last_balance_after(user_id, before)
+                    if balance is not None:
+                        return balance
+                except APIError as e:
+                    if e.code != '42703':
+                        raise
+                    # Колонки немає - рахуємо по історії до перезапуску
+                    self._balance_after_available = False
+                    logger.warning("Колонку balance_after не знайдено, виконайте supabase_migrations.sql")
+
+            # Без balance_after - наростаючий підсумок операцій до кінця дня
+            balance = 0.0
+            for operation in self.iter_operations(user_id, descending=False):
+                if operation['date'] >= before:
+                    break
+                balance += operation['amount']
+            return balance
+
+        except Exception as e:
+            logger.error(f"Помилка отримання балансу на дату: {e}")
+            return 0.0
+
+    def _last_balance_after(self, user_id: int, before: str) -> Optional[float]:
+        """
+        balance_after останньої операції з date_created < before
+
+        Returns:
+            Optional[float]: Баланс (0.0 без операцій) або None, якщо в
+                операції немає balance_after (рядок створено до міграції)
+        """
+        latest = []
+        for table, operation_type in (('invoices', 'invoice'), ('payments', 'payment')):
+            result = self.supabase.table(table)\
+                .select('id, date_created, balance_after')\
+                .eq('user_id', user_id)\
+                .lt('date_created', before)\
+                .order('date_created', desc=True)\
+                .order('id', desc=True)\
+                .limit(1)\
+                .execute()
+            latest.extend(
+                ([row['date_created'], operation_type, row['id']], row['balance_after'])
+                for row in result.data
+            )
+
+        if not latest:
+            return 0.0
+
+        _, balance_after = max(latest, key=lambda item: item[0])
+        return float(balance_after) if balance_after is not None else None
+
     def get_history(self, user_id: int, limit: int = 50) -> List[Dict]:
         """
         Отримання історії операцій
@@ -145,76 +323,154 @@ class SupabaseDatabase:
             user_id: ID користувача в Telegram
             limit: Максимальна кількість записів
             
+        Returns:
+            List[Dict]: Список операцій з деталями
+        """
+        return self.get_operations(user_id, limit=limit)
+
+    def get_operations(self, user_id: int, limit: int = 50, cursor: Optional[List] = None,
+                       descending: bool = True) -> List[Dict]:
+        """
+        Об'єднана стрічка рахунків та платежів
+
+        Кожна таблиця повертає не більше limit рядків, уже впорядкованих
+        базою даних; результати зливаються без повного сортування.
+
+        Args:
+            user_id: ID користувача в Telegram
+            limit: Максимальна кількість операцій
+            cursor: Курсор операції, після якої продовжити (utils.operation_cursor)
+            descending: True - від новіших до старіших, False - хронологічно
+
         Returns:
             List[Dict]: Список операцій з деталями
         """
         try:
-            # Отримуємо рахунки
-            invoices_result = self.supabase.table('invoices')\
-                .select('*')\
-                .eq('user_id', user_id)\
-                .order('date_created', desc=True)\
-                .execute()
-            
-            # Отримуємо платежі з інформацією про рахунки
-            payments_result = self.supabase.table('payments')\
-                .select('*')\
-                .eq('user_id', user_id)\
-                .order('date_created', desc=True)\
-                .execute()
-            
-            # Об'єднуємо та сортуємо по даті створення
-            history = []
-            
-            for invoice in invoices_result.data:
-                history.append({
-                    'type': 'invoice',
-                    'id': invoice['id'],
-                    'car_info': invoice['car_info'],
-                    'amount': -float(invoice['amount']),  # Від'ємна сума для рахунків
-                    'date': invoice['date_created'],
-                    'original_text': invoice.get('original_text')
-                })
-            
-            for payment in payments_result.data:
-                payment_info = {
-                    'type': 'payment',
-                    'id': payment['id'],
-                    'amount': float(payment['amount']),
-                    'date_paid': payment.get('date_paid'),
-                    'date': payment['date_created'],
-                    'invoice_id': payment.get('invoice_id')
-                }
-                
-                # Визначаємо тип платежу та інформацію про авто
-                if payment.get('invoice_id'):
-                    payment_info['payment_type'] = 'invoice'
-                    # Отримуємо інформацію про авто з рахунку
-                    try:
-                        invoice_result = self.supabase.table('invoices')\
-                            .select('car_info')\
-                            .eq('id', payment['invoice_id'])\
-                            .execute()
-                        
-                        if invoice_result.data:
-                            payment_info['car_info'] = invoice_result.data[0]['car_info']
-                    except:
-                        # Якщо не вдалося отримати інформацію про рахунок
-                        pass
-                else:
-                    payment_info['payment_type'] = 'balance'
-                
-                history.append(payment_info)
-            
-            # Сортуємо по даті створення (найновіші спочатку)
-            history.sort(key=lambda x: x['date'], reverse=True)
-            
-            return history[:limit]
-            
+            operations, _ = self._fetch_operations_page(user_id, limit, cursor, descending)
+            return operations
+
         except Exception as e:
             logger.error(f"Помилка отримання історії: {e}")
             return []
-    
+
+    def iter_operations(self, user_id: int, batch_size: int = 500,
+                        descending: bool = True) -> Iterator[Dict]:
+        """
+        Потокове читання всієї історії (для експорту)
+
+        Кожна таблиця читається власними keyset сторінками по batch_size
+        рядків, а потоки зливаються через heapq.merge, тому кожен рядок
+        читається рівно один раз, а в пам'яті тримається не більше двох сторінок.
+
+        Args:
+            user_id: ID користувача в Telegram
+            batch_size: Кількість рядків в одному запиті до таблиці
+            descending: True - від новіших до старіших, False - хронологічно
+
+        Yields:
+            Dict: Операції у порядку (дата, тип, id)
+        """
+        return heapq.merge(
+            self._iter_table('invoices', user_id, batch_size, descending),
+            self._iter_table('payments', user_id, batch_size, descending),
+            key=operation_cursor,
+            reverse=descending
+        )
+
+    def _iter_table(self, table: str, user_id: int, batch_size: int, descending: bool) -> Iterator[Dict]:
+        """Читання однієї таблиці keyset сторінками у порядку (date_created, id)"""
+        operation_type = 'invoice' if table == 'invoices' else 'payment'
+        cursor = None
+        while True:
+            result = self._operations_query(table, user_id, cursor, descending)\
+                .limit(batch_size)\
+                .execute()
+
+            if operation_type == 'invoice':
+                operations = [self._build_invoice_operation(row) for row in result.data]
+            else:
+                operations = self._build_payment_operations(result.data)
+
+            yield from operations
+
+            if len(result.data) < batch_size:
+                return
+            cursor = operation_cursor(operations[-1])
+
+    @staticmethod
+    def _build_invoice_operation(invoice: Dict) -> Dict:
+        """Перетворення рядка таблиці invoices на операцію історії"""
+        return {
+            'type': 'invoice',
+            'id': invoice['id'],
+            'car_info': invoice['car_info'],
+            'car_model': invoice.get('car_model'),
+            'vin': invoice.get('vin'),
+            'amount': -float(invoice['amount']),  # Від'ємна сума для рахунків
+            'date': invoice['date_created'],
+            'original_text': invoice.get('original_text'),
+            'balance_after': invoice.get('balance_after')
+        }
+
+    def _build_payment_operations(self, payments: List[Dict]) -> List[Dict]:
+        """
+        Перетворення рядків таблиці payments на операції історії
+
+        Інформація про авто береться з самого платежу (її зберігає
+        add_payment_for_invoice). Для старих платежів без car_info виконується
+        один пакетний запит in_('id', ...) замість запиту на кожен платіж.
+
+        Args:
+            payments: Рядки таблиці payments
+
+        Returns:
+            List[Dict]: Список операцій-платежів
+        """
+        missing_invoice_ids = {
+            payment['invoice_id'] for payment in payments
+            if payment.get('invoice_id') and not payment.get('car_info')
+        }
+
+        invoice_car_info = {}
+        if missing_invoice_ids:
+            try:
+                invoices_result = self.supabase.table('invoices')\
+                    .select('id, car_info')\
+                    .in_('id', list(missing_invoice_ids))\
+                    .execute()
+                invoice_car_info = {row['id']: row['car_info'] for row in invoices_result.data}
+            except Exception as e:
+                # Якщо не вдалося отримати інформацію про рахунки, показуємо платежі без неї
+                logger.warning(f"Не вдалося отримати інформацію про авто для платежів: {e}")
+
+        operations = []
+        for payment in payments:
+            payment_info = {
+                'type': 'payment',
+                'id': payment['id'],
+                'amount': float(payment['amount']),
+                'date_paid': payment.get('date_paid'),
+                'date': payment['date_created'],
+                'invoice_id': payment.get('invoice_id'),
+                'balance_after': payment.get('balance_after')
+            }
+
+            # Визначаємо тип платежу та інформацію про авто
+            if payment.get('invoice_id'):
+                payment_info['payment_type'] = 'invoice'
+                car_info = payment.get('car_info') or invoice_car_info.get(payment['invoice_id'])
+                if car_info:
+                    payment_info['car_info'] = car_info
+                if payment.get('car_model'):
+                    payment_info['car_model'] = payment['car_model']
+                    payment_info['vin'] = payment.get('vin')
+            else:
+                payment_info['payment_type'] = 'balance'
+
+            operations.append(payment_info)
+
+        return operations
+
     def get_last_operation(self, user_id: int) -> Optional[Dict]:
         """
         Отримання останньої операції користувача
@@ -239,183 +495,209 @@ class SupabaseDatabase:
             bool: True якщо успішно видалено, False у випадку помилки
         """
         try:
-            # Знаходимо останню операцію
-            last_invoice_result = self.supabase.table('invoices')\
-                .select('id, amount, date_created')\
-                .eq('user_id', user_id)\
-                .order('date_created', desc=True)\
-                .limit(1)\
-                .execute()
-            
-            last_payment_result = self.supabase.table('payments')\
-                .select('id, amount, date_created')\
+            last_operation = self.get_last_operation(user_id)
+            if last_operation is None:
+                return False  # Немає операцій для видалення
+
+            table = 'invoices' if last_operation['type'] == 'invoice' else 'payments'
+            self.supabase.table(table)\
+                .delete()\
+                .eq('id', last_operation['id'])\
                 .eq('user_id', user_id)\
-                .order('date_created', desc=True)\
-                .limit(1)\
                 .execute()
-            
-            last_invoice = last_invoice_result.data[0] if last_invoice_result.data else None
-            last_payment = last_payment_result.data[0] if last_payment_result.data else None
-            
-            # Визначаємо, яка операція була останньою
-            if last_invoice and last_payment:
-                if last_invoice['date_created'] > last_payment['date_created']:
-                    # Видаляємо рахунок
-                    self.supabase.table('invoices').delete().eq('id', last_invoice['id']).execute()
-                    self._update_balance(user_id, float(last_invoice['amount']))  # Повертаємо суму
-                else:
-                    # Видаляємо платіж
-                    self.supabase.table('payments').delete().eq('id', last_payment['id']).execute()
-                    self._update_balance(user_id, -float(last_payment['amount']))  # Віднімаємо суму
-                    
-            elif last_invoice:
-                self.supabase.table('invoices').delete().eq('id', last_invoice['id']).execute()
-                self._update_balance(user_id, float(last_invoice['amount']))
-                
-            elif last_payment:
-                self.supabase.table('payments').delete().eq('id', last_payment['id']).execute()
-                self._update_balance(user_id, -float(last_payment['amount']))
-                
-            else:
-                return False  # Немає операцій для видалення
-            
-            return True
-            
+
+            # Сума рахунку в історії від'ємна, тому знак змінюється для обох типів
+            return self._update_balance(user_id, -last_operation['amount']) is not None
+
         except Exception as e:
             logger.error(f"Помилка видалення останньої операції: {e}")
             return False
-    
-    def export_history(self, user_id: int) -> str:
-        """
-        Експорт історії операцій у текстовому форматі
-        
-        Args:
-            user_id: ID користувача в Telegram
-            
-        Returns:
-            str: Форматований текст з історією
-        """
-        history = self.get_history(user_id)
-        
-        if not history:
-            return "Історія операцій порожня."
-        
-        export_text = "📋 ІСТОРІЯ ОПЕРАЦІЙ\n"
-        export_text += "=" * 35 + "\n\n"
-        
-        # Сортуємо історію за датою (від старіших до новіших для хронології)
-        sorted_history = sorted(history, key=lambda x: x.get('date', ''), reverse=False)
-        
-        # Розраховуємо баланс після кожної операції
-        balance_history = calculate_balance_for_operations(sorted_history)
-        
-        operation_count = 0
-        
-        for operation in sorted_history:
-            operation_count += 1
-            
-            # Форматуємо дату у зрозумілому форматі
-            date_str = operation.get('date', '')
-            if 'T' in date_str:
-                # Конвертуємо ISO формат у звичайний
-                date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                formatted_date = date_obj.strftime('%d.%m.%Y')
-            else:
-                formatted_date = date_str
-            
-            # Отримуємо баланс після цієї операції
-            operation_key = f"{operation.get('type', '')}_{operation.get('id', '')}"
-            balance_after_op = balance_history.get(operation_key, 0.0)
-            
-            if operation['type'] == 'payment':
-                # ПЛАТІЖ (за рахунок або поповнення балансу)
-                export_text += f"— ПЛАТІЖ #{operation_count}\n"
-                export_text += f"💰 Сума: +{operation['amount']:.2f} євро\n"
-                export_text += f"📅 Дата платежу: {formatted_date}\n"
-                
-                # Визначаємо тип платежу
-                payment_type = operation.get('payment_type', 'balance')
-                if payment_type == 'invoice':
-                    # Платіж за конкретний рахунок
-                    car_info = operation.get('car_info', 'Невідоме авто')
-                    export_text += f"🎯 Тип: Платіж за рахунок\n"
-                    export_text += f"🚗 Авто: {car_info}\n"
-                else:
-                    # Поповнення балансу
-                    export_text += f"🎯 Тип: Платіж на баланс\n"
-                
-                export_text += f"📊 Баланс після операції: {balance_after_op:+.2f} євро\n"
-                
-            else:  # invoice
-                # РАХУНОК ЗА ПОСЛУГИ
-                export_text += f"— РАХУНОК #{operation_count}\n"
-                car_info = operation.get('car_info', 'Не вказано')
-                export_text += f"🚗 Авто: {car_info}\n"
-                export_text += f"💰 Сума: {operation['amount']:.2f} євро\n"
-                export_text += f"📅 Дата створення: {formatted_date}\n"
-                export_text += f"📊 Баланс після операції: {balance_after_op:+.2f} євро\n"
-            
-            export_text += "-" * 35 + "\n\n"
-        
-        # Підсумок
-        current_balance = self.get_balance(user_id)
-        export_text += f"💰 ПІДСУМОК:\n"
-        export_text += f"📊 Поточний баланс: {current_balance:+.2f} євро\n"
-        if current_balance >= 0:
-            export_text += f"✅ Стан: Позитивний баланс\n"
-        else:
-            export_text += f"❌ Стан: Борг {abs(current_balance):.2f} євро\n"
-        
-        export_text += f"\n📅 Звіт згенеровано: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
-        export_text += f"👤 Загальна кількість операцій: {operation_count}"
-        
-        return export_text
-    
-    def get_paginated_history(self, user_id: int, page: int = 1, per_page: int = 5) -> Tuple[List[Dict], int, int]:
+
+    def get_paginated_history(self, user_id: int, page: int = 1, per_page: int = 5,
+                              cursor: Optional[List] = None,
+                              total_count: Optional[int] = None) -> Tuple[List[Dict], int, int]:
         """
         Отримання історії операцій з пагінацією для видалення
-        
+
+        Використовує keyset пагінацію: з кожної таблиці читається не більше
+        per_page рядків після курсора. Кількість операцій рахується лише
+        при відкритті меню (total_count=None); наступні сторінки передають
+        збережену кількість, тому час сторінки не залежить від розміру історії.
+
         Args:
             user_id: ID користувача в Telegram
             page: Номер сторінки (починаючи з 1)
             per_page: Кількість записів на сторінку
-            
+            cursor: Курсор останньої операції попередньої сторінки
+                (див. utils.operation_cursor); None для першої сторінки
+            total_count: Кількість операцій з першої сторінки (None - порахувати)
+
         Returns:
             Tuple: (операції, загальна_кількість, загальна_кількість_сторінок)
         """
         try:
-            # Підраховуємо загальну кількість операцій
-            invoices_count = self.supabase.table('invoices')\
-                .select('id', count='exact')\
-                .eq('user_id', user_id)\
-                .execute()
-            
-            payments_count = self.supabase.table('payments')\
-                .select('id', count='exact')\
-                .eq('user_id', user_id)\
-                .execute()
-            
-            total_count = invoices_count.count + payments_count.count
-            total_pages = (total_count + per_page - 1) // per_page
-            
+            with_count = total_count is None
+            if page > 1 and cursor is None:
+                # Курсор втрачено: пропускаємо попередні сторінки (читаємо page * per_page рядків)
+                offset = (page - 1) * per_page
+                operations, remaining = self._fetch_operations_page(user_id, offset + per_page, with_count=with_count)
+                operations = operations[offset:]
+            else:
+                offset = (page - 1) * per_page if cursor is not None else 0
+                operations, remaining = self._fetch_operations_page(user_id, per_page, cursor, with_count=with_count)
+                # Лічильник повертає кількість рядків після курсора
+                remaining += offset
+
+            if with_count:
+                total_count = remaining
+
             if total_count == 0:
                 return [], 0, 0
-            
-            # Отримуємо всі операції та сортуємо їх
-            history = self.get_history(user_id, limit=1000)  # Отримуємо всі операції
-            
-            # Застосовуємо пагінацію
-            start_index = (page - 1) * per_page
-            end_index = start_index + per_page
-            paginated_history = history[start_index:end_index]
-            
-            return paginated_history, total_count, total_pages
-            
+
+            total_pages = (total_count + per_page - 1) // per_page
+
+            return operations, total_count, total_pages
+
         except Exception as e:
             logger.error(f"Помилка отримання історії з пагінацією: {e}")
             return [], 0, 0
-    
-    def delete_invoice_by_id(self, user_id: int, invoice_id: int) -> bool:
+
+    def _operations_query(self, table: str, user_id: int, cursor: Optional[List] = None,
+                          descending: bool = True, count: Optional[str] = None):
+        """
+        Запит до таблиці операцій з keyset фільтром після курсора
+
+        Операції впорядковані за (дата, тип, id); 'invoice' < 'payment'.
+
+        Args:
+            table: 'invoices' або 'payments'
+            user_id: ID користувача в Telegram
+            cursor: [дата, тип, id] останньої прочитаної операції
+            descending: Напрямок читання
+            count: Режим підрахунку PostgREST ('exact') або None
+        """
+        operation_type = 'invoice' if table == 'invoices' else 'payment'
+        query = self.supabase.table(table)\
+            .select('*', count=count)\
+            .eq('user_id', user_id)
+
+        if cursor is not None:
+            cursor_date, cursor_type, cursor_id = cursor
+            after = 'lt' if descending else 'gt'
+            if operation_type == cursor_type:
+                query = query.or_(
+                    f'date_created.{after}."{cursor_date}",'
+                    f'and(date_created.eq."{cursor_date}",id.{after}.{cursor_id})'
+                )
+            elif (operation_type < cursor_type) == descending:
+                # Операції цього типу з тією ж датою йдуть після курсора
+                query = query.filter('date_created', f'{after}e', cursor_date)
+            else:
+                query = query.filter('date_created', after, cursor_date)
+
+        return query\
+            .order('date_created', desc=descending)\
+            .order('id', desc=descending)
+
+    def _fetch_operations_page(self, user_id: int, limit: int, cursor: Optional[List] = None,
+                               descending: bool = True, with_count: bool = False) -> Tuple[List[Dict], int]:
+        """
+        Читання однієї сторінки об'єднаної стрічки рахунків та платежів
+
+        Кожна таблиця повертає не більше limit рядків після курсора
+        (разом з точною кількістю в тому ж запиті, якщо with_count).
+
+        Args:
+            user_id: ID користувача в Telegram
+            limit: Кількість операцій на сторінці
+            cursor: [дата, тип, id] останньої показаної операції
+            descending: Напрямок читання
+            with_count: Чи рахувати кількість операцій після курсора
+
+        Returns:
+            Tuple: (операції, кількість_операцій_після_курсора або 0)
+        """
+        count = 'exact' if with_count else None
+        invoices_result = self._operations_query('invoices', user_id, cursor, descending, count)\
+            .limit(limit)\
+            .execute()
+        payments_result = self._operations_query('payments', user_id, cursor, descending, count)\
+            .limit(limit)\
+            .execute()
+
+        # Обидва списки вже впорядковані базою даних - достатньо злиття
+        operations = heapq.merge(
+            [self._build_invoice_operation(row) for row in invoices_result.data],
+            self._build_payment_operations(payments_result.data),
+            key=operation_cursor,
+            reverse=descending
+        )
+
+        remaining = (invoices_result.count or 0) + (payments_result.count or 0)
+        return list(islice(operations, limit)), remaining
+
+    def get_operations_by_vin(self, user_id: int, vin: str) -> List[Dict]:
+        """
+        Усі операції по одному авто: рахунки та платежі за них
+
+        Пошук за індексом (user_id, vin) без розбору car_info кожного рядка.
+
+        Args:
+            user_id: ID користувача в Telegram
+            vin: VIN код авто
+
+        Returns:
+            List[Dict]: Операції від новіших до старіших
+        """
+        try:
+            vin = vin.strip().upper()
+            invoices_result = self._operations_query('invoices', user_id).eq('vin', vin).execute()
+            payments_result = self._operations_query('payments', user_id).eq('vin', vin).execute()
+
+            return list(heapq.merge(
+                [self._build_invoice_operation(row) for row in invoices_result.data],
+                self._build_payment_operations(payments_result.data),
+                key=operation_cursor,
+                reverse=True
+            ))
+
+        except Exception as e:
+            logger.error(f"Помилка пошуку операцій за VIN: {e}")
+            return []
+
+    def get_operation(self, user_id: int, operation_type: str, operation_id: int) -> Optional[Dict]:
+        """
+        Отримання деталей однієї операції для підтвердження видалення
+
+        Args:
+            user_id: ID користувача в Telegram
+            operation_type: Тип операції ('invoice' або 'payment')
+            operation_id: ID операції
+
+        Returns:
+            Optional[Dict]: Рядок операції з бази даних або None
+        """
+        try:
+            if operation_type == 'invoice':
+                result = self.supabase.table('invoices')\
+                    .select('car_info, amount, date_created, original_text')\
+                    .eq('id', operation_id)\
+                    .eq('user_id', user_id)\
+                    .execute()
+            else:  # payment
+                result = self.supabase.table('payments')\
+                    .select('amount, date_paid, date_created')\
+                    .eq('id', operation_id)\
+                    .eq('user_id', user_id)\
+                    .execute()
+
+            return result.data[0] if result.data else None
+
+        except Exception as e:
+            logger.error(f"Помилка отримання операції: {e}")
+            return None
+
+    def delete_invoice_by_id(self, user_id: int, invoice_id: int) -> Optional[float]:
         """
         Видалення конкретного рахунку за ID
         
@@ -424,7 +706,7 @@ class SupabaseDatabase:
             invoice_id: ID рахунку для видалення
             
         Returns:
-            bool: True якщо успішно видалено, False у випадку помилки
+            Optional[float]: Новий баланс якщо успішно видалено, None у випадку помилки
         """
         try:
             # Спочатку отримуємо інформацію про рахунок для оновлення балансу
@@ -436,7 +718,7 @@ class SupabaseDatabase:
             
             if not invoice_result.data:
                 logger.warning(f"Рахунок {invoice_id} не знайдено для користувача {user_id}")
-                return False
+                return None
             
             amount = float(invoice_result.data[0]['amount'])
             
@@ -449,18 +731,18 @@ class SupabaseDatabase:
             
             if delete_result.data is not None:
                 # Оновлюємо баланс (повертаємо суму рахунку)
-                self._update_balance(user_id, amount)
+                new_balance = self._update_balance(user_id, amount)
                 logger.info(f"Рахунок {invoice_id} видалено для користувача {user_id}")
-                return True
+                return new_balance
             else:
                 logger.error(f"Помилка видалення рахунку {invoice_id}")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"Помилка видалення рахунку: {e}")
-            return False
+            return None
     
-    def delete_payment_by_id(self, user_id: int, payment_id: int) -> bool:
+    def delete_payment_by_id(self, user_id: int, payment_id: int) -> Optional[float]:
         """
         Видалення конкретного платежу за ID
         
@@ -469,7 +751,7 @@ class SupabaseDatabase:
             payment_id: ID платежу для видалення
             
         Returns:
-            bool: True якщо успішно видалено, False у випадку помилки
+            Optional[float]: Новий баланс якщо успішно видалено, None у випадку помилки
         """
         try:
             # Спочатку отримуємо інформацію про платіж для оновлення балансу
@@ -481,7 +763,7 @@ class SupabaseDatabase:
             
             if not payment_result.data:
                 logger.warning(f"Платіж {payment_id} не знайдено для користувача {user_id}")
-                return False
+                return None
             
             amount = float(payment_result.data[0]['amount'])
             
@@ -494,16 +776,16 @@ class SupabaseDatabase:
             
             if delete_result.data is not None:
                 # Оновлюємо баланс (віднімаємо суму платежу)
-                self._update_balance(user_id, -amount)
+                new_balance = self._update_balance(user_id, -amount)
                 logger.info(f"Платіж {payment_id} видалено для користувача {user_id}")
-                return True
+                return new_balance
             else:
                 logger.error(f"Помилка видалення платежу {payment_id}")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"Помилка видалення платежу: {e}")
-            return False
+            return None
     
     def get_unpaid_invoices(self, user_id: int) -> List[Dict]:
         """
@@ -577,7 +859,7 @@ class SupabaseDatabase:
             logger.error(f"Помилка отримання останніх рахунків: {e}")
             return []
     
-    def add_payment_for_invoice(self, user_id: int, invoice_id: int, amount: float, date_paid: str) -> bool:
+    def add_payment_for_invoice(self, user_id: int, invoice_id: int, amount: float, date_paid: str) -> Optional[float]:
         """
         Додавання платежу для конкретного рахунку
         
@@ -588,7 +870,7 @@ class SupabaseDatabase:
             date_paid: Дата платежу у форматі DD.MM.YYYY
             
         Returns:
-            bool: True якщо успішно додано, False у випадку помилки
+            Optional[float]: Новий баланс якщо успішно додано, None у випадку помилки
         """
         try:
             # Отримуємо інформацію про рахунок
@@ -600,7 +882,7 @@ class SupabaseDatabase:
             
             if not invoice_result.data:
                 logger.error(f"Рахунок {invoice_id} не знайдено")
-                return False
+                return None
             
             invoice_info = invoice_result.data[0]
             
@@ -614,60 +896,105 @@ class SupabaseDatabase:
                 'car_info': invoice_info['car_info']  # Додаємо інформацію про авто для зручності
             }
             
-            result = self.supabase.table('payments').insert(payment_data).execute()
+            result = self._insert_with_vehicle('payments', [payment_data])
             
             if result.data:
                 # Оновлюємо баланс (додаємо суму платежу)
-                self._update_balance(user_id, amount)
+                new_balance = self._update_balance(user_id, amount)
                 logger.info(f"Платіж {amount} євро додано для рахунку {invoice_id} користувача {user_id}")
-                return True
+                return new_balance
             else:
                 logger.error("Помилка додавання платежу для рахунку: відсутні дані у відповіді")
-                return False
+                return None
                 
         except Exception as e:
             logger.error(f"Помилка додавання платежу для рахунку: {e}")
-            return False
+            return None
     
-    def _update_balance(self, user_id: int, amount: float):
+    def _update_balance(self, user_id: int, amount: float) -> Optional[float]:
         """
-        Оновлення балансу користувача
-        
+        Атомарне оновлення балансу користувача
+
+        Викликає функцію adjust_balance (supabase_migrations.sql), яка за один
+        запит виконує upsert current_balance = current_balance + amount,
+        тому одночасні записи не втрачають оновлень. SELECT + UPDATE
+        використовується лише для баз без цієї функції (PGRST202): після
+        тайм-ауту чи розриву з'єднання RPC міг уже виконатися, і повторна
+        зміна балансу додала б суму двічі.
+
         Args:
             user_id: ID користувача
             amount: Сума для зміни балансу (+ або -)
+
+        Returns:
+            Optional[float]: Новий баланс користувача, None у випадку помилки
         """
+        if self._balance_rpc_available:
+            try:
+                result = self.supabase.rpc('adjust_balance', {
+                    'p_user_id': user_id,
+                    'p_delta': amount
+                }).execute()
+                return float(result.data)
+
+            except APIError as e:
+                if e.code != 'PGRST202':
+                    logger.error(f"Помилка RPC adjust_balance: {e}")
+                    return None
+                # Функцію не створено - більше не пробуємо до перезапуску
+                self._balance_rpc_available = False
+                logger.warning("Функцію adjust_balance не знайдено, виконайте supabase_migrations.sql")
+            except Exception as e:
+                logger.error(f"Помилка RPC adjust_balance: {e}")
+                return None
+
         try:
-            # Перевіряємо, чи існує запис балансу
-            balance_result = self.supabase.table('balance')\
-                .select('current_balance')\
-                .eq('user_id', user_id)\
-                .execute()
-            
-            if balance_result.data:
-                # Оновлюємо існуючий баланс
-                current_balance = float(balance_result.data[0]['current_balance'])
-                new_balance = current_balance + amount
-                
-                self.supabase.table('balance')\
-                    .update({
-                        'current_balance': new_balance,
-                        'last_updated': datetime.now().isoformat()
-                    })\
-                    .eq('user_id', user_id)\
-                    .execute()
-            else:
-                # Створюємо новий запис балансу
-                self.supabase.table('balance')\
-                    .insert({
-                        'user_id': user_id,
-                        'current_balance': amount,
-                        'last_updated': datetime.now().isoformat()
-                    })\
-                    .execute()
-                    
+            return self._update_balance_legacy(user_id, amount)
         except Exception as e:
             logger.error(f"Помилка оновлення балансу: {e}")
+            return None
+
+    def _update_balance_legacy(self, user_id: int, amount: float) -> float:
+        """
+        Оновлення балансу через SELECT + UPDATE/INSERT (для баз без adjust_balance)
+
+        Args:
+            user_id: ID користувача
+            amount: Сума для зміни балансу (+ або -)
+
+        Returns:
+            float: Новий баланс користувача
+        """
+        # Перевіряємо, чи існує запис балансу
+        balance_result = self.supabase.table('balance')\
+            .select('current_balance')\
+            .eq('user_id', user_id)\
+            .execute()
+
+        if balance_result.data:
+            # Оновлюємо існуючий баланс
+            current_balance = float(balance_result.data[0]['current_balance'])
+            new_balance = current_balance + amount
+
+            self.supabase.table('balance')\
+                .update({
+                    'current_balance': new_balance,
+                    'last_updated': datetime.now().isoformat()
+                })\
+                .eq('user_id', user_id)\
+                .execute()
+        else:
+            # Створюємо новий запис балансу
+            new_balance = amount
+            self.supabase.table('balance')\
+                .insert({
+                    'user_id': user_id,
+                    'current_balance': amount,
+                    'last_updated': datetime.now().isoformat()
+                })\
+                .execute()
+
+        return new_balance
 
 
 # Глобальний об'єкт бази даних (ініціалізується пізніше)
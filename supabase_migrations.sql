@@ -0,0 +1,153 @@
+-- Міграції схеми Supabase
+-- Виконуйте в SQL Editor після supabase_setup.sql. Усі команди ідемпотентні.
+
+-- Індекси для keyset пагінації історії (get_paginated_history)
+CREATE INDEX IF NOT EXISTS idx_invoices_user_date
+    ON invoices (user_id, date_created DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_payments_user_date
+    ON payments (user_id, date_created DESC, id DESC);
+
+-- Атомарна зміна балансу за один запит (SupabaseDatabase._update_balance)
+-- Повертає новий баланс; одночасні записи одного користувача не втрачаються
+CREATE OR REPLACE FUNCTION adjust_balance(p_user_id BIGINT, p_delta NUMERIC)
+RETURNS NUMERIC
+LANGUAGE sql
+AS $$
+    INSERT INTO balance (user_id, current_balance, last_updated)
+    VALUES (p_user_id, p_delta, NOW())
+    ON CONFLICT (user_id) DO UPDATE
+        SET current_balance = balance.current_balance + EXCLUDED.current_balance,
+            last_updated = EXCLUDED.last_updated
+    RETURNING current_balance;
+$$;
+
+-- Модель та VIN, розібрані при збереженні рахунку (utils.extract_car_model_and_vin)
+-- Рядки, створені до міграції, показуються з розбором car_info і не потрапляють у пошук за VIN
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS car_model TEXT;
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS vin TEXT;
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS car_model TEXT;
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS vin TEXT;
+
+-- Індекс VIN для пошуку всіх операцій по одному авто (get_operations_by_vin)
+CREATE INDEX IF NOT EXISTS idx_invoices_user_vin
+    ON invoices (user_id, vin) WHERE vin IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_payments_user_vin
+    ON payments (user_id, vin) WHERE vin IS NOT NULL;
+
+-- Баланс після кожної операції (префіксна сума в порядку стрічки: date_created, тип, id;
+-- 'invoice' < 'payment'). Підтримується тригерами нижче, тому запис не потребує
+-- додаткових запитів, а баланс на дату - пошук одного рядка за індексом (get_balance_on_date)
+ALTER TABLE invoices ADD COLUMN IF NOT EXISTS balance_after NUMERIC;
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS balance_after NUMERIC;
+
+-- Одноразове заповнення наявних рядків
+WITH ledger AS (
+    SELECT 'invoice' AS type, id, user_id, date_created, -amount AS delta FROM invoices
+    UNION ALL
+    SELECT 'payment' AS type, id, user_id, date_created, amount AS delta FROM payments
+), running AS (
+    SELECT type, id, SUM(delta) OVER (PARTITION BY user_id ORDER BY date_created, type, id) AS balance_after
+    FROM ledger
+)
+UPDATE invoices SET balance_after = running.balance_after
+FROM running
+WHERE running.type = 'invoice' AND running.id = invoices.id AND invoices.balance_after IS NULL;
+
+WITH ledger AS (
+    SELECT 'invoice' AS type, id, user_id, date_created, -amount AS delta FROM invoices
+    UNION ALL
+    SELECT 'payment' AS type, id, user_id, date_created, amount AS delta FROM payments
+), running AS (
+    SELECT type, id, SUM(delta) OVER (PARTITION BY user_id ORDER BY date_created, type, id) AS balance_after
+    FROM ledger
+)
+UPDATE payments SET balance_after = running.balance_after
+FROM running
+WHERE running.type = 'payment' AND running.id = payments.id AND payments.balance_after IS NULL;
+
+-- Зсув balance_after усіх операцій користувача після (p_date, p_type, p_id);
+-- старіші рядки відсікає індекс (user_id, date_created, id)
+CREATE OR REPLACE FUNCTION shift_balances_after(p_user_id BIGINT, p_date TIMESTAMP, p_type TEXT,
+                                                p_id BIGINT, p_delta NUMERIC)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE invoices SET balance_after = balance_after + p_delta
+    WHERE user_id = p_user_id
+      AND (date_created > p_date OR (date_created = p_date AND p_type = 'invoice' AND id > p_id));
+
+    UPDATE payments SET balance_after = balance_after + p_delta
+    WHERE user_id = p_user_id
+      AND (date_created > p_date OR (date_created = p_date AND (p_type = 'invoice' OR id > p_id)));
+$$;
+
+-- Нова операція: баланс попередньої операції + зміна; якщо операцію вставлено
+-- не в кінець стрічки, зсуваються лише наступні за нею
+CREATE OR REPLACE FUNCTION ledger_balance_on_insert()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_type TEXT := CASE TG_TABLE_NAME WHEN 'invoices' THEN 'invoice' ELSE 'payment' END;
+    v_delta NUMERIC := CASE TG_TABLE_NAME WHEN 'invoices' THEN -NEW.amount ELSE NEW.amount END;
+    v_previous NUMERIC;
+BEGIN
+    -- Записи одного користувача по черзі, інакше дві вставки прочитають той самий баланс
+    PERFORM pg_advisory_xact_lock(NEW.user_id);
+
+    SELECT balance_after INTO v_previous
+    FROM (
+        (SELECT balance_after, date_created, 'invoice' AS type, id FROM invoices
+         WHERE user_id = NEW.user_id
+           AND (date_created < NEW.date_created
+                OR (date_created = NEW.date_created AND (v_type = 'payment' OR id < NEW.id)))
+         ORDER BY date_created DESC, id DESC LIMIT 1)
+        UNION ALL
+        (SELECT balance_after, date_created, 'payment' AS type, id FROM payments
+         WHERE user_id = NEW.user_id
+           AND (date_created < NEW.date_created
+                OR (date_created = NEW.date_created AND v_type = 'payment' AND id < NEW.id))
+         ORDER BY date_created DESC, id DESC LIMIT 1)
+    ) previous
+    ORDER BY date_created DESC, type DESC, id DESC
+    LIMIT 1;
+
+    NEW.balance_after := COALESCE(v_previous, 0) + v_delta;
+    PERFORM shift_balances_after(NEW.user_id, NEW.date_created, v_type, NEW.id, v_delta);
+    RETURN NEW;
+END;
+$$;
+
+-- Видалена операція: наступні операції втрачають її зміну балансу
+CREATE OR REPLACE FUNCTION ledger_balance_on_delete()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(OLD.user_id);
+    IF TG_TABLE_NAME = 'invoices' THEN
+        PERFORM shift_balances_after(OLD.user_id, OLD.date_created, 'invoice', OLD.id, OLD.amount);
+    ELSE
+        PERFORM shift_balances_after(OLD.user_id, OLD.date_created, 'payment', OLD.id, -OLD.amount);
+    END IF;
+    RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS invoices_balance_after_insert ON invoices;
+CREATE TRIGGER invoices_balance_after_insert
+    BEFORE INSERT ON invoices FOR EACH ROW EXECUTE FUNCTION ledger_balance_on_insert();
+
+DROP TRIGGER IF EXISTS payments_balance_after_insert ON payments;
+CREATE TRIGGER payments_balance_after_insert
+    BEFORE INSERT ON payments FOR EACH ROW EXECUTE FUNCTION ledger_balance_on_insert();
+
+DROP TRIGGER IF EXISTS invoices_balance_after_delete ON invoices;
+CREATE TRIGGER invoices_balance_after_delete
+    AFTER DELETE ON invoices FOR EACH ROW EXECUTE FUNCTION ledger_balance_on_delete();
+
+DROP TRIGGER IF EXISTS payments_balance_after_delete ON payments;
+CREATE TRIGGER payments_balance_after_delete
+    AFTER DELETE ON payments FOR EACH ROW EXECUTE FUNCTION ledger_balance_on_delete();
@@ -0,0 +1,124 @@
+"""
+Спільні налаштування та допоміжні функції тестів
+
+Модулі бота лежать у корені репозиторію, а FakeSupabase - у benchmarks/,
+тому обидва каталоги додаються до sys.path. Змінні середовища задаються
+до імпорту config, щоб main імпортувався без bot_config.env і не писав
+журнал у робочий каталог.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('BOT_TOKEN', '42:test')
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'vs-brothers-bot-tests.log'))
+
+from async_database import AsyncDatabase  # noqa: E402
+from fake_supabase import FakeSupabase, make_database  # noqa: E402
+
+# Корпус текстів рахунків (спільний з benchmarks/bench_amount_parser.py)
+CORPUS_PATH = os.path.join(ROOT, 'benchmarks', 'invoice_corpus.txt')
+
+# Фрагменти для випадкових текстів (маркери, числа, валюти, роздільники)
+FRAGMENTS = [
+    '=', '= ', 'комплекс ', 'Комплекс ', 'до ', 'До сплати ', 'сплати ', 'досплати ',
+    '0', '0 ', '5', '12', '740', '1 200', '740.50', '740,50', '1.', ',5', '00',
+    'євро', ' євро', 'ЄВРО', 'euro', ' Euro', 'eur', 'EUR', 'EURO', '€', ' €', '€ ',
+    '$', ' $', 'usd', ' USD', '\n', ' ', '  ', ', ', 'стоянка ', 'BMW X5 ', '-',
+]
+
+# Користувач та дата платежів у тестах сховищ
+USER_ID = 7
+DATE = '01.02.2025'
+
+
+def legacy_parse_amount_from_text(text: str):
+    """Попередня реалізація utils.parse_amount_from_text (еталон для порівняння)"""
+    normalized_text = re.sub(r'\s+', ' ', text.strip())
+    patterns = [
+        r'=\s*(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'комплекс\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'до\s+сплати\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'сплати\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+        r'€\s*(\d+(?:[,.]?\d+)?)',
+        r'(\d+(?:[,.]?\d+)?)(?:EUR|eur)',
+        r'(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€|\$|usd)',
+    ]
+    for pattern in patterns:
+        matches = re.findall(pattern, normalized_text, re.IGNORECASE)
+        if matches:
+            try:
+                amount = float(matches[-1].replace(',', '.'))
+                if amount > 0:
+                    logging.getLogger('utils').info(f"Знайдено суму: {amount} у тексті: {text[:50]}...")
+                    return amount
+            except ValueError:
+                continue
+    logging.getLogger('utils').warning(f"Не вдалося знайти суму у тексті: {text[:50]}...")
+    return None
+
+
+def load_corpus(path: str = CORPUS_PATH):
+    """Зразки корпусу, розділені рядком '---' (рядки з '#' - коментарі)"""
+    with open(path, encoding='utf-8') as file:
+        lines = [line for line in file.read().split('\n') if not line.startswith('#')]
+    samples = [sample.strip('\n') for sample in '\n'.join(lines).split('\n---\n')]
+    return [sample for sample in samples if sample.strip()]
+
+
+def random_samples(count: int, seed: int = 42):
+    """Випадкові комбінації FRAGMENTS"""
+    rng = random.Random(seed)
+    return [''.join(rng.choices(FRAGMENTS, k=rng.randint(1, 12))) for _ in range(count)]
+
+
+def seed_paid_invoices(client: FakeSupabase, user_id: int, payments: int):
+    """Рахунки, кожен з платежем; кожен другий платіж - старий запис без car_info"""
+    start = datetime(2024, 1, 1)
+    for i in range(payments):
+        invoice_id = i + 1
+        client.tables['invoices'].append({
+            'id': invoice_id, 'user_id': user_id, 'car_info': f"2018 TESLA MODEL S #{i}",
+            'amount': 700.0, 'original_text': '= 700 євро',
+            'date_created': (start + timedelta(minutes=2 * i)).isoformat()
+        })
+        payment = {
+            'id': i + 1, 'user_id': user_id, 'amount': 700.0, 'date_paid': '01.01.2024',
+            'date_created': (start + timedelta(minutes=2 * i + 1)).isoformat(),
+            'invoice_id': invoice_id
+        }
+        if i % 2 == 0:
+            payment['car_info'] = f"2018 TESLA MODEL S #{i}"
+        client.tables['payments'].append(payment)
+
+
+async def workload(db, operations: int):
+    """Рахунки, платежі за рахунки та на баланс, потім два видалення"""
+    for i in range(operations):
+        if i % 3 == 0:
+            await db.add_invoice(USER_ID, f"2019 BMW X5 WBAKR0105K0{i:06d}", 900.0 + i, "= 900 євро")
+        elif i % 3 == 1:
+            invoices = await db.get_recent_invoices(USER_ID, limit=1)
+            await db.add_payment_for_invoice(USER_ID, invoices[0]['id'], 400.0, "01.02.2025")
+        else:
+            await db.add_payment(USER_ID, 100.0, "02.02.2025")
+    history = await db.get_history(USER_ID, limit=3)
+    await db.delete_invoice_by_id(USER_ID, next(op['id'] for op in history if op['type'] == 'invoice'))
+    await db.delete_last_operation(USER_ID)
+
+
+def make_async_database(latency: float) -> AsyncDatabase:
+    """AsyncDatabase над FakeSupabase без adjust_balance (баланс через SELECT + UPDATE)"""
+    database = make_database(FakeSupabase(latency=latency))
+    database._balance_rpc_available = False
+    return AsyncDatabase(database)
@@ -0,0 +1,102 @@
+"""Тести ранньої відповіді на callback-запити (EarlyAnswerMiddleware, DeferredAnswerMiddleware)"""
+import asyncio
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import AnswerCallbackQuery, SendMessage
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from callbacks import DeferredAnswerMiddleware, EarlyAnswerMiddleware
+
+USER = User(id=42, is_bot=False, first_name="test")
+MESSAGE = Message(message_id=1, date=0, chat=Chat(id=42, type="private"), text="menu")
+
+
+class RecordingSession(BaseSession):
+    """Сесія бота без мережі: запити записуються, відповідь - True"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests.append(method)
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_bot_and_dispatcher(handler):
+    bot = Bot("42:test", session=RecordingSession())
+    bot.session.middleware(DeferredAnswerMiddleware())
+    dp = Dispatcher()
+    dp.callback_query.outer_middleware(EarlyAnswerMiddleware())
+    dp.callback_query.register(handler)
+    return bot, dp
+
+
+def callback_update(update_id: int = 1) -> Update:
+    return Update(update_id=update_id, callback_query=CallbackQuery(
+        id=str(update_id), from_user=USER, chat_instance="c", message=MESSAGE, data="menu_history"))
+
+
+async def feed(bot, dp, update):
+    await dp.feed_update(bot, update)
+    # Рання відповідь надсилається фоновою задачею
+    await asyncio.sleep(0)
+    return bot.session.requests
+
+
+def test_answer_is_sent_before_handler_finishes():
+    async def run():
+        release, answered_early = asyncio.Event(), []
+
+        async def handler(callback: CallbackQuery):
+            await asyncio.sleep(0)
+            answered_early.append(any(isinstance(m, AnswerCallbackQuery) for m in callback.bot.session.requests))
+            await release.wait()
+            await callback.answer()
+
+        bot, dp = make_bot_and_dispatcher(handler)
+        feeding = asyncio.create_task(feed(bot, dp, callback_update()))
+        await asyncio.sleep(0.01)
+        release.set()
+        return answered_early, await feeding
+
+    answered_early, requests = asyncio.run(run())
+    assert answered_early == [True]
+    # callback.answer() без тексту після ранньої відповіді не надсилається
+    assert [type(method) for method in requests] == [AnswerCallbackQuery]
+    assert requests[0].callback_query_id == '1' and requests[0].text is None
+
+
+def test_answer_with_text_becomes_chat_message():
+    async def handler(callback: CallbackQuery):
+        await callback.answer("Сталася помилка")
+
+    async def run():
+        bot, dp = make_bot_and_dispatcher(handler)
+        return await feed(bot, dp, callback_update())
+
+    # Порядок залежить від того, коли виконається фонова відповідь
+    sent = asyncio.run(run())
+    requests = {type(method): method for method in sent}
+    assert len(sent) == 2 and set(requests) == {AnswerCallbackQuery, SendMessage}
+    assert requests[AnswerCallbackQuery].text is None
+    assert (requests[SendMessage].chat_id, requests[SendMessage].text) == (42, "Сталася помилка")
+
+
+def test_other_answers_are_not_changed():
+    async def run():
+        bot, _ = make_bot_and_dispatcher(None)
+        # Поза хендлером з ранньою відповіддю запит іде як є
+        await bot.answer_callback_query("7", text="Готово")
+        return bot.session.requests
+
+    requests = asyncio.run(run())
+    assert [type(method) for method in requests] == [AnswerCallbackQuery]
+    assert requests[0].text == "Готово"
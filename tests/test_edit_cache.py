@@ -0,0 +1,97 @@
+"""Тести пропуску редагувань без змін (edit_cache.EditCacheMiddleware)"""
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import DeleteMessage, EditMessageReplyMarkup, EditMessageText, SendMessage
+from aiogram.types import Chat, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from edit_cache import EditCacheMiddleware
+
+CHAT = Chat(id=42, type="private")
+
+
+def keyboard(text: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=text, callback_data=text)]])
+
+
+class FakeTelegram:
+    """make_request для middleware: записує запити, може повернути помилку"""
+
+    def __init__(self):
+        self.requests = []
+        self.error = None
+
+    async def __call__(self, bot, method):
+        self.requests.append(method)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise TelegramBadRequest(method, error)
+        if isinstance(method, SendMessage):
+            return Message(message_id=1, date=0, chat=CHAT, text=method.text)
+        return True
+
+
+def edit_text(text: str, markup: str = 'menu') -> EditMessageText:
+    return EditMessageText(chat_id=CHAT.id, message_id=1, text=text, reply_markup=keyboard(markup))
+
+
+def edit_markup(markup: str) -> EditMessageReplyMarkup:
+    return EditMessageReplyMarkup(chat_id=CHAT.id, message_id=1, reply_markup=keyboard(markup))
+
+
+def run(middleware, telegram, *methods):
+    async def send_all():
+        return [await middleware(telegram, None, method) for method in methods]
+    return asyncio.run(send_all())
+
+
+def test_unchanged_edits_are_skipped():
+    middleware, telegram = EditCacheMiddleware(), FakeTelegram()
+    sent = SendMessage(chat_id=CHAT.id, text='menu', reply_markup=keyboard('menu'))
+
+    results = run(middleware, telegram, sent, edit_text('menu'), edit_markup('menu'),
+                  edit_text('history'), edit_markup('menu'), edit_markup('calendar'), edit_markup('calendar'))
+
+    assert all(result is True for result in results[1:])
+    assert [type(method) for method in telegram.requests] == [SendMessage, EditMessageText, EditMessageReplyMarkup]
+    assert telegram.requests[1].text == 'history'
+    assert middleware.skipped == {'editMessageText': 1, 'editMessageReplyMarkup': 3}
+
+
+def test_not_modified_error_is_swallowed_and_cached():
+    middleware, telegram = EditCacheMiddleware(), FakeTelegram()
+    # Повідомлення, надіслане до перезапуску: його вмісту немає в кеші
+    telegram.error = 'Bad Request: message is not modified: specified new message content is the same'
+
+    results = run(middleware, telegram, edit_text('menu'), edit_text('menu'))
+
+    assert results == [True, True]
+    assert len(telegram.requests) == 1
+    assert middleware.skipped['editMessageText'] == 1
+
+
+def test_other_errors_are_raised_and_forget_the_message():
+    middleware, telegram = EditCacheMiddleware(), FakeTelegram()
+    run(middleware, telegram, edit_text('menu'))
+    telegram.error = 'Bad Request: message to edit not found'
+
+    with pytest.raises(TelegramBadRequest):
+        run(middleware, telegram, edit_text('history'))
+    # Після помилки вміст невідомий, тому редагування надсилається
+    run(middleware, telegram, edit_text('menu'))
+
+    assert len(telegram.requests) == 3
+    assert middleware.skipped['editMessageText'] == 0
+
+
+def test_deleted_messages_and_eviction():
+    middleware, telegram = EditCacheMiddleware(max_size=2), FakeTelegram()
+    run(middleware, telegram, edit_text('menu'), DeleteMessage(chat_id=CHAT.id, message_id=1), edit_text('menu'))
+    assert len(telegram.requests) == 3
+
+    run(middleware, telegram, *(
+        EditMessageText(chat_id=CHAT.id, message_id=message_id, text='menu') for message_id in range(2, 6)
+    ))
+    assert len(middleware.cache) == 2
+    assert middleware.stats()['evictions'] == 3
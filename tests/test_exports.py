@@ -0,0 +1,176 @@
+"""Тести потокових експортів історії (exports.py)"""
+import asyncio
+import csv
+import zipfile
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
+
+import exports
+from exports import (
+    EMPTY_EXPORT_TEXT, LEDGER_COLUMNS, ExportJobs, write_csv_export, write_text_export, write_xlsx_export
+)
+
+USER_ID = 1
+
+SHEET_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+# Текст рахунку, який Excel та Google Sheets виконали б як формулу
+FORMULA_TEXT = '=HYPERLINK("http://example.com","BMW")'
+
+
+class MemoryLedger:
+    """Сховище з двома методами, які читають експорти"""
+
+    def __init__(self, operations):
+        self.operations = operations
+
+    async def iter_operations(self, user_id, batch_size=None, descending=True):
+        for operation in (reversed(self.operations) if descending else self.operations):
+            yield operation
+
+    async def get_balance(self, user_id):
+        return sum(operation['amount'] for operation in self.operations)
+
+
+def make_operations(count: int):
+    """Рахунки по 100 та платежі по 40 у хронологічному порядку, без balance_after"""
+    operations = []
+    for i in range(1, count + 1):
+        operation = {'id': i, 'date': f'2025-02-{i:02d}T10:00:00', 'car_info': f'BMW X5 #{i}'}
+        if i % 2:
+            operation.update(type='invoice', amount=-100.0)
+        else:
+            operation.update(type='payment', amount=40.0, payment_type='balance', date_paid=f'{i:02d}.02.2025')
+        operations.append(operation)
+    return operations
+
+
+def export_text(operations) -> str:
+    buffer = BytesIO()
+    asyncio.run(write_text_export(MemoryLedger(operations), USER_ID, buffer))
+    return buffer.getvalue().decode('utf-8')
+
+
+def test_text_export_empty_history():
+    assert export_text([]) == EMPTY_EXPORT_TEXT
+
+
+def test_text_export_streams_batches(monkeypatch):
+    # Кілька пакетів: номери та баланс продовжуються через межу пакета
+    monkeypatch.setattr(exports, 'EXPORT_BATCH_SIZE', 2)
+    progress = []
+
+    async def report(count):
+        progress.append(count)
+
+    async def run():
+        buffer = BytesIO()
+        count = await write_text_export(MemoryLedger(make_operations(5)), USER_ID, buffer, report)
+        return count, buffer.getvalue().decode('utf-8')
+
+    count, text = asyncio.run(run())
+
+    assert count == 5
+    assert progress == [2, 4, 5]
+    assert text.count('ІСТОРІЯ ОПЕРАЦІЙ') == 1
+    assert '— РАХУНОК #5' in text
+    assert text.count('Баланс після операції') == 5
+    # -100 + 40 - 100 + 40 - 100
+    assert 'Баланс після операції: -220.00 євро' in text
+    assert 'Загальна кількість операцій: 5' in text
+
+
+def formula_operations():
+    operations = make_operations(2)
+    operations[0].update(car_info=FORMULA_TEXT, car_model='+SUM(A1)', vin='@VIN')
+    return operations
+
+
+def export_file(writer, operations) -> bytes:
+    buffer = BytesIO()
+    asyncio.run(writer(MemoryLedger(operations), USER_ID, buffer))
+    return buffer.getvalue()
+
+
+def test_csv_escapes_formula_like_user_text():
+    rows = list(csv.reader(StringIO(export_file(write_csv_export, formula_operations()).decode('utf-8-sig'))))
+    header, first, second = rows
+    cells = dict(zip(header, first))
+
+    assert tuple(header) == LEDGER_COLUMNS
+    assert cells['description'] == "'" + FORMULA_TEXT
+    assert cells['car_model'] == "'+SUM(A1)"
+    assert cells['vin'] == "'@VIN"
+    # Числа та звичайний текст без змін
+    assert cells['amount'] == '-100.0'
+    assert cells['balance_after'] == '-100.0'
+    assert dict(zip(header, second))['description'] == 'BMW X5 #2'
+
+
+def test_xlsx_is_valid_and_stores_text_as_strings():
+    with zipfile.ZipFile(BytesIO(export_file(write_xlsx_export, formula_operations()))) as archive:
+        assert archive.testzip() is None
+        parts = {name: ElementTree.fromstring(archive.read(name)) for name in archive.namelist()}
+
+    assert {'[Content_Types].xml', '_rels/.rels', 'xl/workbook.xml', 'xl/worksheets/sheet1.xml'} <= set(parts)
+    sheet = parts['xl/worksheets/sheet1.xml']
+    rows = sheet.findall(f'{SHEET_NS}sheetData/{SHEET_NS}row')
+    assert len(rows) == 3
+    assert all(len(row) == len(LEDGER_COLUMNS) for row in rows)
+    # Формул немає: текст користувача - inline string без апострофа
+    assert sheet.find(f'.//{SHEET_NS}f') is None
+    description = rows[1][LEDGER_COLUMNS.index('description')]
+    assert description.get('t') == 'inlineStr'
+    assert description.find(f'{SHEET_NS}is/{SHEET_NS}t').text == FORMULA_TEXT
+    assert rows[1][LEDGER_COLUMNS.index('amount')].find(f'{SHEET_NS}v').text == '-100.0'
+
+
+def test_export_jobs_limit_per_user():
+    async def run():
+        jobs, release = ExportJobs(per_user_limit=1), asyncio.Event()
+        finished = []
+
+        async def job(name):
+            await release.wait()
+            finished.append(name)
+
+        first = jobs.start(1, job('first'))
+        rejected = job('rejected')
+        assert jobs.start(1, rejected) is None
+        # Відхилена корутина закрита, а не залишена незапущеною
+        assert rejected.cr_frame is None
+        other_user = jobs.start(2, job('other user'))
+        assert first is not None and other_user is not None
+        assert (jobs.running(1), jobs.running(2)) == (1, 1)
+
+        release.set()
+        await asyncio.gather(first, other_user)
+        await asyncio.sleep(0)
+        assert (jobs.running(1), jobs.running(2)) == (0, 0)
+        # Після завершення користувач може запустити новий експорт
+        again = jobs.start(1, job('again'))
+        await again
+        return finished
+
+    assert asyncio.run(run()) == ['first', 'other user', 'again']
+
+
+def test_export_jobs_failed_and_cancelled_tasks_free_the_slot():
+    async def run():
+        jobs = ExportJobs(per_user_limit=1)
+
+        async def failing():
+            raise RuntimeError('export failed')
+
+        task = jobs.start(1, failing())
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert jobs.running(1) == 0
+
+        task = jobs.start(1, asyncio.sleep(60))
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+        return jobs.running(1)
+
+    assert asyncio.run(run()) == 0
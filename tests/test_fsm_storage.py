@@ -0,0 +1,97 @@
+"""Тести сховища станів FSM у SQLite (fsm_storage.SQLiteFSMStorage)"""
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+import fsm_storage
+from fsm_storage import SQLiteFSMStorage
+
+TTL = 100.0
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Керований час для TTL сховища"""
+    now = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(fsm_storage, 'time', SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def rows(path) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM fsm_states").fetchone()[0]
+
+
+async def open_storage(path, cache_size: int) -> SQLiteFSMStorage:
+    storage = SQLiteFSMStorage(str(path), ttl=TTL, cache_size=cache_size)
+    await storage.connect()
+    return storage
+
+
+@pytest.mark.parametrize('cache_size', [0, 10])
+def test_state_is_kept_in_file_until_ttl(tmp_path, clock, cache_size):
+    path = tmp_path / 'fsm.db'
+
+    async def run():
+        storage = await open_storage(path, cache_size)
+        await storage.set_state(KEY, 'BotStates:waiting_for_payment_amount')
+        await storage.set_data(KEY, {'amount': 250.0})
+        await storage.close()
+
+        # Нове з'єднання з тим самим файлом бачить стан
+        storage = await open_storage(path, cache_size)
+        state, data = await storage.get_state(KEY), await storage.get_data(KEY)
+        counts = await storage.count_states()
+
+        clock.value += TTL + 1
+        expired = await storage.get_state(KEY), await storage.get_data(KEY), await storage.count_states()
+        await storage.close()
+        return state, data, counts, expired
+
+    state, data, counts, expired = asyncio.run(run())
+    assert state == 'BotStates:waiting_for_payment_amount'
+    assert data == {'amount': 250.0}
+    assert counts == {'BotStates:waiting_for_payment_amount': 1}
+    assert expired == (None, {}, {})
+
+
+def test_write_extends_ttl(tmp_path, clock):
+    async def run():
+        storage = await open_storage(tmp_path / 'fsm.db', 10)
+        await storage.set_state(KEY, 'BotStates:waiting_for_invoice_text')
+        clock.value += TTL * 0.8
+        await storage.set_data(KEY, {'date': '2025-02-01'})
+        clock.value += TTL * 0.8
+        result = await storage.get_state(KEY), await storage.get_data(KEY)
+        await storage.close()
+        return result
+
+    assert asyncio.run(run()) == ('BotStates:waiting_for_invoice_text', {'date': '2025-02-01'})
+
+
+def test_expired_and_cleared_states_are_deleted(tmp_path, clock):
+    path = tmp_path / 'fsm.db'
+    other = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+    async def run():
+        storage = await open_storage(path, 10)
+        await storage.set_state(KEY, 'BotStates:waiting_for_invoice_text')
+        await storage.set_state(other, 'BotStates:waiting_for_invoice_text')
+        await storage.set_data(other, {'amount': 1.0})
+        # state.clear(): порожній стан і дані - рядок видаляється
+        await storage.set_state(other, None)
+        await storage.set_data(other, {})
+        await storage.close()
+        after_clear = rows(path)
+
+        # Прострочений стан видаляється з файлу при відкритті
+        clock.value += TTL + 1
+        storage = await open_storage(path, 10)
+        await storage.close()
+        return after_clear, rows(path)
+
+    assert asyncio.run(run()) == (1, 0)
@@ -0,0 +1,21 @@
+"""Тести передачі записів журналу в чергу (logging_config.ContextQueueHandler)"""
+import logging
+import queue
+
+from logging_config import ContextQueueHandler
+
+
+def test_prepare_does_not_change_the_original_record():
+    records = queue.Queue()
+    handler = ContextQueueHandler(records)
+    record = logging.LogRecord('utils', logging.INFO, __file__, 1, "Знайдено суму: %s", (740.0,), None)
+
+    handler.handle(record)
+    queued = records.get_nowait()
+
+    assert queued is not record
+    assert (queued.msg, queued.args) == ("Знайдено суму: 740.0", None)
+    assert hasattr(queued, 'user_id') and hasattr(queued, 'handler')
+    # Інші обробники логера отримують запис без змін
+    assert (record.msg, record.args) == ("Знайдено суму: %s", (740.0,))
+    assert not hasattr(record, 'user_id')
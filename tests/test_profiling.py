@@ -0,0 +1,36 @@
+"""Тести профілювання на вимогу (profiling.SamplingProfiler)"""
+import asyncio
+import threading
+
+from profiling import SamplingProfiler
+
+
+def test_profile_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    sampler = SamplingProfiler(str(tmp_path), interval=0.001)
+    dump_threads = []
+    dump = SamplingProfiler._dump
+
+    def recording_dump(*args):
+        dump_threads.append(threading.current_thread())
+        dump(*args)
+
+    monkeypatch.setattr(SamplingProfiler, '_dump', staticmethod(recording_dump))
+
+    async def run():
+        path = sampler.start(2)
+        assert sampler.start(1) is None
+        for _ in range(2):
+            assert sampler.begin()
+            await asyncio.sleep(0.02)
+            await sampler.end()
+        # Після останнього оновлення нові не профілюються, поки не викликано start
+        assert not sampler.begin()
+        return path, threading.current_thread()
+
+    path, loop_thread = asyncio.run(run())
+
+    assert not sampler.active
+    assert len(dump_threads) == 1 and dump_threads[0] is not loop_thread
+    with open(path, encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    assert lines and all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
@@ -0,0 +1,75 @@
+"""Тести сховищ: Supabase (FakeSupabase) та SQLite повертають однакові дані"""
+import asyncio
+from datetime import date, timedelta
+
+from async_database import AsyncDatabase
+from conftest import USER_ID, seed_paid_invoices, workload
+from fake_supabase import FakeSupabase, make_database
+from sqlite_database import SQLiteDatabase
+from utils import operation_cursor
+
+# get_history: invoices + payments + один пакетний запит car_info
+MAX_HISTORY_QUERIES = 3
+
+
+async def snapshot(db):
+    """Стан сховища без id та дат (вони залежать від реалізації)"""
+    def strip(operation):
+        return {k: v for k, v in operation.items() if k not in ('id', 'date', 'invoice_id')}
+
+    pages, cursor, page, total = [], None, 1, None
+    while True:
+        operations, total, total_pages = await db.get_paginated_history(USER_ID, page, 5, cursor, total)
+        pages.extend(strip(op) for op in operations)
+        if page >= total_pages:
+            break
+        cursor, page = operation_cursor(operations[-1]), page + 1
+
+    history = await db.get_history(USER_ID, limit=1000)
+    vin = next(op['vin'] for op in history if op['type'] == 'invoice')
+
+    today = date.today()
+    days = [(today - timedelta(days=1)).isoformat(), today.isoformat()]
+
+    return {
+        'balance': round(await db.get_balance(USER_ID), 2),
+        'balance_on_date': [round(await db.get_balance_on_date(USER_ID, day), 2) for day in days],
+        'history': [strip(op) for op in history],
+        'by_vin': [strip(op) for op in await db.get_operations_by_vin(USER_ID, vin)],
+        'pages': pages,
+        'total': total
+    }
+
+
+def test_backends_return_same_data(tmp_path):
+    async def run():
+        supabase_db = AsyncDatabase(make_database(FakeSupabase()))
+        sqlite_db = SQLiteDatabase(str(tmp_path / 'test.db'))
+        await sqlite_db.connect()
+        try:
+            for db in (supabase_db, sqlite_db):
+                await workload(db, 60)
+            return await snapshot(supabase_db), await snapshot(sqlite_db)
+        finally:
+            await sqlite_db.close()
+            await supabase_db.close()
+
+    expected, actual = asyncio.run(run())
+    assert actual['total'] == len(actual['history']) > 0
+    for key in expected:
+        assert actual[key] == expected[key], key
+
+
+def test_history_query_count_does_not_grow_with_payments():
+    for payments in (10, 200):
+        client = FakeSupabase()
+        db = make_database(client)
+        seed_paid_invoices(client, user_id=1, payments=payments)
+
+        client.reset_counter()
+        history = db.get_history(1, limit=payments * 2)
+
+        assert len(history) == payments * 2
+        # Кожен другий платіж - старий запис без car_info, його підставляє пакетний запит
+        assert all(op.get('car_info') for op in history if op['type'] == 'payment')
+        assert client.request_count <= MAX_HISTORY_QUERIES
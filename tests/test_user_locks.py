@@ -0,0 +1,82 @@
+"""Тести черги записів користувача (UserLocks та AsyncDatabase)"""
+import asyncio
+
+import pytest
+
+from conftest import DATE, make_async_database
+from user_locks import UserLocks
+
+# Стрес-тест: одночасні платежі кількох користувачів
+USERS = range(1, 9)
+PAYMENTS_PER_USER = 75
+
+
+def test_same_user_runs_in_order_other_users_in_parallel():
+    async def run():
+        locks, events = UserLocks(), []
+
+        async def write(user_id, name):
+            async with locks.hold(user_id):
+                events.append(('start', name))
+                await asyncio.sleep(0.01)
+                events.append(('end', name))
+
+        await asyncio.gather(write(1, 'a1'), write(1, 'a2'), write(2, 'b'))
+        return events, len(locks)
+
+    events, size = asyncio.run(run())
+    # Записи користувача 1 не перетинаються, запис користувача 2 - паралельно з першим
+    assert events.index(('end', 'a1')) < events.index(('start', 'a2'))
+    assert events.index(('start', 'b')) < events.index(('end', 'a1'))
+    assert size == 0
+
+
+def test_lock_is_released_after_error():
+    async def run():
+        locks = UserLocks()
+        with pytest.raises(RuntimeError):
+            async with locks.hold(1):
+                raise RuntimeError
+        async with locks.hold(1):
+            pass
+        return len(locks)
+
+    assert asyncio.run(run()) == 0
+
+
+def test_concurrent_payments_keep_exact_balance():
+    async def run():
+        # SELECT + UPDATE балансу з затримкою: без черги частина оновлень втрачається
+        db = make_async_database(0.001)
+        try:
+            results = await asyncio.gather(*(
+                db.add_payment(user_id, 1.0, DATE) for _ in range(PAYMENTS_PER_USER) for user_id in USERS
+            ))
+            balances = [await db.get_balance(user_id) for user_id in USERS]
+            return results, balances, len(db._user_locks)
+        finally:
+            await db.close()
+
+    results, balances, locks = asyncio.run(run())
+    # 600 одночасних платежів від 8 користувачів
+    assert len(results) == len(USERS) * PAYMENTS_PER_USER
+    assert None not in results
+    assert balances == [PAYMENTS_PER_USER] * len(USERS)
+    assert locks == 0
+
+
+def test_double_delete_credits_invoice_once():
+    async def run():
+        db = make_async_database(0.001)
+        try:
+            await db.add_invoice(1, 'BMW X5 | VIN: WBAFG4106XLN00001', 700.0, 'BMW X5 700')
+            invoice_id = (await db.get_recent_invoices(1, limit=1))[0]['id']
+            results = await asyncio.gather(db.delete_invoice_by_id(1, invoice_id),
+                                           db.delete_invoice_by_id(1, invoice_id))
+            return results, await db.get_balance(1)
+        finally:
+            await db.close()
+
+    results, balance = asyncio.run(run())
+    assert results.count(None) == 1
+    assert balance == 0
@@ -0,0 +1,38 @@
+"""Тести парсера суми з тексту рахунку (utils.parse_amount_from_text)"""
+import logging
+
+import pytest
+
+from conftest import legacy_parse_amount_from_text, load_corpus, random_samples
+from utils import parse_amount_from_text
+
+
+@pytest.fixture(autouse=True)
+def quiet_parser_logs():
+    # Кожен розбір пише в журнал
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('BMW X5 ремонт = 740 євро', 740.0),
+    ('Комплекс 1200 EUR', 1200.0),
+    ('До сплати 740,50 €', 740.5),
+    ('стоянка 15 euro\nдо сплати 90 євро', 90.0),
+    ('BMW X5 без суми', None),
+])
+def test_parse_amount(text, expected):
+    assert parse_amount_from_text(text) == expected
+
+
+def test_parser_matches_legacy_on_corpus():
+    corpus = load_corpus()
+    assert corpus
+    for sample in corpus:
+        assert parse_amount_from_text(sample) == legacy_parse_amount_from_text(sample), sample
+
+
+def test_parser_matches_legacy_on_random_samples():
+    for sample in random_samples(5000):
+        assert parse_amount_from_text(sample) == legacy_parse_amount_from_text(sample), sample
@@ -0,0 +1,68 @@
+"""Тести HTTP сервера бота в режимі webhook (main.create_web_app)"""
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import main
+
+SECRET = 'test-secret'
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': '/start',
+            'chat': {'id': 1, 'type': 'private'},
+            'from': {'id': 1, 'is_bot': False, 'first_name': 'test'},
+        },
+    }
+
+
+@pytest.fixture
+def delivered(monkeypatch):
+    """Оновлення, які webhook передав диспетчеру (без виклику хендлерів і Bot API)"""
+    updates = []
+
+    async def feed_raw_update(bot, update, **kwargs):
+        updates.append(update)
+
+    monkeypatch.setattr(main.dp, 'feed_raw_update', feed_raw_update)
+    return updates
+
+
+async def post_update(app, update: dict, secret: str) -> int:
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post(main.WEBHOOK_PATH, json=update,
+                                     headers={'X-Telegram-Bot-Api-Secret-Token': secret})
+        # Оновлення обробляється у фоні після відповіді
+        await asyncio.sleep(0.05)
+        return response.status
+
+
+def test_polling_mode_has_no_webhook_route(monkeypatch):
+    monkeypatch.setattr(main, 'WEBHOOK_URL', '')
+    paths = {resource.canonical for resource in main.create_web_app().router.resources()}
+    assert main.WEBHOOK_PATH not in paths
+    assert {'/', '/health', '/metrics'} <= paths
+
+
+def test_webhook_delivers_updates(monkeypatch, delivered):
+    monkeypatch.setattr(main, 'WEBHOOK_URL', 'https://bot.example.com')
+    monkeypatch.setattr(main, 'WEBHOOK_SECRET', SECRET)
+
+    status = asyncio.run(post_update(main.create_web_app(), make_update(1), SECRET))
+
+    assert status == 200
+    assert delivered == [make_update(1)]
+
+
+def test_webhook_rejects_wrong_secret(monkeypatch, delivered):
+    monkeypatch.setattr(main, 'WEBHOOK_URL', 'https://bot.example.com')
+    monkeypatch.setattr(main, 'WEBHOOK_SECRET', SECRET)
+
+    status = asyncio.run(post_update(main.create_web_app(), make_update(1), 'wrong'))
+
+    assert status == 401
+    assert delivered == []
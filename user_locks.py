@@ -0,0 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable
+
+
+class _UserLock:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Задачі, що утримують lock або чекають на нього
+        self.users = 0
+
+
+class UserLocks:
+    """
+    Реєстр asyncio.Lock за user_id
+
+    Записи одного користувача виконуються по черзі, різних - паралельно.
+    Lock існує, лише поки його утримують або на нього чекають: після
+    останнього звільнення він видаляється з реєстру, тому розмір реєстру
+    не перевищує кількість користувачів із записами в процесі, а
+    неактивні користувачі не займають пам'ять.
+
+    Призначений для використання з одного циклу подій, тому без блокувань
+    самого реєстру.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, _UserLock] = {}
+
+    @asynccontextmanager
+    async def hold(self, user_id: Hashable) -> AsyncIterator[None]:
+        """
+        Виконання блоку під lock користувача
+
+        Args:
+            user_id: ID користувача
+        """
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = _UserLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[user_id]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -1,13 +1,36 @@
 import re
 import logging
-from typing import Optional, Tuple
-from datetime import datetime
+from typing import List, Optional, Tuple
+from datetime import date, datetime, timedelta
 from config import DATE_FORMAT
 
 # Налаштування логування
 logger = logging.getLogger(__name__)
 
 
+# Число суми: "740", "740.50", "740,50"
+_AMOUNT_NUMBER = r'\d+(?:[,.]?\d+)?'
+
+# Пріоритети сум (від найвищого): "= 740 євро", "комплекс 700 євро",
+# "до сплати 740 євро", "сплати 740 євро", "740 євро", "€740", "740EUR",
+# "740 $" / "740 usd"
+(_PRIORITY_TOTAL, _PRIORITY_COMPLEX, _PRIORITY_DUE, _PRIORITY_PAY, _PRIORITY_EURO,
+ _PRIORITY_EURO_SIGN_FIRST, _PRIORITY_EUR_SUFFIX, _PRIORITY_ANY_CURRENCY) = range(8)
+
+# Усі суми з валютою після числа за один прохід; маркер перед сумою
+# (=, комплекс, до сплати, сплати) визначає її пріоритет.
+# Групи: =, комплекс, до, сплати, число, пробіли, валюта
+_AMOUNT_WITH_CURRENCY_RE = re.compile(
+    r'(?:(=)\s*|(комплекс)\s+|(до\s+)?(сплати)\s+)?'
+    rf'({_AMOUNT_NUMBER})(\s*)(євро|euro|eur|€|\$|usd)',
+    re.IGNORECASE
+)
+
+# Формат "€740": символ може бути валютою попередньої суми ("5 € 740"),
+# тому шукається окремо і лише коли вищі пріоритети не дали суми
+_EURO_SIGN_FIRST_RE = re.compile(rf'€\s*({_AMOUNT_NUMBER})', re.IGNORECASE)
+
+
 def parse_amount_from_text(text: str) -> Optional[float]:
     """
     Парсинг суми з тексту повідомлення
@@ -19,62 +42,188 @@ def parse_amount_from_text(text: str) -> Optional[float]:
     - "740EUR"
     - "€740"
     
+    З кожного пріоритету береться остання знайдена сума (зазвичай це
+    підсумкова сума); якщо вона не додатна - перевіряється наступний.
+    
     Args:
         text: Текст для парсингу
         
     Returns:
         Optional[float]: Знайдена сума або None
     """
-    # Нормалізуємо текст (прибираємо зайві пробіли, переводимо в нижній регістр для пошуку)
-    normalized_text = re.sub(r'\s+', ' ', text.strip())
+    last_by_priority = [None] * 8
     
-    # Різні патерни для пошуку сум
-    patterns = [
-        # Формат "= 740 євро"
-        r'=\s*(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
-        
-        # Формат "комплекс 700 євро"
-        r'комплекс\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+    for total, complex_, due, pay, number, space, currency in _AMOUNT_WITH_CURRENCY_RE.findall(text):
+        last_by_priority[_PRIORITY_ANY_CURRENCY] = number
+        
+        currency = currency.lower()
+        if currency in ('$', 'usd'):
+            continue
+        
+        last_by_priority[_PRIORITY_EURO] = number
+        if not space and currency.startswith('eur'):
+            last_by_priority[_PRIORITY_EUR_SUFFIX] = number
+        
+        if total:
+            last_by_priority[_PRIORITY_TOTAL] = number
+        elif complex_:
+            last_by_priority[_PRIORITY_COMPLEX] = number
+        elif pay:
+            last_by_priority[_PRIORITY_PAY] = number
+            if due:
+                last_by_priority[_PRIORITY_DUE] = number
+    
+    for priority, number in enumerate(last_by_priority):
+        if priority == _PRIORITY_EURO_SIGN_FIRST:
+            matches = _EURO_SIGN_FIRST_RE.findall(text)
+            number = matches[-1] if matches else None
+        if number is None:
+            continue
+        
+        # Замінюємо кому на крапку для правильного парсингу
+        amount = float(number.replace(',', '.'))
+        if amount > 0:
+            logger.debug("Знайдено суму: %s у тексті: %.50s...", amount, text)
+            return amount
+    
+    logger.warning("Не вдалося знайти суму у тексті: %.50s...", text)
+    return None
+
+
+# VIN (ISO 3779): 17 символів, латиниця без I, O, Q та цифри
+_VIN_RE = re.compile(r'(?<![A-Za-z0-9])[A-HJ-NPR-Za-hj-npr-z0-9]{17}(?![A-Za-z0-9])')
+
+# Числові значення літер та ваги позицій для контрольної цифри (9-й символ)
+_VIN_TRANSLITERATION = {
+    **{str(digit): digit for digit in range(10)},
+    'A': 1, 'B': 2, 'C': 3, 'D': 4, 'E': 5, 'F': 6, 'G': 7, 'H': 8,
+    'J': 1, 'K': 2, 'L': 3, 'M': 4, 'N': 5, 'P': 7, 'R': 9,
+    'S': 2, 'T': 3, 'U': 4, 'V': 5, 'W': 6, 'X': 7, 'Y': 8, 'Z': 9,
+}
+_VIN_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+
+def vin_check_digit(vin: str) -> str:
+    """
+    Розрахунок контрольної цифри VIN (ISO 3779 / 49 CFR 565)
+    
+    Args:
+        vin: VIN код з 17 допустимих символів
         
-        # Формат "до сплати 740 євро"
-        r'до\s+сплати\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+    Returns:
+        str: Очікуваний 9-й символ ('0'-'9' або 'X')
+    """
+    total = sum(_VIN_TRANSLITERATION[char] * weight for char, weight in zip(vin.upper(), _VIN_WEIGHTS))
+    remainder = total % 11
+    return 'X' if remainder == 10 else str(remainder)
+
+
+def is_valid_vin(vin: str) -> bool:
+    """
+    Перевірка VIN: 17 допустимих символів та правильна контрольна цифра
+    
+    Args:
+        vin: Рядок для перевірки
         
-        # Формат "сплати 740 євро"
-        r'сплати\s+(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+    Returns:
+        bool: True якщо контрольна цифра збігається
+    """
+    if not vin or not _VIN_RE.fullmatch(vin):
+        return False
+    return vin[8].upper() == vin_check_digit(vin)
+
+
+def extract_vin(text: str) -> str:
+    """
+    Пошук VIN коду в тексті
+    
+    Перевага надається кодам з правильною контрольною цифрою. Європейські
+    VIN не зобов'язані її мати, тому без такого коду береться перший
+    17-символьний код, що містить і літери, і цифри.
+    
+    Args:
+        text: Текст для пошуку
         
-        # Формат "740 євро"
-        r'(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€)',
+    Returns:
+        str: VIN у верхньому регістрі або порожній рядок
+    """
+    candidates = [match.group(0).upper() for match in _VIN_RE.finditer(text or '')]
+    
+    for candidate in candidates:
+        if candidate[8] == vin_check_digit(candidate):
+            return candidate
+    
+    for candidate in candidates:
+        if not candidate.isdigit() and not candidate.isalpha():
+            return candidate
+    
+    return ""
+
+
+# Явний роздільник рахунків в одному повідомленні: рядок з "---", "===", "___"
+_INVOICE_SEPARATOR_RE = re.compile(r'^[ \t]*[-=_—]{3,}[ \t]*$', re.MULTILINE)
+_PARAGRAPH_SEPARATOR_RE = re.compile(r'\n[ \t]*\n')
+
+
+def _has_amount(text: str) -> bool:
+    """Швидка перевірка, чи є в тексті сума з валютою (без розбору пріоритетів)"""
+    return bool(_AMOUNT_WITH_CURRENCY_RE.search(text) or _EURO_SIGN_FIRST_RE.search(text))
+
+
+def split_invoice_texts(text: str) -> List[str]:
+    """
+    Розбиття повідомлення з кількома рахунками на окремі рахунки
+    
+    Рахунки розділяються рядком "---" (або "===", "___"), а також
+    порожнім рядком, якщо наступний абзац починається з VIN, а поточний
+    рахунок уже містить суму. Порожні рядки всередині одного рахунку
+    (наприклад, між "комплекс 800 євро" та "= 848 євро") його не ділять.
+    
+    Args:
+        text: Текст повідомлення
         
-        # Формат "€740"
-        r'€\s*(\d+(?:[,.]?\d+)?)',
+    Returns:
+        List[str]: Тексти рахунків; для звичайного повідомлення - [text]
+    """
+    invoices = []
+    
+    for section in _INVOICE_SEPARATOR_RE.split(text or ''):
+        current, current_has_amount = [], False
         
-        # Формат "740EUR"
-        r'(\d+(?:[,.]?\d+)?)(?:EUR|eur)',
+        for paragraph in _PARAGRAPH_SEPARATOR_RE.split(section):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            
+            if current and current_has_amount and extract_vin(paragraph.split('\n', 1)[0]):
+                invoices.append('\n\n'.join(current))
+                current, current_has_amount = [], False
+            
+            current.append(paragraph)
+            current_has_amount = current_has_amount or _has_amount(paragraph)
         
-        # Загальний формат з числом та валютою
-        r'(\d+(?:[,.]?\d+)?)\s*(?:євро|euro|eur|€|\$|usd)',
-    ]
+        if current:
+            invoices.append('\n\n'.join(current))
     
-    # Пробуємо кожен патерн
-    for pattern in patterns:
-        matches = re.findall(pattern, normalized_text, re.IGNORECASE)
-        if matches:
-            try:
-                # Беремо останню знайдену суму (зазвичай це підсумкова сума)
-                amount_str = matches[-1]
-                # Замінюємо кому на крапку для правильного парсингу
-                amount_str = amount_str.replace(',', '.')
-                amount = float(amount_str)
-                
-                if amount > 0:
-                    logger.info(f"Знайдено суму: {amount} у тексті: {text[:50]}...")
-                    return amount
-                    
-            except ValueError:
-                continue
+    return invoices if len(invoices) > 1 else [text]
+
+
+# Патерни для пошуку інформації про авто
+_CAR_WITH_VIN_RE = re.compile(r'(\d{4}[A-Z\s]+(?:MODEL\s+)?[A-Z0-9\s]+[A-Z0-9]{17})', re.IGNORECASE)
+_CAR_MODEL_PATTERNS = [
+    # Рік + марка + модель
+    re.compile(r'(\d{4}\s*[A-Z][A-Za-z]+\s+[A-Za-z0-9\s]+)', re.IGNORECASE),
     
-    logger.warning(f"Не вдалося знайти суму у тексті: {text[:50]}...")
-    return None
+    # Марка + модель
+    re.compile(r'([A-Z][A-Za-z]+\s+[A-Za-z0-9\s]+(?:MODEL|model)[A-Za-z0-9\s]*)', re.IGNORECASE),
+]
+
+
+def _found_car_info(match_text: str) -> str:
+    """Очищення знайденої інформації про авто від зайвих пробілів"""
+    car_info = re.sub(r'\s+', ' ', match_text.strip())
+    logger.debug("Знайдено інформацію про авто: %s", car_info)
+    return car_info
 
 
 def extract_car_info(text: str) -> str:
@@ -87,34 +236,26 @@ def extract_car_info(text: str) -> str:
     Returns:
         str: Інформація про автомобіль
     """
-    # Патерни для пошуку інформації про авто
-    car_patterns = [
-        # Формат "2018TESLA MODEL S 5YJSA1E22JF272459"
-        r'(\d{4}[A-Z\s]+(?:MODEL\s+)?[A-Z0-9\s]+[A-Z0-9]{17})',
-        
-        # VIN код (17 символів)
-        r'([A-HJ-NPR-Z0-9]{17})',
-        
-        # Рік + марка + модель
-        r'(\d{4}\s*[A-Z][A-Za-z]+\s+[A-Za-z0-9\s]+)',
-        
-        # Марка + модель
-        r'([A-Z][A-Za-z]+\s+[A-Za-z0-9\s]+(?:MODEL|model)[A-Za-z0-9\s]*)',
-    ]
+    # Формат "2018TESLA MODEL S 5YJSA1E22JF272459"
+    match = _CAR_WITH_VIN_RE.search(text)
+    if match:
+        return _found_car_info(match.group(1))
     
-    for pattern in car_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    # VIN код (17 символів, з перевіркою контрольної цифри)
+    vin = extract_vin(text)
+    if vin:
+        logger.debug("Знайдено VIN: %s", vin)
+        return vin
+    
+    for pattern in _CAR_MODEL_PATTERNS:
+        match = pattern.search(text)
         if match:
-            car_info = match.group(1).strip()
-            # Очищуємо від зайвих символів
-            car_info = re.sub(r'\s+', ' ', car_info)
-            logger.info(f"Знайдено інформацію про авто: {car_info}")
-            return car_info
+            return _found_car_info(match.group(1))
     
     # Якщо нічого не знайдено, повертаємо перші слова тексту
     words = text.split()[:5]
     fallback_info = ' '.join(words)
-    logger.info(f"Використовуємо fallback інформацію про авто: {fallback_info}")
+    logger.debug("Використовуємо fallback інформацію про авто: %s", fallback_info)
     return fallback_info
 
 
@@ -211,6 +352,45 @@ def format_date(date_str: str) -> str:
         return date_str
 
 
+def to_iso_date(date_str: Optional[str]) -> str:
+    """
+    Перетворення дати платежу (DD.MM.YYYY) у формат ISO 8601 (YYYY-MM-DD)
+
+    Args:
+        date_str: Дата у форматі DD.MM.YYYY, YYYY-MM-DD або ISO з часом
+
+    Returns:
+        str: Дата YYYY-MM-DD, порожній рядок для None або вхідний рядок, якщо формат невідомий
+    """
+    if not date_str:
+        return ''
+
+    # Розбір рядка без strptime - функція викликається для кожного рядка експорту
+    day, _, rest = date_str.partition('.')
+    month, _, year = rest.partition('.')
+    if len(day) == 2 and len(month) == 2 and len(year) == 4:
+        return f"{year}-{month}-{day}"
+
+    # ISO дата або мітка часу - беремо лише дату
+    if len(date_str) >= 10 and date_str[4] == '-' and date_str[7] == '-':
+        return date_str[:10]
+
+    return date_str
+
+
+def next_day_iso(iso_date: str) -> str:
+    """
+    Виключна верхня межа дня для порівняння з date_created
+
+    Args:
+        iso_date: Дата YYYY-MM-DD
+
+    Returns:
+        str: Наступний день YYYY-MM-DD (мітки часу дня X менші за нього)
+    """
+    return (date.fromisoformat(iso_date) + timedelta(days=1)).isoformat()
+
+
 def truncate_text(text: str, max_length: int = 100) -> str:
     """
     Обрізання тексту до заданої довжини
@@ -246,29 +426,22 @@ def sanitize_filename(filename: str) -> str:
     return sanitized
 
 
-def parse_date_from_callback(callback_data: str) -> Optional[str]:
+def format_callback_date(year: int, month: int, day: int) -> Optional[str]:
     """
-    Парсинг дати з callback_data календаря
+    Форматування дати, вибраної в календарі (callbacks.DateCallback)
     
     Args:
-        callback_data: Дані з кнопки календаря
+        year: Рік
+        month: Місяць
+        day: День
         
     Returns:
-        Optional[str]: Дата у форматі DD.MM.YYYY або None
+        Optional[str]: Дата у форматі DD.MM.YYYY або None для неіснуючої дати
     """
     try:
-        # Формат: date_selected_YYYY_MM_DD
-        parts = callback_data.split('_')
-        if len(parts) >= 4:
-            year = int(parts[2])
-            month = int(parts[3])
-            day = int(parts[4])
-            
-            date_obj = datetime(year, month, day)
-            return date_obj.strftime(DATE_FORMAT)
-            
-    except (ValueError, IndexError):
-        logger.error(f"Помилка парсингу дати з callback: {callback_data}")
+        return datetime(year, month, day).strftime(DATE_FORMAT)
+    except ValueError:
+        logger.error(f"Некоректна дата з календаря: {year}-{month}-{day}")
         
     return None
 
@@ -307,6 +480,9 @@ def extract_car_model_and_vin(car_info: str) -> tuple:
     """
     Виділення моделі авто та VIN коду з рядка
     
+    Виконується один раз при збереженні рахунку (поля car_model та vin);
+    для відображення використовуйте operation_car_model_and_vin.
+    
     Args:
         car_info: Інформація про авто
         
@@ -316,46 +492,140 @@ def extract_car_model_and_vin(car_info: str) -> tuple:
     if not car_info:
         return "Невідоме авто", ""
     
-    # Шукаємо VIN (зазвичай 17 символів в кінці)
-    parts = car_info.split()
-    vin = ""
+    vin = extract_vin(car_info)
     model = car_info
     
-    for part in parts:
-        if len(part) == 17 and part.isalnum():  # VIN код точно 17 символів
-            vin = part
-            model = car_info.replace(part, '').strip()
-            break
+    if vin:
+        model = _VIN_RE.sub(lambda match: '' if match.group(0).upper() == vin else match.group(0), car_info)
+        model = re.sub(r'\s+', ' ', model)
     
     return model.strip() if model.strip() else "Невідоме авто", vin
 
 
-def calculate_balance_for_operations(operations: list) -> dict:
+def operation_car_model_and_vin(operation: dict) -> tuple:
     """
-    Розраховує баланс після кожної операції
+    Модель авто та VIN операції для відображення
     
     Args:
-        operations: Список операцій
+        operation: Операція з історії
         
     Returns:
-        dict: Словник {operation_id: balance_after_operation}
+        tuple: (модель, VIN) - збережені поля або, для записів без них, розбір car_info
+    """
+    if operation.get('car_model'):
+        return operation['car_model'], operation.get('vin') or ""
+    return extract_car_model_and_vin(operation.get('car_info', 'Невідоме авто'))
+
+
+def operation_cursor(operation: dict) -> list:
     """
-    # Сортуємо операції за датою створення (від старіших до новіших)
-    sorted_ops = sorted(operations, key=lambda x: x.get('date', ''), reverse=False)
+    Курсор операції для keyset пагінації
+
+    Args:
+        operation: Операція з історії
+
+    Returns:
+        list: [дата, тип, id] - ключ сортування операцій (JSON-сумісний для FSM)
+    """
+    return [operation.get('date', ''), operation.get('type', ''), operation.get('id', 0)]
+
+
+def operation_balance_after(operation: dict, previous_balance: float) -> float:
+    """
+    Баланс після операції: збережений у ній (колонка balance_after) або
+    наростаючий підсумок від попередньої операції
+
+    Args:
+        operation: Операція з історії
+        previous_balance: Баланс після попередньої операції
+
+    Returns:
+        float: Баланс після цієї операції
+    """
+    stored = operation.get('balance_after')
+    if stored is not None:
+        return float(stored)
+    return previous_balance + float(operation.get('amount', 0))
+
+
+# Заголовок та роздільник текстового експорту
+EXPORT_HEADER = "📋 ІСТОРІЯ ОПЕРАЦІЙ\n" + "=" * 35 + "\n\n"
+EXPORT_SEPARATOR = "-" * 35 + "\n\n"
+
+
+def format_export_operation(operation: dict, number: int, balance_after: float) -> str:
+    """
+    Форматування однієї операції текстового експорту
     
-    balance = 0.0
-    balance_history = {}
+    Args:
+        operation: Операція з історії
+        number: Порядковий номер операції в звіті
+        balance_after: Баланс після цієї операції
+        
+    Returns:
+        str: Блок тексту операції разом з роздільником
+    """
+    # Форматуємо дату у зрозумілому форматі
+    date_str = operation.get('date', '')
+    if 'T' in date_str:
+        # Конвертуємо ISO формат у звичайний
+        date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        formatted_date = date_obj.strftime('%d.%m.%Y')
+    else:
+        formatted_date = date_str
     
-    for operation in sorted_ops:
-        # Додаємо або віднімаємо суму операції
-        amount = float(operation.get('amount', 0))
-        balance += amount
+    if operation['type'] == 'payment':
+        # ПЛАТІЖ (за рахунок або поповнення балансу)
+        lines = [
+            f"— ПЛАТІЖ #{number}",
+            f"💰 Сума: +{operation['amount']:.2f} євро",
+            f"📅 Дата платежу: {formatted_date}",
+        ]
+        
+        # Визначаємо тип платежу
+        if operation.get('payment_type', 'balance') == 'invoice':
+            # Платіж за конкретний рахунок
+            lines.append("🎯 Тип: Платіж за рахунок")
+            lines.append(f"🚗 Авто: {operation.get('car_info', 'Невідоме авто')}")
+        else:
+            # Поповнення балансу
+            lines.append("🎯 Тип: Платіж на баланс")
+    else:  # invoice
+        # РАХУНОК ЗА ПОСЛУГИ
+        lines = [
+            f"— РАХУНОК #{number}",
+            f"🚗 Авто: {operation.get('car_info', 'Не вказано')}",
+            f"💰 Сума: {operation['amount']:.2f} євро",
+            f"📅 Дата створення: {formatted_date}",
+        ]
+    
+    lines.append(f"📊 Баланс після операції: {balance_after:+.2f} євро")
+    return "\n".join(lines) + "\n" + EXPORT_SEPARATOR
+
+
+def format_export_summary(current_balance: float, operation_count: int) -> str:
+    """
+    Підсумок текстового експорту
+    
+    Args:
+        current_balance: Поточний баланс користувача
+        operation_count: Кількість операцій у звіті
         
-        # Зберігаємо баланс для цієї операції
-        operation_id = f"{operation.get('type', '')}_{operation.get('id', '')}"
-        balance_history[operation_id] = balance
+    Returns:
+        str: Текст підсумку
+    """
+    if current_balance >= 0:
+        state = "✅ Стан: Позитивний баланс"
+    else:
+        state = f"❌ Стан: Борг {abs(current_balance):.2f} євро"
     
-    return balance_history
+    return (
+        f"💰 ПІДСУМОК:\n"
+        f"📊 Поточний баланс: {current_balance:+.2f} євро\n"
+        f"{state}\n"
+        f"\n📅 Звіт згенеровано: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
+        f"👤 Загальна кількість операцій: {operation_count}"
+    )
 
 
 def format_operation_summary(operation, balance=None):
@@ -375,8 +645,7 @@ def format_operation_summary(operation, balance=None):
             
             # Друга строка: за що було поповнення
             if payment_type == 'invoice':
-                car_info = operation.get('car_info', 'Невідоме авто')
-                car_model, vin = extract_car_model_and_vin(car_info)
+                car_model, vin = operation_car_model_and_vin(operation)
                 if vin:
                     result += f"🎯 За рахунок: {car_model} | VIN: {vin}\n"
                 else:
@@ -391,8 +660,7 @@ def format_operation_summary(operation, balance=None):
                 
         else:  # invoice
             # Рахунок - структурований формат
-            car_info = operation.get('car_info', '')
-            car_model, vin = extract_car_model_and_vin(car_info)
+            car_model, vin = operation_car_model_and_vin(operation)
             operation_id = operation.get('id', '')
             
             # Перша строка: номер рахунку та сума
@@ -420,11 +688,11 @@ def format_single_operation_summary(operation):
             text += f"🗓️ {format_date(operation['date'])} • На баланс"
         else:
             # Платіж за рахунок
-            car_model, vin = extract_car_model_and_vin(operation.get('car_info', ''))
+            car_model, vin = operation_car_model_and_vin(operation)
             text += f"🗓️ {format_date(operation['date'])} • За: {car_model}"
     else:
         # Рахунок
-        car_model, vin = extract_car_model_and_vin(operation.get('car_info', ''))
+        car_model, vin = operation_car_model_and_vin(operation)
         text = f"🔴 РАХУНОК {abs(operation['amount']):.2f}€\n"  # Используем abs() для отрицательных сумм
         text += f"🚗 {car_model}\n"
         text += f"🆔 VIN: {vin}\n"